@@ -89,6 +89,16 @@ DATABASES = {
 }
 
 
+# Authentication backends
+# Logged-in users are loaded with their Customer row in the same query (see
+# web/backends.py). ModelBackend stays listed so sessions started before the
+# switch keep working; they pick up the join at their next login
+AUTHENTICATION_BACKENDS = [
+    'web.backends.CustomerBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -137,3 +147,21 @@ LOGOUT_REDIRECT_URL = "index"
 # For development: print emails to the terminal
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DEFAULT_FROM_EMAIL = "reservations@moffatbaylodge.com"
+
+# Where get_available_rooms reads availability from: "sql" (the per-night
+# ledger) or "numpy" (an in-memory matrix per worker; needs NumPy installed)
+AVAILABILITY_BACKEND = os.getenv("AVAILABILITY_BACKEND", "sql")
+
+# Share availability answers through Django's cache (see web/availability_cache.py).
+# The default cache is per process; point CACHES at Redis or Memcached to share
+# answers between workers
+AVAILABILITY_CACHE = os.getenv("AVAILABILITY_CACHE") == "True"
+
+# On MySQL, match partial guest names on the search page with the FULLTEXT
+# index from migration 0014 instead of name prefixes
+SEARCH_FULLTEXT = os.getenv("SEARCH_FULLTEXT") == "True"
+
+# Secret that reservation numbers are scrambled with (see web/public_ids.py).
+# Defaults to SECRET_KEY; if you ever rotate SECRET_KEY, set this to the old
+# one first so existing numbers keep decoding
+PUBLIC_ID_KEY = os.getenv("PUBLIC_ID_KEY")
@@ -0,0 +1,65 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Cached summary of a customer's reservations for the account page: their
+next (or current) stay and how many reservations they have in each status.
+
+Summaries go through Django's cache, keyed by customer and day (so "next
+stay" moves on by itself). The signal handlers drop a customer's summary
+once a save or delete of one of their reservations commits, and
+cancel_expired_holds does the same for the holds it cancels with update().
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import Reservation
+
+# Only a reservation change or a new day can make a summary stale, so this
+# just bounds how long unused ones linger
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Statuses whose stays are still going ahead
+UPCOMING_STATUSES = ("Hold", "Confirmed")
+
+
+def _key(customer_id, today):
+    return f"account_summary:{customer_id}:{today.isoformat()}"
+
+
+def _compute(customer_id, today):
+    reservations = Reservation.objects.filter(customer_id=customer_id)
+    counts = dict(reservations.values_list('status').annotate(count=Count('id')).order_by())
+    upcoming = reservations.filter(
+        status__in=UPCOMING_STATUSES,
+        end_date__gt=today,
+    ).order_by('start_date', 'id').values(
+        'public_id', 'status', 'start_date', 'end_date', 'room_type__name',
+    ).first()
+    return {
+        "counts": {status: counts.get(status, 0) for status, _ in Reservation.STATUS_CHOICES},
+        "total": sum(counts.values()),
+        "upcoming": upcoming,
+    }
+
+
+def get(customer_id, today=None):
+    """
+    Return {"counts": {status: n}, "total": n, "upcoming": stay or None} for
+    a customer, where the upcoming stay is a dict of public_id, status,
+    start_date, end_date and room_type__name.
+    """
+    today = today or timezone.localdate()
+    return cache.get_or_set(_key(customer_id, today), lambda: _compute(customer_id, today), CACHE_TIMEOUT)
+
+
+def invalidate(*customer_ids):
+    """Drop the summaries of the given customers once the current transaction commits."""
+    keys = [_key(customer_id, timezone.localdate()) for customer_id in set(customer_ids) if customer_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,7 +1,10 @@
 from django.contrib import admin
-from .models import Customer, RoomType, Room, Reservation
+from .models import Customer, RoomType, Room, Reservation, EmailOutbox, RoomRate, RoomMaintenanceWindow
 
 admin.site.register(Customer)
 admin.site.register(RoomType)
 admin.site.register(Room)
-admin.site.register(Reservation)
\ No newline at end of file
+admin.site.register(Reservation)
+admin.site.register(EmailOutbox)
+admin.site.register(RoomRate)
+admin.site.register(RoomMaintenanceWindow)
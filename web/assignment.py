@@ -0,0 +1,245 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Room assignment. Bookings only take a room type; this module puts each
+Confirmed stay in a specific Room of that type.
+
+New confirmations go into the tightest gap that fits (the room whose
+previous stay ends closest before check-in), which keeps long gaps whole.
+When no single room has a gap for a stay the room type as a whole can
+take, the future stays of that type are reshuffled with greedy interval
+partitioning: stays sorted by check-in, each taking a room that is already
+free from a min-heap keyed by when each room frees up. Guests who have
+already checked in keep their rooms, and maintenance windows (see
+RoomMaintenanceWindow) are treated like stays that can't be moved.
+"""
+
+import heapq
+from bisect import bisect_right, insort
+from collections import deque
+from datetime import date
+from django.db import transaction
+from django.utils import timezone
+from . import inventory
+from .models import Reservation, RoomType
+
+
+def room_blackouts(room_type_id, today):
+    """
+    Return {room_id: [(start, end) maintenance windows still to come]} for the
+    rooms of a type that can be used, in room number order.
+    """
+    return {
+        room_id: windows
+        for room_id, _, windows in inventory.room_service([room_type_id], start=today)
+    }
+
+
+def partition(stays, blocked):
+    """
+    Greedy interval partitioning. stays are (reservation_id, start, end)
+    tuples and blocked is {room_id: sorted (start, end) spans the room can't
+    take}. Returns ({reservation_id: room_id}, [reservation ids that did not fit]).
+
+    With nothing blocked this never needs more rooms than the busiest night.
+    Blocked spans can leave a stay out even when some shuffle would fit it,
+    but rooms blocked only later in a stay are set aside for that stay
+    alone, so they still take the shorter stays that come after it.
+    """
+    # (free from, tie breaker, room id); the tie breaker keeps room number order
+    rooms = [(date.min, i, room_id) for i, room_id in enumerate(blocked)]
+    ahead = {room_id: deque(spans) for room_id, spans in blocked.items()}
+
+    placed = {}
+    unplaced = []
+    for reservation_id, start, end in sorted(stays, key=lambda stay: (stay[1], stay[2])):
+        skipped = []
+        while rooms and rooms[0][0] <= start:
+            room = heapq.heappop(rooms)
+            spans = ahead[room[2]]
+            while spans and spans[0][1] <= start:
+                spans.popleft()
+            if spans and spans[0][0] <= start:
+                # Blocked now; nothing starting earlier than this stay is left to place
+                heapq.heappush(rooms, (spans[0][1], room[1], room[2]))
+            elif spans and spans[0][0] < end:
+                skipped.append(room)
+            else:
+                placed[reservation_id] = room[2]
+                heapq.heappush(rooms, (end, room[1], room[2]))
+                break
+        else:
+            unplaced.append(reservation_id)
+        for room in skipped:
+            heapq.heappush(rooms, room)
+    return placed, unplaced
+
+
+class RoomSchedule:
+    """The stays and maintenance windows in each room, as sorted (start, end) lists."""
+
+    def __init__(self, blocked):
+        self.spans = {room_id: list(spans) for room_id, spans in blocked.items()}
+
+    def fits(self, room_id, start, end):
+        """True if the room is free for every night of [start, end)."""
+        spans = self.spans.get(room_id)
+        if spans is None:
+            return False
+        # spans[i] is the first span starting after check-in
+        i = bisect_right(spans, (start, date.max))
+        if i < len(spans) and spans[i][0] < end:
+            return False
+        return not i or spans[i - 1][1] <= start
+
+    def best_fit(self, start, end):
+        """The room whose previous stay ends closest before start, among those free for the stay."""
+        best = None
+        best_gap = None
+        for room_id, spans in self.spans.items():
+            if not self.fits(room_id, start, end):
+                continue
+            i = bisect_right(spans, (start, date.max))
+            previous_end = spans[i - 1][1] if i else date.min
+            gap = start - previous_end
+            if best_gap is None or gap < best_gap:
+                best, best_gap = room_id, gap
+        return best
+
+    def add(self, room_id, start, end):
+        insort(self.spans[room_id], (start, end))
+
+
+def lock_room_type(room_type_id):
+    """
+    Serialize assignment runs for a room type (the batch command and
+    confirmations). Anything that goes on to lock reservations or ledger
+    rows takes this lock first, the same order assign_room_type uses, so
+    the two can't deadlock.
+    """
+    RoomType.objects.select_for_update().filter(pk=room_type_id).first()
+
+
+def _save_rooms(rooms):
+    """
+    Write {reservation_id: room_id or None} with one UPDATE per room (in
+    chunks). Room changes don't touch inventory, so skipping the signals is fine.
+    """
+    by_room = {}
+    for reservation_id, room_id in rooms.items():
+        by_room.setdefault(room_id, []).append(reservation_id)
+    for room_id, reservation_ids in by_room.items():
+        for i in range(0, len(reservation_ids), 1000):
+            Reservation.objects.filter(pk__in=reservation_ids[i:i + 1000]).update(room_id=room_id)
+
+
+def assign_room_type(room_type_id, today=None, reshuffle=False):
+    """
+    Give every current and future Confirmed stay of a room type a room.
+    Unassigned stays go into free gaps; if any will not fit, or with
+    reshuffle, all stays not yet checked in are repartitioned. Returns
+    (rooms changed, stays left without a room).
+    """
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        lock_room_type(room_type_id)
+        blocked = room_blackouts(room_type_id, today)
+        stays = list(Reservation.objects.filter(
+            room_type_id=room_type_id,
+            status='Confirmed',
+            end_date__gt=today,
+        ).values_list('id', 'room_id', 'start_date', 'end_date'))
+        stays.sort(key=lambda stay: stay[2])
+        current = {reservation_id: room_id for reservation_id, room_id, _, _ in stays}
+
+        if not reshuffle:
+            schedule = RoomSchedule(blocked)
+            # Stays keep their room unless it has since gone into maintenance
+            # (or been double booked); those are placed again with the rest
+            waiting = []
+            for reservation_id, room_id, start, end in stays:
+                if room_id and schedule.fits(room_id, start, end):
+                    schedule.add(room_id, start, end)
+                else:
+                    waiting.append((reservation_id, start, end))
+            placed = {}
+            for reservation_id, start, end in waiting:
+                room_id = schedule.best_fit(start, end)
+                if room_id is None:
+                    break  # fragmented; reshuffle below
+                schedule.add(room_id, start, end)
+                placed[reservation_id] = room_id
+            else:
+                changed = {
+                    reservation_id: room_id for reservation_id, room_id in placed.items()
+                    if current[reservation_id] != room_id
+                }
+                _save_rooms(changed)
+                return len(changed), 0
+
+        # Guests already checked in keep their rooms; the room frees up when they leave
+        movable = []
+        for reservation_id, room_id, start, end in stays:
+            if room_id and start <= today and room_id in blocked:
+                insort(blocked[room_id], (start, end))
+            else:
+                movable.append((reservation_id, start, end))
+
+        placed, unplaced = partition(movable, blocked)
+        for reservation_id in unplaced:
+            placed[reservation_id] = None
+        changed = {
+            reservation_id: room_id for reservation_id, room_id in placed.items()
+            if current[reservation_id] != room_id
+        }
+        _save_rooms(changed)
+        return len(changed), len(unplaced)
+
+
+def assign_rooms(room_type_ids=None, today=None, reshuffle=False):
+    """Run assign_room_type for every (or the given) room type. Returns the summed counts."""
+    if room_type_ids is None:
+        room_type_ids = RoomType.objects.order_by('id').values_list('id', flat=True)
+    changed = unplaced = 0
+    for room_type_id in room_type_ids:
+        type_changed, type_unplaced = assign_room_type(room_type_id, today, reshuffle)
+        changed += type_changed
+        unplaced += type_unplaced
+    return changed, unplaced
+
+
+def assign_stay(reservation, today=None):
+    """
+    Give one newly Confirmed stay a room: the tightest free gap, or a
+    reshuffle of its room type's future stays if no gap fits. Returns the
+    room id (None if it could not be placed).
+    """
+    if reservation.status != 'Confirmed' or not reservation.room_type_id:
+        return None
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        lock_room_type(reservation.room_type_id)
+        schedule = RoomSchedule(room_blackouts(reservation.room_type_id, today))
+        booked = Reservation.objects.filter(
+            room_type_id=reservation.room_type_id,
+            status='Confirmed',
+            room__isnull=False,
+            end_date__gt=today,
+        ).exclude(pk=reservation.pk).values_list('room_id', 'start_date', 'end_date')
+        for room_id, start, end in booked:
+            if room_id in schedule.spans:
+                schedule.add(room_id, start, end)
+        room_id = schedule.best_fit(reservation.start_date, reservation.end_date)
+
+        if room_id is None:
+            Reservation.objects.filter(pk=reservation.pk).update(room=None)
+            assign_room_type(reservation.room_type_id, today, reshuffle=True)
+            room_id = Reservation.objects.filter(pk=reservation.pk).values_list('room_id', flat=True).first()
+        else:
+            Reservation.objects.filter(pk=reservation.pk).update(room_id=room_id)
+    reservation.room_id = room_id
+    return room_id
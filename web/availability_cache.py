@@ -0,0 +1,90 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Shared cache for availability answers, used by get_available_rooms when
+AVAILABILITY_CACHE is on. It goes through Django's cache framework, so
+locmem works for a single process and a shared backend (Redis, Memcached)
+serves every worker.
+
+Keys include the inventory version (see versions.py), which every
+reservation, room or room type change bumps, so an answer is never served
+after the data under it has changed. An answer is also dropped once a hold
+it counted lapses. When several requests miss the same key at once, only
+one computes it and the rest wait for its answer.
+"""
+
+import time
+from django.core.cache import cache
+from django.utils import timezone
+from . import versions
+
+# Old versions are never read again, so this only bounds how long they linger
+CACHE_TIMEOUT = 60 * 60
+
+# A crashed computation stops holding up the others after this many seconds
+LOCK_TIMEOUT = 10
+
+# How long (in seconds) to wait for another request's answer before computing anyway
+WAIT_LIMIT = 2.0
+WAIT_STEP = 0.05
+
+HITS_KEY = "availability:hits"
+MISSES_KEY = "availability:misses"
+
+
+def _count(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass  # evicted between add and incr; losing one count is fine
+
+
+def _fresh(entry, now):
+    return entry is not None and (entry["valid_until"] is None or now < entry["valid_until"])
+
+
+def stats():
+    """Return the {"hits": n, "misses": n} counters."""
+    return {"hits": cache.get(HITS_KEY, 0), "misses": cache.get(MISSES_KEY, 0)}
+
+
+def get_or_compute(parts, compute):
+    """
+    Return the cached answer for the key made of parts, computing it if needed.
+    compute() returns (answer, valid_until), where valid_until is when the
+    answer goes stale on its own (None if only a data change can do that).
+    """
+    # Read the version before computing, so an answer is never filed under
+    # a newer version than the data it was computed from
+    version = versions.current(versions.INVENTORY)
+    key = "availability:v%d:%s" % (version, ":".join(str(part) for part in parts))
+
+    entry = cache.get(key)
+    if _fresh(entry, timezone.now()):
+        _count(HITS_KEY)
+        return entry["answer"]
+    _count(MISSES_KEY)
+
+    lock_key = key + ":lock"
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if not locked:
+        # Someone else is computing this one; wait for their answer
+        deadline = time.monotonic() + WAIT_LIMIT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP)
+            entry = cache.get(key)
+            if _fresh(entry, timezone.now()):
+                return entry["answer"]
+
+    try:
+        answer, valid_until = compute()
+        cache.set(key, {"answer": answer, "valid_until": valid_until}, CACHE_TIMEOUT)
+        return answer
+    finally:
+        if locked:
+            cache.delete(lock_key)
@@ -0,0 +1,25 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Authentication backend that loads the logged-in user together with their
+Customer profile. AuthenticationMiddleware keeps the user for the whole
+request, so request.user.customer costs no query of its own.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class CustomerBackend(ModelBackend):
+    """ModelBackend whose get_user joins in the customer row."""
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        # Users without a profile come back with the customer cached as
+        # missing, so hasattr(user, "customer") is still False for them
+        user = UserModel._default_manager.select_related('customer').filter(pk=user_id).first()
+        return user if user and self.user_can_authenticate(user) else None
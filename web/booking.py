@@ -0,0 +1,180 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Booking service. Every write that takes up inventory goes through here so
+the availability check and the write happen in one transaction while the
+affected RoomTypeNight rows are locked. Rows are always locked in
+(room_type, date) order so two bookings can never deadlock each other.
+Anything that may give a Confirmed stay a room locks its RoomType row
+first of all, the order the assign_rooms batch takes its locks in.
+"""
+
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from . import assignment, inventory, pricing
+from .models import Reservation
+
+HOLD_DURATION = timedelta(hours=24)
+
+
+class BookingError(Exception):
+    """A booking could not be made. The message is safe to show to the guest."""
+
+
+def _lock_nights(spans, now):
+    """
+    Lock the ledger rows covering the given spans and return
+    {(room_type_id, date): free rooms} for them. Holds that have lapsed but
+    not been cancelled yet count as free.
+    """
+    spans = [span for span in spans if span]
+    rows = inventory.lock_nights(spans)
+    free = {(row.room_type_id, row.date): row.capacity - row.booked for row in rows}
+
+    for room_type_id, start, end in spans:
+        lapsed = inventory.lapsed_hold_nights(start, end, [room_type_id], now)[room_type_id]
+        for i, night in enumerate(inventory.iter_nights(start, end)):
+            free[(room_type_id, night)] += lapsed[i]
+    return free
+
+
+def _check_free(free, span, released=None):
+    """
+    Raise BookingError unless every night of span has a free room. Nights
+    covered by the released span (the reservation's own current booking)
+    count as free for it.
+    """
+    room_type_id, start, end = span
+    for night in inventory.iter_nights(start, end):
+        available = free.get((room_type_id, night), 0)
+        if released and released[0] == room_type_id and released[1] <= night < released[2]:
+            available += 1
+        if available < 1:
+            raise BookingError("The room is no longer available.")
+
+
+def _span(reservation):
+    return inventory.blocking_span(
+        reservation.status, reservation.room_type_id,
+        reservation.start_date, reservation.end_date,
+    )
+
+
+def _held_span(reservation, now):
+    """The nights a reservation really holds right now (none for a lapsed hold)."""
+    return _span(reservation) if reservation.blocks_inventory(now) else None
+
+
+# The room type lock comes from the caller's copy, taken before the row is
+# locked; if that copy was out of date, give up rather than go on to lock
+# a room type out of order
+CHANGED_MESSAGE = "This reservation was just changed. Please reload it and try again."
+
+
+def create_reservation(**fields):
+    """
+    Create a Reservation if its room type still has a free room every night
+    of the stay. Takes the same keyword arguments as Reservation.objects.create.
+    Confirmed reservations are given a room straight away.
+    """
+    reservation = Reservation(**fields)
+    span = _span(reservation)
+    with transaction.atomic():
+        if reservation.status == "Confirmed":
+            assignment.lock_room_type(reservation.room_type_id)
+        if span:
+            _check_free(_lock_nights([span], timezone.now()), span)
+        reservation.save(force_insert=True)
+        assignment.assign_stay(reservation)
+    return reservation
+
+
+def confirm_hold(reservation, now=None):
+    """Turn an unexpired Hold into a Confirmed reservation and give it a room."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        assignment.lock_room_type(reservation.room_type_id)
+        locked = Reservation.objects.select_for_update().get(pk=reservation.pk)
+        if locked.room_type_id != reservation.room_type_id:
+            raise BookingError(CHANGED_MESSAGE)
+        if locked.status != "Hold":
+            raise BookingError("This reservation is not on hold.")
+        if not locked.blocks_inventory(now):
+            raise BookingError("This hold has expired. Please re-check availability.")
+
+        # The hold already counts against the ledger, so confirming it
+        # needs no extra room; lock the nights anyway to serialize with bookings
+        _lock_nights([_span(locked)], now)
+        locked.status = "Confirmed"
+        locked.expiration_time = None
+        locked.save()
+        assignment.assign_stay(locked)
+    return locked
+
+
+def cancel_reservation(reservation):
+    """
+    Cancel a Hold or Confirmed reservation and free its nights. The row is
+    locked first, so a double-clicked cancel or one racing the hold expiry
+    job can't release the same nights twice.
+    """
+    with transaction.atomic():
+        locked = Reservation.objects.select_for_update().get(pk=reservation.pk)
+        if locked.status == "Cancelled":
+            raise BookingError("This reservation is already cancelled.")
+        locked.status = "Cancelled"
+        locked.expiration_time = None
+        locked.room = None
+        locked.save()
+    return locked
+
+
+def place_hold(reservation, now=None):
+    """Put a (possibly expired or cancelled) reservation back on a fresh 24 hour hold."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        locked = Reservation.objects.select_for_update().get(pk=reservation.pk)
+        old = _held_span(locked, now)
+        new = inventory.blocking_span("Hold", locked.room_type_id, locked.start_date, locked.end_date)
+        if new:
+            _check_free(_lock_nights([old, new], now), new, released=old)
+
+        locked.status = "Hold"
+        locked.expiration_time = now + HOLD_DURATION
+        locked.room = None  # holds don't get a room until they are confirmed
+        locked.save()
+    return locked
+
+
+def modify_reservation(reservation, check_in, check_out, guests, room_type):
+    """
+    Move a reservation to new dates and/or room type, repricing it at the
+    current rates and finding it a room again if it is Confirmed. The
+    nights the reservation already holds count as free for the move.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if reservation.status == "Confirmed":
+            assignment.lock_room_type(room_type.id)
+        locked = Reservation.objects.select_for_update().get(pk=reservation.pk)
+        if (locked.status == "Confirmed") != (reservation.status == "Confirmed"):
+            raise BookingError(CHANGED_MESSAGE)
+        old = _held_span(locked, now)
+        new = inventory.blocking_span(locked.status, room_type.id, check_in, check_out)
+        if new:
+            _check_free(_lock_nights([old, new], now), new, released=old)
+
+        locked.start_date = check_in
+        locked.end_date = check_out
+        locked.guests = guests
+        locked.room_type_id = room_type.id
+        locked.total_cost = pricing.stay_total(room_type, check_in, check_out)
+        locked.room = None
+        locked.save()
+        assignment.assign_stay(locked)
+    return locked
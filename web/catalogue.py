@@ -0,0 +1,147 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+In-process catalogue of room types. The handful of RoomType rows hardly
+ever change but are read on nearly every reservation page, so each worker
+keeps them as read-only RoomTypeRecord tuples instead of querying them.
+
+A RoomType save or delete bumps the room types counter (see versions.py)
+in its own transaction, and a worker whose catalogue was built at another
+version loads it again, so every worker sees a change (a new price, say)
+as soon as it commits. Within a request the counter is read only once
+(see begin_request), so a page's room types cost one small query at most,
+and code outside requests (jobs, commands) reads it each time.
+A catalogue read while this connection has room type changes that are not
+committed yet is used once and not kept, as those changes may roll back.
+"""
+
+import threading
+from collections import namedtuple
+from django.db import connection, transaction
+from . import versions
+from .models import RoomType
+
+_lock = threading.Lock()
+_catalogue = None
+
+# The version read in the current request, per thread
+_request = threading.local()
+
+
+class RoomTypeRecord(namedtuple("RoomTypeRecord", ["id", "name", "price_per_night", "beds", "max_guests", "description"])):
+    """A room type as read from the catalogue. Use RoomType itself to change one."""
+
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.name
+
+
+class Catalogue:
+    """The room types at one version, in name order and by id."""
+
+    def __init__(self, version, records):
+        self.version = version
+        self.records = tuple(records)
+        self.by_id = {record.id: record for record in self.records}
+
+    @classmethod
+    def load(cls, version):
+        """Read the room types. Read the version first, then call this."""
+        rows = RoomType.objects.order_by('name').values_list(*RoomTypeRecord._fields)
+        return cls(version, [RoomTypeRecord(*row) for row in rows])
+
+
+class _Pending:
+    """on_commit callback marking room type changes in a transaction; pending until it runs."""
+
+    def __init__(self):
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+
+
+def _changes_pending():
+    """True if this connection has room type changes waiting on a commit."""
+    # Django drops the callbacks of rolled back transactions and savepoints
+    return any(
+        isinstance(func, _Pending) and not func.done
+        for _, func, _ in connection.run_on_commit
+    )
+
+
+def begin_request():
+    """Start remembering the version this thread reads until end_request."""
+    _request.active = True
+    _request.version = None
+
+
+def end_request():
+    _request.active = False
+    _request.version = None
+
+
+def _version():
+    """The catalogue's version, read from the database at most once per request."""
+    version = getattr(_request, 'version', None)
+    if version is None:
+        version = versions.current(versions.ROOM_TYPES)
+        # Not while this connection is changing room types; the next read
+        # in this transaction has to see its own bump
+        if getattr(_request, 'active', False) and not _changes_pending():
+            _request.version = version
+    return version
+
+
+def _current():
+    """Return this process's catalogue, loading it first if it is stale."""
+    global _catalogue
+    version = _version()
+    with _lock:
+        catalogue = _catalogue
+        if catalogue is None or catalogue.version != version:
+            catalogue = Catalogue.load(version)
+            if not _changes_pending():
+                _catalogue = catalogue
+        return catalogue
+
+
+def room_types():
+    """Every room type, ordered by name."""
+    return _current().records
+
+
+def get(room_type_id):
+    """The room type with the given id (an int or a digit string), or None."""
+    try:
+        room_type_id = int(room_type_id)
+    except (TypeError, ValueError):
+        return None
+    return _current().by_id.get(room_type_id)
+
+
+def bump():
+    """
+    Give the catalogue a new version in the current transaction. Reads later
+    in it see the change (without keeping it), other workers see it once it
+    commits, and a rollback takes the version back with the change.
+    """
+    versions.bump(versions.ROOM_TYPES)
+    _request.version = None
+    transaction.on_commit(_Pending())
+
+
+def reset():
+    """Drop this process's catalogue; the next read loads it again."""
+    global _catalogue
+    with _lock:
+        _catalogue = None
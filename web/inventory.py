@@ -0,0 +1,294 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Per-night inventory ledger (RoomTypeNight). The signal handlers in
+signals.py call into this module whenever a Reservation or Room changes,
+so availability can be read as the minimum free count over a stay's nights.
+"""
+
+from datetime import timedelta
+from functools import reduce
+import operator
+from django.db import transaction
+from django.db.models import Exists, F, FilteredRelation, OuterRef, Q
+from . import account_summary, versions
+from .models import RoomType, Room, RoomMaintenanceWindow, Reservation, RoomTypeNight, status_rank
+
+# Reservation statuses that take a room out of inventory
+BLOCKING_STATUSES = ("Hold", "Confirmed")
+
+# Room statuses that still count as in service
+IN_SERVICE_STATUSES = ("Available", "Occupied", "Cleaning")
+
+
+def iter_nights(start, end):
+    """Yield each night (as its date) from start up to but not including end."""
+    night = start
+    while night < end:
+        yield night
+        night += timedelta(days=1)
+
+
+def blocking_span(status, room_type_id, start_date, end_date):
+    """
+    Return (room_type_id, start_date, end_date) if a reservation in this state
+    takes up inventory, otherwise None.
+    """
+    if status not in BLOCKING_STATUSES or not room_type_id:
+        return None
+    if not start_date or not end_date or start_date >= end_date:
+        return None
+    return (room_type_id, start_date, end_date)
+
+
+def merge_windows(windows):
+    """Merge (start, end) windows into a sorted list that does not overlap."""
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def room_service(room_type_ids, start=None, end=None):
+    """
+    Return [(room_id, room_type_id, [(start, end) maintenance windows])] for
+    the rooms of the given types that can be used at all, in room number
+    order, in one query. Only windows overlapping [start, end) are included
+    (either bound may be left open), merged per room.
+
+    A room counts every night none of its windows covers. A room in
+    Maintenance with no windows at all is out of service indefinitely and
+    is left out.
+    """
+    overlapping = Q()
+    if start:
+        overlapping &= Q(maintenance_windows__end_date__gt=start)
+    if end:
+        overlapping &= Q(maintenance_windows__start_date__lt=end)
+    rooms = Room.objects.filter(room_type_id__in=room_type_ids).annotate(
+        has_windows=Exists(RoomMaintenanceWindow.objects.filter(room=OuterRef('pk'))),
+        window=FilteredRelation('maintenance_windows', condition=overlapping),
+    ).order_by('room_number').values_list(
+        'id', 'room_type_id', 'status', 'has_windows', 'window__start_date', 'window__end_date'
+    )
+
+    service = {}
+    for room_id, room_type_id, status, has_windows, window_start, window_end in rooms:
+        if status not in IN_SERVICE_STATUSES and not (status == "Maintenance" and has_windows):
+            continue
+        windows = service.setdefault(room_id, (room_type_id, []))[1]
+        if window_start:
+            windows.append((window_start, window_end))
+    return [
+        (room_id, room_type_id, merge_windows(windows))
+        for room_id, (room_type_id, windows) in service.items()
+    ]
+
+
+def nightly_capacity(start, end, room_type_ids):
+    """
+    Return {room_type_id: [rooms in service per night]} for the nights in
+    [start, end), taking each room's maintenance windows off the nights they cover.
+    """
+    days = (end - start).days
+    capacity = {room_type_id: [0] * days for room_type_id in room_type_ids}
+    for _, room_type_id, windows in room_service(room_type_ids, start, end):
+        row = capacity[room_type_id]
+        for i in range(days):
+            row[i] += 1
+        for window_start, window_end in windows:
+            for i in range(max(0, (window_start - start).days), min(days, (window_end - start).days)):
+                row[i] -= 1
+    return capacity
+
+
+def _sweep(start, end, room_type_ids, stays):
+    """
+    Turn (room_type_id, start_date, end_date) stays into
+    {room_type_id: [stays covering each night]} for the nights in [start, end).
+    """
+    days = (end - start).days
+    deltas = {room_type_id: [0] * (days + 1) for room_type_id in room_type_ids}
+    for room_type_id, start_date, end_date in stays:
+        row = deltas[room_type_id]
+        row[max(0, (start_date - start).days)] += 1
+        row[min(days, (end_date - start).days)] -= 1
+
+    counts = {}
+    for room_type_id, row in deltas.items():
+        running = 0
+        nights = []
+        for delta in row[:days]:
+            running += delta
+            nights.append(running)
+        counts[room_type_id] = nights
+    return counts
+
+
+def _overlapping(queryset, start, end, room_type_ids):
+    return queryset.filter(
+        room_type_id__in=room_type_ids,
+        start_date__lt=end,
+        end_date__gt=start,
+    ).values_list('room_type_id', 'start_date', 'end_date')
+
+
+def nightly_demand(start, end, room_type_ids):
+    """
+    Return {room_type_id: [blocking reservations per night]} for the nights in
+    [start, end), using one query and a sweep over the reservation boundaries.
+    This is what the ledger's booked column counts.
+    """
+    reservations = Reservation.objects.filter(status__in=BLOCKING_STATUSES)
+    return _sweep(start, end, room_type_ids, _overlapping(reservations, start, end, room_type_ids))
+
+
+def nightly_blocking(start, end, room_type_ids, at=None):
+    """
+    Like nightly_demand, but counts only reservations that block inventory at
+    the given moment (default now), so holds past their expiration_time
+    are left out.
+    """
+    reservations = Reservation.objects.blocking_inventory(at)
+    return _sweep(start, end, room_type_ids, _overlapping(reservations, start, end, room_type_ids))
+
+
+def lapsed_hold_nights(start, end, room_type_ids, at=None):
+    """
+    Return {room_type_id: [lapsed holds per night]}: holds the ledger still
+    counts as booked but that no longer block inventory, so availability can
+    treat their nights as free before the expiry job gets to them.
+    """
+    holds = Reservation.objects.lapsed_holds(at)
+    return _sweep(start, end, room_type_ids, _overlapping(holds, start, end, room_type_ids))
+
+
+def ensure_nights(start, end, room_type_ids=None):
+    """
+    Create any missing ledger rows for the nights in [start, end), counting
+    capacity and bookings from the current Room and Reservation tables.
+    """
+    if start >= end:
+        return
+    if room_type_ids is None:
+        room_type_ids = list(RoomType.objects.values_list('id', flat=True))
+    room_type_ids = list(room_type_ids)
+    if not room_type_ids:
+        return
+
+    existing = set(RoomTypeNight.objects.filter(
+        room_type_id__in=room_type_ids,
+        date__gte=start,
+        date__lt=end,
+    ).values_list('room_type_id', 'date'))
+    nights = list(iter_nights(start, end))
+    if len(existing) == len(nights) * len(room_type_ids):
+        return
+
+    capacity = nightly_capacity(start, end, room_type_ids)
+    demand = nightly_demand(start, end, room_type_ids)
+    missing = [
+        RoomTypeNight(
+            room_type_id=room_type_id,
+            date=night,
+            capacity=capacity[room_type_id][i],
+            booked=demand[room_type_id][i],
+        )
+        for room_type_id in room_type_ids
+        for i, night in enumerate(nights)
+        if (room_type_id, night) not in existing
+    ]
+    # Another worker may be filling the same nights; the unique constraint sorts it out
+    RoomTypeNight.objects.bulk_create(missing, ignore_conflicts=True)
+
+
+def lock_nights(spans):
+    """
+    Fill in and lock the ledger rows covering the given blocking spans, in
+    (room_type, date) order, and return them. Every writer that holds more
+    than one span's nights locks them through here first, so none of them
+    can deadlock another.
+    """
+    spans = [span for span in spans if span]
+    if not spans:
+        return []
+    for room_type_id, start, end in spans:
+        ensure_nights(start, end, [room_type_id])
+    match = reduce(operator.or_, [
+        Q(room_type_id=room_type_id, date__gte=start, date__lt=end)
+        for room_type_id, start, end in spans
+    ])
+    return list(RoomTypeNight.objects.select_for_update().filter(match).order_by('room_type_id', 'date'))
+
+
+def adjust_booked(span, delta):
+    """Add delta to the booked count of every night in a blocking span."""
+    room_type_id, start, end = span
+    RoomTypeNight.objects.filter(
+        room_type_id=room_type_id,
+        date__gte=start,
+        date__lt=end,
+    ).update(booked=F('booked') + delta)
+
+
+def refresh_capacity(room_type_id):
+    """Recount the capacity of every existing ledger row for a room type."""
+    rooms = room_service([room_type_id])
+    nights = RoomTypeNight.objects.filter(room_type_id=room_type_id)
+    with transaction.atomic():
+        nights.update(capacity=len(rooms))
+        # Each room's windows are merged, so no night is taken off twice for one room
+        for _, _, windows in rooms:
+            for start, end in windows:
+                nights.filter(date__gte=start, date__lt=end).update(capacity=F('capacity') - 1)
+
+
+def cancel_expired_holds(now, limit=None):
+    """
+    Cancel Holds whose expiration_time has passed and release their nights.
+    With a limit, only that many (oldest first) are cancelled per call.
+    """
+    with transaction.atomic():
+        expired = Reservation.objects.select_for_update().filter(
+            status='Hold',
+            expiration_time__isnull=False,
+            expiration_time__lt=now,
+        ).order_by('expiration_time').values_list('id', 'room_type_id', 'start_date', 'end_date', 'customer_id')
+        expired = list(expired[:limit] if limit else expired)
+        if not expired:
+            return 0
+
+        # update() skips the post_save handlers, so release the nights and
+        # drop the account summaries here
+        Reservation.objects.filter(id__in=[row[0] for row in expired]).update(
+            status='Cancelled', status_rank=status_rank('Cancelled'),
+        )
+        account_summary.invalidate(*[row[4] for row in expired])
+        spans = [
+            blocking_span('Hold', room_type_id, start_date, end_date)
+            for _, room_type_id, start_date, end_date, _ in expired
+        ]
+        # The holds come oldest first, not in ledger order, so lock all their
+        # nights in (room_type, date) order before touching any of them, as
+        # bookings do; otherwise this could deadlock against one
+        lock_nights(spans)
+        for span in spans:
+            if span:
+                adjust_booked(span, -1)
+        versions.bump(versions.INVENTORY)
+    return len(expired)
+
+
+def rebuild(start, end):
+    """Throw away the whole ledger and recount the nights in [start, end) from scratch."""
+    with transaction.atomic():
+        RoomTypeNight.objects.all().delete()
+        ensure_nights(start, end)
+        versions.bump(versions.INVENTORY)
@@ -0,0 +1,90 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+A small in-project scheduler for housekeeping jobs, run by the
+run_scheduler management command. A lease row in the database makes sure
+only one scheduler process runs the jobs at a time.
+"""
+
+import time
+from collections import namedtuple
+from datetime import timedelta
+from django.db.models import Q
+from django.utils import timezone
+from . import inventory
+from .models import JobLease, JobRun
+
+Job = namedtuple("Job", ["name", "interval", "func"])
+
+# Rows changed per transaction, and transactions per run, for hold expiry
+EXPIRE_HOLDS_BATCH = 500
+EXPIRE_HOLDS_MAX_BATCHES = 20
+
+
+def acquire_lease(name, owner, ttl):
+    """
+    Take or renew the named lease for owner. Returns True if owner now
+    holds it, False if another process holds an unexpired lease.
+    """
+    now = timezone.now()
+    JobLease.objects.get_or_create(name=name, defaults={"expires_at": now})
+    # A single conditional UPDATE, so two processes can never both win
+    taken = JobLease.objects.filter(name=name).filter(
+        Q(owner=owner) | Q(expires_at__lte=now)
+    ).update(owner=owner, expires_at=now + ttl)
+    return taken == 1
+
+
+def release_lease(name, owner):
+    """Give the lease up early so another process can take over straight away."""
+    JobLease.objects.filter(name=name, owner=owner).update(expires_at=timezone.now())
+
+
+def expire_holds():
+    """Cancel expired holds in bounded batches. Returns the number cancelled."""
+    total = 0
+    for _ in range(EXPIRE_HOLDS_MAX_BATCHES):
+        cancelled = inventory.cancel_expired_holds(timezone.now(), limit=EXPIRE_HOLDS_BATCH)
+        total += cancelled
+        if cancelled < EXPIRE_HOLDS_BATCH:
+            break
+    return total
+
+
+JOBS = [
+    Job("expire_holds", timedelta(minutes=1), expire_holds),
+]
+
+
+def is_due(job, now):
+    """A job is due if it has not run within its interval (on any scheduler)."""
+    return not JobRun.objects.filter(name=job.name, started_at__gt=now - job.interval).exists()
+
+
+def run_job(job):
+    """Run a job once and record how long it took and how many rows it changed."""
+    started_at = timezone.now()
+    started = time.perf_counter()
+    rows = 0
+    error = ""
+    try:
+        rows = job.func() or 0
+    except Exception as e:
+        error = repr(e)
+    return JobRun.objects.create(
+        name=job.name,
+        started_at=started_at,
+        duration_ms=round((time.perf_counter() - started) * 1000),
+        rows=rows,
+        error=error,
+    )
+
+
+def run_due_jobs(jobs=None):
+    """Run every job that is due and return the JobRun records."""
+    now = timezone.now()
+    return [run_job(job) for job in (jobs or JOBS) if is_due(job, now)]
@@ -0,0 +1,33 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from web import assignment
+
+class Command(BaseCommand):
+    help = "Give every current and future Confirmed reservation a specific room of its type."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reshuffle",
+            action="store_true",
+            help="Repartition all stays not yet checked in, not just the unassigned ones.",
+        )
+        parser.add_argument("--room-type", type=int, action="append", dest="room_types",
+                            help="Only this room type id (may be repeated).")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        changed, unplaced = assignment.assign_rooms(options["room_types"], reshuffle=options["reshuffle"])
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"Assigned {changed} reservations in {elapsed:.0f} ms.")
+        if unplaced:
+            self.stdout.write(self.style.WARNING(
+                f"{unplaced} reservations could not be given a room (more stays than rooms in service)."
+            ))
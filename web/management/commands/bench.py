@@ -0,0 +1,268 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+"""
+
+import io
+import json
+import random
+import time
+from contextlib import redirect_stdout
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from web import assignment, occupancy, public_ids
+from web.models import Customer, Reservation, RoomType
+from web.views.helpers import get_available_rooms
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main views through the test client and report p50/p95 latency "
+        "and query counts per view as JSON. Everything runs in a transaction "
+        "that is rolled back, so the database is left untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="Requests per view.")
+        parser.add_argument("--seed", type=int, default=460)
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument(
+            "--backend",
+            choices=["sql", "numpy"],
+            default=settings.AVAILABILITY_BACKEND,
+            help="Availability backend to bench (see AVAILABILITY_BACKEND).",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        # Bench as the customer with the longest history, the worst case for account/search
+        customer = Customer.objects.filter(user__is_staff=False).annotate(
+            history=Count('reservation')
+        ).order_by('-history').select_related('user').first()
+        room_type = RoomType.objects.order_by('id').first()
+        if not customer or not room_type:
+            raise CommandError("Nothing to benchmark against. Run seed_load first.")
+
+        results = {}
+        with override_settings(
+            ALLOWED_HOSTS=["testserver"],
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+            AVAILABILITY_BACKEND=options["backend"],
+        ):
+            # The availability engine on its own, outside the transaction below
+            engine = self.measure_engine(options["iterations"])
+            with transaction.atomic():
+                rooms = self.measure_assignment()
+                numbers = self.measure_public_ids(customer, room_type, options["iterations"])
+                client = Client()
+                client.force_login(customer.user)
+                for name, make_request in self.scenarios(customer, room_type).items():
+                    results[name] = self.measure(client, make_request, options["iterations"])
+                transaction.set_rollback(True)
+            # The matrix followed writes that were just rolled back
+            occupancy.reset()
+
+        report = {
+            "vendor": connection.vendor,
+            "backend": options["backend"],
+            "iterations": options["iterations"],
+            "reservations": Reservation.objects.count(),
+            "customer_history": customer.history,
+            "get_available_rooms": engine,
+            "assign_rooms": rooms,
+            "public_ids": numbers,
+            "views": results,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def random_stay(self):
+        check_in = timezone.localdate() + timedelta(days=self.rng.randint(1, 90))
+        return check_in, check_in + timedelta(days=self.rng.randint(1, 5))
+
+    def scenarios(self, customer, room_type):
+        """Return {view name: callable(client) -> response}."""
+        user = customer.user
+        reservation = Reservation.objects.filter(customer=customer).order_by('-id').first()
+
+        def reservation_search(client):
+            check_in, check_out = self.random_stay()
+            return client.get(reverse("reservation"), {
+                "check_in": check_in.isoformat(),
+                "check_out": check_out.isoformat(),
+                "guests": 1,
+            })
+
+        def save_reservation(client):
+            check_in, check_out = self.random_stay()
+            return client.post(reverse("save_reservation"), {
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "email": user.email,
+                "phone_number": customer.phone_number or "555-555-5555",
+                "check_in": check_in.isoformat(),
+                "check_out": check_out.isoformat(),
+                "guests_final": 1,
+                "room_type": room_type.id,
+                "status": "Hold",
+            })
+
+        def search(client):
+            return client.post(reverse("search"), {
+                "search_type": "name",
+                "last_name": user.last_name,
+            })
+
+        def account(client):
+            return client.get(reverse("account"))
+
+        scenarios = {
+            "reservation": reservation_search,
+            "save_reservation": save_reservation,
+            "search": search,
+            "account": account,
+        }
+        if reservation:
+            scenarios["reservation_detail"] = lambda client: client.get(
+                reverse("reservation_detail", args=[reservation.public_id])
+            )
+        return scenarios
+
+    def measure_engine(self, iterations):
+        """Time get_available_rooms itself (in microseconds), after one warm-up call."""
+        get_available_rooms(*self.random_stay())
+        timings = []
+        queries = []
+        for _ in range(iterations):
+            check_in, check_out = self.random_stay()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                get_available_rooms(check_in, check_out, 1)
+                timings.append((time.perf_counter() - started) * 1000000)
+            queries.append(len(captured))
+        return {
+            "p50_us": round(percentile(timings, 50), 1),
+            "p95_us": round(percentile(timings, 95), 1),
+            "queries_p50": percentile(queries, 50),
+            "queries_max": max(queries),
+        }
+
+    def measure_assignment(self):
+        """Time a full room reshuffle of every current and future Confirmed stay."""
+        stays = Reservation.objects.filter(status="Confirmed", end_date__gt=timezone.localdate()).count()
+        started = time.perf_counter()
+        changed, unplaced = assignment.assign_rooms(reshuffle=True)
+        return {
+            "stays": stays,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "changed": changed,
+            "unplaced": unplaced,
+        }
+
+    def measure_public_ids(self, customer, room_type, iterations):
+        """
+        Time Reservation inserts (numbered by save()) and lookups by number,
+        both for numbers made from a key and for the old random ones.
+        """
+        user = customer.user
+        inserts = []
+        insert_queries = []
+        for _ in range(iterations):
+            check_in, check_out = self.random_stay()
+            # Cancelled, so the ledger signals have nothing to do
+            reservation = Reservation(
+                customer=customer,
+                guest_first_name=user.first_name,
+                guest_last_name=user.last_name,
+                guest_email=user.email,
+                guest_phone=customer.phone_number or "555-555-5555",
+                status="Cancelled",
+                start_date=check_in,
+                end_date=check_out,
+                room_type_id=room_type.id,
+                total_cost=room_type.price_per_night,
+                guests=1,
+            )
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                reservation.save(force_insert=True)
+                inserts.append((time.perf_counter() - started) * 1000000)
+            insert_queries.append(len(captured))
+
+        # Spread the lookups over the whole table, one pk range probe each
+        top = Reservation.objects.order_by('-pk').values_list('pk', flat=True).first()
+        numbers = [
+            Reservation.objects.filter(pk__gte=self.rng.randint(1, top)).order_by('pk').values_list('public_id', flat=True).first()
+            for _ in range(iterations * 4)
+        ]
+        lookups = {"new": [], "old": []}
+        for number in numbers:
+            if not number:
+                continue
+            started = time.perf_counter()
+            found = Reservation.objects.matching_public_id(number.lower()).first()
+            elapsed = (time.perf_counter() - started) * 1000000
+            if found is None:
+                raise CommandError(f"Lookup of {number} found nothing.")
+            lookups["old" if public_ids.decode(number) is None else "new"].append(elapsed)
+
+        report = {
+            "insert_p50_us": round(percentile(inserts, 50), 1),
+            "insert_p95_us": round(percentile(inserts, 95), 1),
+            "insert_queries_p50": percentile(insert_queries, 50),
+            "insert_queries_max": max(insert_queries),
+        }
+        for style, timings in lookups.items():
+            if timings:
+                report[f"lookup_{style}_count"] = len(timings)
+                report[f"lookup_{style}_p50_us"] = round(percentile(timings, 50), 1)
+                report[f"lookup_{style}_p95_us"] = round(percentile(timings, 95), 1)
+        return report
+
+    def measure(self, client, make_request, iterations):
+        timings = []
+        queries = []
+        statuses = set()
+        for _ in range(iterations):
+            # Keep stray print() calls in views out of the JSON report
+            with CaptureQueriesContext(connection) as captured, redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                # Everything runs in one transaction that is rolled back, so
+                # run each request's commit hooks as if it had committed;
+                # otherwise the NumPy matrix never takes in a booking's
+                # change and is rebuilt on every request after the first write
+                with TestCase.captureOnCommitCallbacks(execute=True):
+                    response = make_request(client)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+            statuses.add(response.status_code)
+        return {
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "queries_p50": percentile(queries, 50),
+            "queries_max": max(queries),
+            "status_codes": sorted(statuses),
+        }
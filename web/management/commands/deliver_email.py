@@ -0,0 +1,31 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+"""
+
+import time
+from django.core.management.base import BaseCommand
+from web import outbox
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox. Safe to run several workers at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--max-attempts", type=int, default=outbox.MAX_ATTEMPTS)
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting when the outbox is empty.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to sleep between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = outbox.deliver_pending(options["batch_size"], options["max_attempts"])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}.")
+            if sent + failed < options["batch_size"]:
+                # Outbox drained for now
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
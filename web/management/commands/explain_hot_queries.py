@@ -0,0 +1,122 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+"""
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from web.inventory import BLOCKING_STATUSES
+from web.public_ids import encode
+from web.models import Reservation, RoomTypeNight
+
+# Tables that must always be read through an index. room_types is left out
+# on purpose: the catalogue is a handful of rows and is meant to be scanned.
+INDEXED_TABLES = ("reservations", "room_type_nights")
+
+# Lists that must come straight off an index in ordered() order, with no sort
+# step (a MySQL filesort), however many reservations there are
+UNSORTED_QUERIES = ("customer history", "staff listing")
+
+
+def hot_queries():
+    """The queries the site runs on every search, booking and account page."""
+    today = timezone.localdate()
+    return {
+        "availability (ledger)": RoomTypeNight.objects.filter(
+            room_type_id=1, date__gte=today, date__lt=today,
+        ).values('capacity', 'booked'),
+        "availability (reservations)": Reservation.objects.filter(
+            room_type_id=1, status__in=BLOCKING_STATUSES,
+            start_date__lt=today, end_date__gt=today,
+        ).values_list('room_type_id', 'start_date', 'end_date'),
+        "hold sweep": Reservation.objects.filter(
+            status='Hold', expiration_time__isnull=False, expiration_time__lt=timezone.now(),
+        ),
+        "customer history": Reservation.objects.ordered().filter(customer_id=1)[:5],
+        "staff listing": Reservation.objects.ordered()[:25],
+        "public_id lookup": Reservation.objects.matching_public_id(encode(1)),
+        "public_id lookup (old numbers)": Reservation.objects.matching_public_id("mbl-00000000"),
+        "search by name": Reservation.objects.matching_name("jane", "doe"),
+        "search by last name": Reservation.objects.matching_name(last_name="doe"),
+        "search by first name": Reservation.objects.matching_name(first_name="jane"),
+        "search by email": Reservation.objects.matching_email("jane@example.com"),
+    }
+
+
+def full_scans(plan):
+    """Return the tables in INDEXED_TABLES that an EXPLAIN plan reads with a full table scan."""
+    vendor = connection.vendor
+    scanned = []
+    for table in INDEXED_TABLES:
+        if vendor == "mysql":
+            for node in _mysql_tables(json.loads(plan)):
+                if node.get("table_name") == table and node.get("access_type") == "ALL":
+                    scanned.append(table)
+        elif vendor == "postgresql":
+            if f"Seq Scan on {table}" in plan:
+                scanned.append(table)
+        else:
+            # SQLite: "SCAN reservations" is a full scan, "SEARCH reservations USING INDEX ..."
+            # is not, and nor is "SCAN reservations USING INDEX ..." (reading an index in
+            # order, like MySQL's "index" access type, for an ORDER BY ... LIMIT)
+            for line in plan.splitlines():
+                words = line.replace("|", " ").replace("`", " ").split()
+                if "SCAN" in words and table in words[words.index("SCAN"):][:2] and "USING" not in words:
+                    scanned.append(table)
+    return sorted(set(scanned))
+
+
+def sorts(plan):
+    """True if an EXPLAIN plan sorts rows rather than reading them in index order."""
+    vendor = connection.vendor
+    if vendor == "mysql":
+        return '"using_filesort": true' in plan
+    if vendor == "postgresql":
+        return any(line.strip().lstrip("->").strip().startswith(("Sort ", "Incremental Sort "))
+                   for line in plan.splitlines())
+    # SQLite: "USE TEMP B-TREE FOR ORDER BY" (or "FOR RIGHT PART OF ORDER BY")
+    return any("TEMP B-TREE" in line and "ORDER BY" in line for line in plan.splitlines())
+
+
+def _mysql_tables(node):
+    """Walk MySQL's JSON EXPLAIN output and yield every "table" entry."""
+    if isinstance(node, dict):
+        if "table" in node and isinstance(node["table"], dict):
+            yield node["table"]
+        for value in node.values():
+            yield from _mysql_tables(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _mysql_tables(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the hot reservation queries and fail if any falls back to a "
+        "full table scan, or if a reservation list has to be sorted."
+    )
+
+    def handle(self, *args, **options):
+        explain_options = {"format": "JSON"} if connection.vendor == "mysql" else {}
+        failures = []
+        for name, queryset in hot_queries().items():
+            plan = queryset.explain(**explain_options)
+            scanned = full_scans(plan)
+            if scanned:
+                failures.append(f"{name}: full scan of {', '.join(scanned)}")
+                self.stdout.write(self.style.ERROR(f"{name}: FULL SCAN"))
+            elif name in UNSORTED_QUERIES and sorts(plan):
+                failures.append(f"{name}: sorted instead of read in index order")
+                self.stdout.write(self.style.ERROR(f"{name}: SORTED"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: indexed"))
+            if options["verbosity"] > 1:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError("Hot queries not served by an index:\n" + "\n".join(failures))
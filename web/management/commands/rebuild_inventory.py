@@ -0,0 +1,32 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+"""
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from web import inventory
+from web.models import RoomTypeNight
+
+class Command(BaseCommand):
+    help = "Throw away the per-night inventory ledger and rebuild it from rooms and reservations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Number of nights from today to pre-fill (others are filled in lazily).",
+        )
+
+    def handle(self, *args, **options):
+        start = timezone.localdate()
+        end = start + timedelta(days=options["days"])
+        inventory.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {RoomTypeNight.objects.count()} ledger rows from {start} to {end}."
+        ))
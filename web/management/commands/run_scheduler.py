@@ -0,0 +1,42 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+"""
+
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from web import jobs
+
+LEASE_NAME = "scheduler"
+
+class Command(BaseCommand):
+    help = "Run scheduled housekeeping jobs (such as expiring holds). Only one instance does work at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tick", type=float, default=15.0, help="Seconds between checks for due jobs.")
+        parser.add_argument("--once", action="store_true", help="Check once and exit instead of looping.")
+
+    def handle(self, *args, **options):
+        owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # The lease outlives a few missed ticks before another process may take over
+        ttl = timedelta(seconds=options["tick"] * 4)
+        try:
+            while True:
+                if jobs.acquire_lease(LEASE_NAME, owner, ttl):
+                    for run in jobs.run_due_jobs():
+                        status = self.style.ERROR(run.error) if run.error else "ok"
+                        self.stdout.write(f"{run.name}: {run.rows} rows in {run.duration_ms} ms ({status})")
+                elif options["once"]:
+                    self.stdout.write("Another scheduler holds the lease; nothing to do.")
+                if options["once"]:
+                    break
+                time.sleep(options["tick"])
+        finally:
+            jobs.release_lease(LEASE_NAME, owner)
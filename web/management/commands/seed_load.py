@@ -0,0 +1,217 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+"""
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from web import catalogue, inventory, public_ids
+from web.models import Customer, RoomType, Room, Reservation, status_rank
+
+# Everything this command creates can be found (and flushed) by these markers
+ROOM_TYPE_PREFIX = "Load Type "
+ROOM_PREFIX = "L"
+EMAIL_DOMAIN = "seed.moffatbay.test"
+
+# Most stays are a long weekend; a few run for a week or two
+STAY_LENGTHS = [1, 2, 3, 4, 5, 6, 7, 10, 14]
+STAY_WEIGHTS = [20, 30, 20, 10, 6, 4, 6, 2, 2]
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic room types, rooms, customers and reservations for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--room-types", type=int, default=50)
+        parser.add_argument("--rooms", type=int, default=2000)
+        parser.add_argument("--customers", type=int, default=100_000)
+        parser.add_argument("--reservations", type=int, default=1_000_000)
+        parser.add_argument("--days-back", type=int, default=365, help="How far into the past stays start.")
+        parser.add_argument("--days-ahead", type=int, default=365, help="How far into the future stays start.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=460, help="Random seed, so runs are repeatable.")
+        parser.add_argument("--flush", action="store_true", help="Delete previously seeded data first.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+
+        if options["flush"]:
+            self.flush()
+        elif RoomType.objects.filter(name__startswith=ROOM_TYPE_PREFIX).exists():
+            raise CommandError("Seeded data already exists. Re-run with --flush to replace it.")
+
+        with transaction.atomic():
+            room_types = self.create_room_types(options["room_types"])
+            self.create_rooms(room_types, options["rooms"])
+            customers = self.create_customers(options["customers"])
+            self.create_reservations(
+                room_types, customers, options["reservations"],
+                options["days_back"], options["days_ahead"],
+            )
+
+        # bulk_create skips the ledger signals, so recount it in one go
+        today = timezone.localdate()
+        inventory.rebuild(today, today + timedelta(days=options["days_ahead"]))
+        self.stdout.write(self.style.SUCCESS("Seeding complete."))
+
+    def flush(self):
+        with transaction.atomic():
+            seeded_types = RoomType.objects.filter(name__startswith=ROOM_TYPE_PREFIX)
+            # A plain delete() would fire the ledger signals once per row; the
+            # ledger is rebuilt after seeding anyway, so delete in one statement
+            seeded = Reservation.objects.filter(room_type__in=seeded_types)
+            seeded._raw_delete(seeded.db)
+            Room.objects.filter(room_type__in=seeded_types).delete()
+            seeded_types.delete()
+            User.objects.filter(email__endswith="@" + EMAIL_DOMAIN).delete()
+        self.stdout.write("Flushed previously seeded data.")
+
+    def create_room_types(self, count):
+        room_types = []
+        for i in range(count):
+            max_guests = self.rng.choice([2, 2, 4, 4, 6])
+            room_types.append(RoomType(
+                name=f"{ROOM_TYPE_PREFIX}{i + 1:03d}",
+                price_per_night=Decimal(self.rng.randrange(9000, 40000)) / 100,
+                beds=max(1, max_guests // 2),
+                max_guests=max_guests,
+                description="Generated by seed_load.",
+            ))
+        RoomType.objects.bulk_create(room_types, batch_size=self.batch_size)
+        catalogue.bump()  # bulk_create skips the RoomType signals too
+        room_types = list(RoomType.objects.filter(name__startswith=ROOM_TYPE_PREFIX).order_by('id'))
+        self.stdout.write(f"Created {len(room_types)} room types.")
+        return room_types
+
+    def create_rooms(self, room_types, count):
+        rooms = [
+            Room(
+                room_number=f"{ROOM_PREFIX}{i + 1:05d}",
+                # Spread rooms round-robin so every type has some
+                room_type=room_types[i % len(room_types)],
+                status=self.rng.choices(["Available", "Occupied", "Cleaning"], [70, 25, 5])[0],
+            )
+            for i in range(count)
+        ]
+        Room.objects.bulk_create(rooms, batch_size=self.batch_size)
+        self.stdout.write(f"Created {count} rooms.")
+
+    def create_customers(self, count):
+        # Hashing a real password per user would dominate the run time
+        password = make_password(None)
+        for start in range(0, count, self.batch_size):
+            users = []
+            for i in range(start, min(count, start + self.batch_size)):
+                email = f"guest{i + 1}@{EMAIL_DOMAIN}"
+                users.append(User(
+                    username=email, email=email, password=password,
+                    first_name=f"First{i + 1}", last_name=f"Last{i + 1}",
+                ))
+            User.objects.bulk_create(users)
+
+        users = User.objects.filter(email__endswith="@" + EMAIL_DOMAIN).only(
+            'id', 'first_name', 'last_name', 'email'
+        )
+        # bulk_create skips the post_save signal that normally creates the
+        # profile, and save(), which fills the search columns
+        customers = []
+        for i, user in enumerate(users):
+            customer = Customer(user=user, phone_number=f"555-{i // 10000 % 1000:03d}-{i % 10000:04d}")
+            customer.fill_search_fields()
+            customers.append(customer)
+        Customer.objects.bulk_create(customers, batch_size=self.batch_size)
+        customers = list(Customer.objects.filter(
+            user__email__endswith="@" + EMAIL_DOMAIN
+        ).select_related('user'))
+        self.stdout.write(f"Created {len(customers)} customers.")
+        return customers
+
+    def random_start(self, today, days_back, days_ahead):
+        """Pick a check-in date, favouring summer and Friday/Saturday arrivals."""
+        while True:
+            start = today + timedelta(days=self.rng.randint(-days_back, days_ahead))
+            weight = 1.0
+            if start.month in (6, 7, 8):
+                weight += 1.0
+            if start.weekday() in (4, 5):
+                weight += 0.5
+            if self.rng.random() * 2.5 < weight:
+                return start
+
+    def create_reservations(self, room_types, customers, count, days_back, days_ahead):
+        today = timezone.localdate()
+        now = timezone.now()
+        first_night = today - timedelta(days=days_back)
+        total_nights = days_back + days_ahead + max(STAY_LENGTHS) + 1
+
+        # Track nights booked per room type so confirmed stays never oversell
+        capacity = {rt.id: 0 for rt in room_types}
+        for room_type_id in Room.objects.filter(room_type__in=room_types).values_list('room_type_id', flat=True):
+            capacity[room_type_id] += 1
+        booked = {rt.id: [0] * total_nights for rt in room_types}
+
+        # bulk_create skips save(), so take the keys (and numbers) in one go
+        ids = iter(public_ids.reservation_ids.reserve(count))
+
+        created = 0
+        batch = []
+        for _ in range(count):
+            room_type = self.rng.choice(room_types)
+            customer = self.rng.choice(customers)
+            start = self.random_start(today, days_back, days_ahead)
+            nights = self.rng.choices(STAY_LENGTHS, STAY_WEIGHTS)[0]
+            end = start + timedelta(days=nights)
+            offset = (start - first_night).days
+            row = booked[room_type.id]
+
+            fits = all(row[offset + i] < capacity[room_type.id] for i in range(nights))
+            if not fits or self.rng.random() < 0.08:
+                status = "Cancelled"
+            elif start > today and self.rng.random() < 0.05:
+                status = "Hold"
+            else:
+                status = "Confirmed"
+            if status != "Cancelled":
+                for i in range(nights):
+                    row[offset + i] += 1
+
+            pk = next(ids)
+            reservation = Reservation(
+                id=pk,
+                public_id=public_ids.encode(pk),
+                customer=customer,
+                guest_first_name=customer.user.first_name,
+                guest_last_name=customer.user.last_name,
+                guest_phone=customer.phone_number,
+                guest_email=customer.user.email,
+                expiration_time=now + timedelta(hours=self.rng.randint(1, 24)) if status == "Hold" else None,
+                status=status,
+                status_rank=status_rank(status),
+                start_date=start,
+                end_date=end,
+                room_type=room_type,
+                total_cost=room_type.price_per_night * nights,
+                guests=self.rng.randint(1, room_type.max_guests),
+            )
+            # bulk_create skips save(), which normally fills these
+            reservation.fill_search_fields()
+            batch.append(reservation)
+            if len(batch) >= self.batch_size:
+                Reservation.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+                self.stdout.write(f"  {created} reservations...")
+        if batch:
+            Reservation.objects.bulk_create(batch)
+            created += len(batch)
+        self.stdout.write(f"Created {created} reservations.")
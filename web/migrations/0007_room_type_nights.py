@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0006_alter_reservation_public_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomTypeNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='The night being counted (the night starting on this date).')),
+                ('capacity', models.IntegerField(default=0, help_text='Number of rooms of this type in service for the night.')),
+                ('booked', models.IntegerField(default=0, help_text='Number of Hold/Confirmed reservations covering the night.')),
+                ('room_type', models.ForeignKey(help_text='The room type this ledger row counts.', on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='web.roomtype')),
+            ],
+            options={
+                'db_table': 'room_type_nights',
+                'indexes': [models.Index(fields=['room_type', 'date', 'capacity', 'booked'], name='room_type_night_cover')],
+                'constraints': [models.UniqueConstraint(fields=('room_type', 'date'), name='room_type_night_unique')],
+            },
+        ),
+    ]
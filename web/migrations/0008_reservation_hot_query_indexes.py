@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0007_room_type_nights'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['room_type', 'status', 'start_date', 'end_date'], name='res_availability_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'expiration_time'], name='res_hold_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['customer', 'status', 'start_date'], name='res_customer_history_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0008_reservation_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(help_text='Subject line of the email.', max_length=255)),
+                ('body', models.TextField(help_text='Plain text body of the email.')),
+                ('from_email', models.CharField(help_text='Sender address.', max_length=254)),
+                ('recipients', models.JSONField(help_text='List of recipient addresses.')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Sending', 'Sending'), ('Sent', 'Sent'), ('Failed', 'Failed')], default='Pending', help_text='Delivery status of the email.', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0, help_text='Number of failed delivery attempts so far.')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the email may next be picked up (also the lease expiry while Sending).')),
+                ('last_error', models.TextField(blank=True, default='', help_text='Error from the most recent failed attempt.')),
+                ('created_time', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the email was queued.')),
+                ('sent_time', models.DateTimeField(blank=True, help_text='Timestamp when the email was delivered.', null=True)),
+            ],
+            options={
+                'db_table': 'email_outbox',
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx')],
+            },
+        ),
+    ]
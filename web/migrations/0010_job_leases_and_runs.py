@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0009_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the lease (e.g. scheduler).', max_length=50, unique=True)),
+                ('owner', models.CharField(blank=True, default='', help_text='Identifier of the process holding the lease.', max_length=100)),
+                ('expires_at', models.DateTimeField(help_text='When the lease lapses unless renewed.')),
+            ],
+            options={
+                'db_table': 'job_leases',
+            },
+        ),
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the job that ran.', max_length=50)),
+                ('started_at', models.DateTimeField(help_text='When the run started.')),
+                ('duration_ms', models.PositiveIntegerField(help_text='How long the run took, in milliseconds.')),
+                ('rows', models.PositiveIntegerField(default=0, help_text='Number of rows the run changed.')),
+                ('error', models.TextField(blank=True, default='', help_text='Error raised by the run, if any.')),
+            ],
+            options={
+                'db_table': 'job_runs',
+                'indexes': [models.Index(fields=['name', 'started_at'], name='job_run_name_started_idx')],
+            },
+        ),
+    ]
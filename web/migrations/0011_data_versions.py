@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0010_job_leases_and_runs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the data set (e.g. inventory).', max_length=50, unique=True)),
+                ('value', models.PositiveBigIntegerField(default=0, help_text='Goes up by one with every change.')),
+            ],
+            options={
+                'db_table': 'data_versions',
+            },
+        ),
+    ]
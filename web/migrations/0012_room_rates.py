@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0011_data_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='The night this rate applies to (the night starting on this date).')),
+                ('price', models.DecimalField(decimal_places=2, help_text='Price for the night.', max_digits=8)),
+                ('label', models.CharField(blank=True, default='', help_text='Optional note on why the rate differs (e.g. Summer, Salmon Festival).', max_length=50)),
+                ('room_type', models.ForeignKey(help_text='The room type this rate applies to.', on_delete=django.db.models.deletion.CASCADE, related_name='rates', to='web.roomtype')),
+            ],
+            options={
+                'db_table': 'room_rates',
+                'constraints': [models.UniqueConstraint(fields=('room_type', 'date'), name='room_rate_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:13
+
+import django.db.models.deletion
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def copy_maintenance_until(apps, schema_editor):
+    """
+    A room in Maintenance with a maintenance_until date was out of service
+    through that date, so it gets a window ending the night after. Its start
+    was never recorded; today is as early as matters for booking. Rooms in
+    Maintenance with no date stay out with no window, as before.
+    """
+    Room = apps.get_model('web', 'Room')
+    RoomMaintenanceWindow = apps.get_model('web', 'RoomMaintenanceWindow')
+    today = timezone.localdate()
+
+    rooms = Room.objects.filter(status='Maintenance', maintenance_until__isnull=False)
+    RoomMaintenanceWindow.objects.bulk_create([
+        RoomMaintenanceWindow(
+            room_id=room_id,
+            start_date=min(today, maintenance_until),
+            end_date=maintenance_until + timedelta(days=1),
+        )
+        for room_id, maintenance_until in rooms.values_list('id', 'maintenance_until')
+    ])
+
+
+def restore_maintenance_until(apps, schema_editor):
+    Room = apps.get_model('web', 'Room')
+    RoomMaintenanceWindow = apps.get_model('web', 'RoomMaintenanceWindow')
+
+    last_nights = {}
+    for room_id, end_date in RoomMaintenanceWindow.objects.values_list('room_id', 'end_date'):
+        last_nights[room_id] = max(last_nights.get(room_id, end_date), end_date)
+    for room_id, end_date in last_nights.items():
+        Room.objects.filter(pk=room_id, status='Maintenance').update(maintenance_until=end_date - timedelta(days=1))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0012_room_rates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomMaintenanceWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(help_text='First night the room is out of service.')),
+                ('end_date', models.DateField(help_text='First night the room is back in service.')),
+                ('reason', models.CharField(blank=True, default='', help_text='Optional note on the work being done (e.g. Carpet replacement).', max_length=100)),
+                ('room', models.ForeignKey(help_text='The room that is out of service.', on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_windows', to='web.room')),
+            ],
+            options={
+                'db_table': 'room_maintenance_windows',
+                'indexes': [models.Index(fields=['end_date', 'start_date', 'room'], name='maint_window_range_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_date__gt', models.F('start_date'))), name='maint_window_dates')],
+            },
+        ),
+        migrations.RunPython(copy_maintenance_until, reverse_code=restore_maintenance_until),
+        migrations.RemoveField(
+            model_name='room',
+            name='maintenance_until',
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:16
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce, Lower, Trim, Upper
+
+# Rows per UPDATE, so a big table isn't locked in one statement
+BATCH_SIZE = 10000
+
+
+def fill_search_columns(apps, schema_editor):
+    """Same rules as Reservation.fill_search_fields (plus uppercasing any stray public_ids), in SQL."""
+    Reservation = apps.get_model('web', 'Reservation')
+    User = apps.get_model('auth', 'User')
+
+    account_email = User.objects.filter(customer__id=OuterRef('customer_id')).values('email')[:1]
+    last_pk = Reservation.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for first in range(0, last_pk + 1, BATCH_SIZE):
+        Reservation.objects.filter(pk__gte=first, pk__lt=first + BATCH_SIZE).update(
+            public_id=Upper(Trim('public_id')),
+            search_first_name=Lower(Trim('guest_first_name')),
+            search_last_name=Lower(Trim('guest_last_name')),
+            search_email=Lower(Trim(Coalesce(Subquery(account_email), 'guest_email'))),
+        )
+
+
+# Django has no FULLTEXT index type, so MySQL gets it by hand; see
+# ReservationQuerySet.matching_name (SEARCH_FULLTEXT) for the query side
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            "CREATE FULLTEXT INDEX res_search_name_ft ON reservations (search_first_name, search_last_name)"
+        )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute("DROP INDEX res_search_name_ft ON reservations")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0013_room_maintenance_windows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='search_email',
+            field=models.CharField(blank=True, default='', editable=False, help_text="The linked customer's account email (or guest_email if none) in lowercase, for indexed email search.", max_length=254),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='search_first_name',
+            field=models.CharField(blank=True, default='', editable=False, help_text='guest_first_name in lowercase, for indexed name search.', max_length=35),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='search_last_name',
+            field=models.CharField(blank=True, default='', editable=False, help_text='guest_last_name in lowercase, for indexed name search.', max_length=35),
+        ),
+        migrations.RunPython(fill_search_columns, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['search_last_name', 'search_first_name'], name='res_search_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['search_first_name'], name='res_search_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['search_email'], name='res_search_email_idx'),
+        ),
+        migrations.RunPython(add_fulltext_index, reverse_code=drop_fulltext_index),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:27
+
+import re
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Lower, Trim
+
+# Rows per UPDATE, so a big table isn't locked in one statement
+BATCH_SIZE = 10000
+
+
+def fill_search_columns(apps, schema_editor):
+    """Same rules as Customer.fill_search_fields."""
+    Customer = apps.get_model('web', 'Customer')
+    User = apps.get_model('auth', 'User')
+
+    users = User.objects.filter(pk=OuterRef('user_id'))
+    last_pk = Customer.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for first in range(0, last_pk + 1, BATCH_SIZE):
+        Customer.objects.filter(pk__gte=first, pk__lt=first + BATCH_SIZE).update(
+            search_first_name=Lower(Trim(Subquery(users.values('first_name')[:1]))),
+            search_last_name=Lower(Trim(Subquery(users.values('last_name')[:1]))),
+            search_email=Lower(Trim(Subquery(users.values('email')[:1]))),
+        )
+
+    # Stripping punctuation portably is easier in Python; one UPDATE per
+    # distinct number
+    phones = Customer.objects.exclude(phone_number__isnull=True).exclude(phone_number='')
+    for phone in phones.values_list('phone_number', flat=True).distinct():
+        Customer.objects.filter(phone_number=phone).update(search_phone=re.sub(r"\D", "", phone))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0015_reservation_status_rank'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='search_email',
+            field=models.CharField(blank=True, default='', editable=False, help_text="The user's email in lowercase, for indexed customer lookup.", max_length=254),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='search_first_name',
+            field=models.CharField(blank=True, default='', editable=False, help_text="The user's first name in lowercase, for indexed customer lookup.", max_length=150),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='search_last_name',
+            field=models.CharField(blank=True, default='', editable=False, help_text="The user's last name in lowercase, for indexed customer lookup.", max_length=150),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='search_phone',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Just the digits of phone_number, for indexed customer lookup.', max_length=25),
+        ),
+        migrations.RunPython(fill_search_columns, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['search_first_name', 'search_last_name'], name='customer_search_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['search_last_name'], name='customer_search_last_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['search_email'], name='customer_search_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['search_phone'], name='customer_search_phone_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0016_customer_search_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, help_text="Token from the booking form that made this reservation, so a resubmitted form can't book twice.", max_length=32, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:49
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def start_reservation_ids(apps, schema_editor):
+    # Reservation keys now come from here, so carry on after the existing rows
+    Reservation = apps.get_model('web', 'Reservation')
+    IdSequence = apps.get_model('web', 'IdSequence')
+    top = Reservation.objects.aggregate(top=Max('pk'))['top'] or 0
+    IdSequence.objects.create(name='reservations', next_id=top + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0017_reservation_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Name of the sequence (e.g. reservations).', max_length=50, unique=True)),
+                ('next_id', models.PositiveBigIntegerField(default=1, help_text='First key not yet handed out.')),
+            ],
+            options={
+                'db_table': 'id_sequences',
+            },
+        ),
+        migrations.RunPython(start_reservation_ids, reverse_code=migrations.RunPython.noop),
+    ]
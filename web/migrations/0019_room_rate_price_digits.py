@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0018_id_sequences'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='roomrate',
+            name='price',
+            field=models.DecimalField(decimal_places=2, help_text='Price for the night.', max_digits=7),
+        ),
+    ]
@@ -6,12 +6,85 @@ Professor Sue Sampson
 Developed October thru December of 2025
 """
 
-from django.db import models
-import uuid
+import re
+from django.conf import settings
+from django.db import connections, models, transaction
 from django.contrib.auth.models import User
-from django.db.models import Case, When, Value, IntegerField
+from django.db.models import FloatField, Q, F
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from . import public_ids
+
+# InnoDB leaves words shorter than innodb_ft_min_token_size (3 by default)
+# out of FULLTEXT indexes, so shorter search words use the prefix columns
+FULLTEXT_MIN_WORD = 3
+
+def prefix_match(field, prefix, vendor):
+    """
+    A Q for "field starts with prefix" on one of the lowercased search
+    columns that the database can read from the column's index. On MySQL
+    that is istartswith, a plain LIKE 'prefix%'. A range up to the next
+    character (prefix <= field < "lope{") would only work under binary
+    collation: under utf8mb4_unicode_ci punctuation sorts before letters, so
+    "lopez" would find nothing. SQLite compares bytes, but its LIKE ignores
+    case and so can't use a BINARY index, so the range is kept there.
+    """
+    if vendor == "sqlite":
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return Q(**{f"{field}__gte": prefix, f"{field}__lt": upper})
+    return Q(**{f"{field}__istartswith": prefix})
+
+
+# Where each status sorts in reservation lists: holds that still need
+# confirming first, then confirmed stays, then cancellations
+STATUS_RANKS = {'Hold': 1, 'Confirmed': 2, 'Cancelled': 3}
+OTHER_STATUS_RANK = 99
+
+
+def status_rank(status):
+    return STATUS_RANKS.get(status, OTHER_STATUS_RANK)
+
+
+def phone_digits(phone):
+    """Just the digits of a phone number, so "(555) 555-5555" and "555.555.5555" match."""
+    return re.sub(r"\D", "", phone or "")
+
+
+class CustomerQuerySet(models.QuerySet):
+    def matching(self, query):
+        """
+        Customers whose first or last name, email or phone number starts with
+        the query, ignoring case and phone punctuation, from the indexed
+        search columns. Two or more words match first and last name
+        ("jane do" finds Jane Doe), and anything with an @ only matches email.
+        """
+        query = query.strip().lower()
+        words = query.split()
+        if not words:
+            return self.none()
+        vendor = connections[self.db].vendor
+        if "@" in query:
+            return self.filter(prefix_match('search_email', query, vendor))
+        if len(words) > 1:
+            return self.filter(
+                prefix_match('search_first_name', words[0], vendor)
+                & prefix_match('search_last_name', " ".join(words[1:]), vendor)
+            )
+
+        match = (
+            prefix_match('search_first_name', query, vendor)
+            | prefix_match('search_last_name', query, vendor)
+            | prefix_match('search_email', query, vendor)
+        )
+        digits = phone_digits(query)
+        if len(digits) >= 3:
+            match |= prefix_match('search_phone', digits, vendor)
+        return self.filter(match)
+
 
 class Customer(models.Model):
+    objects = CustomerQuerySet.as_manager()
+
     # One-to-one link with Django User
     user = models.OneToOneField(
         User,
@@ -56,12 +129,102 @@ class Customer(models.Model):
         help_text="ZIP or postal code for the customer."
     )
 
+    # Normalized copies for the staff customer picker, kept up to date by save()
+    search_first_name = models.CharField(
+        max_length=150,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="The user's first name in lowercase, for indexed customer lookup."
+    )
+    search_last_name = models.CharField(
+        max_length=150,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="The user's last name in lowercase, for indexed customer lookup."
+    )
+    search_email = models.CharField(
+        max_length=254,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="The user's email in lowercase, for indexed customer lookup."
+    )
+    search_phone = models.CharField(
+        max_length=25,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Just the digits of phone_number, for indexed customer lookup."
+    )
+
     class Meta:
         db_table = 'customers'
+        indexes = [
+            # Staff customer picker (see CustomerQuerySet.matching)
+            models.Index(fields=['search_first_name', 'search_last_name'], name='customer_search_name_idx'),
+            models.Index(fields=['search_last_name'], name='customer_search_last_idx'),
+            models.Index(fields=['search_email'], name='customer_search_email_idx'),
+            models.Index(fields=['search_phone'], name='customer_search_phone_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} ({self.user.email})"
 
+    # {attname: value} as last read from or written to the database, so
+    # save() can skip the write when nothing changed (see changed_fields)
+    _saved_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_saved_values()
+        return instance
+
+    def _remember_saved_values(self):
+        self._saved_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def changed_fields(self):
+        """Names of the loaded fields whose values differ from what the database has."""
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in self.__dict__
+            and self.__dict__[field.attname] != self._saved_values.get(field.attname, models.DEFERRED)
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Like Model.save, but an existing customer only writes the fields that
+        changed, and nothing at all if none did. Passing update_fields (or
+        force_insert) saves the usual way.
+        """
+        self.fill_search_fields()
+        if (self._saved_values is not None and not self._state.adding and not args
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert')):
+            changed = self.changed_fields()
+            if not changed:
+                return
+            kwargs['update_fields'] = changed
+        super().save(*args, **kwargs)
+        self._remember_saved_values()
+
+    def fill_search_fields(self):
+        """
+        Copy the user's names and email, and the phone digits, into the search
+        columns. The User post_save handler saves the customer too, so name
+        and email changes reach them.
+        """
+        self.search_first_name = self.user.first_name.strip().lower()
+        self.search_last_name = self.user.last_name.strip().lower()
+        self.search_email = self.user.email.strip().lower()
+        self.search_phone = phone_digits(self.phone_number)
+
 
 class RoomType(models.Model):
     
@@ -125,30 +288,141 @@ class Room(models.Model):
         help_text="Automatically updated timestamp when the room record is modified."
     )
 
-    # new maintenance end date field; this is added in migration 0002
-    maintenance_until = models.DateField(
-        blank=True,
-        null=True,
-        help_text="If in maintenance, the date the room is expected to become available."
-    )
-
     class Meta:
         db_table = 'rooms'
     
     def __str__(self):
         return f"Room {self.room_number} ({self.room_type.name})"
 
+
+class RoomMaintenanceWindow(models.Model):
+    """
+    A stretch of nights a room is out of service, from start_date up to but
+    not including end_date (the first night it is back). These replace
+    Room.maintenance_until, so a room can come back part way through a stay
+    or have work booked ahead. A room in Maintenance with no windows at all
+    is out of service until it gets one or its status changes.
+    """
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        related_name="maintenance_windows",
+        help_text="The room that is out of service."
+    )
+    start_date = models.DateField(
+        help_text="First night the room is out of service."
+    )
+    end_date = models.DateField(
+        help_text="First night the room is back in service."
+    )
+    reason = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        help_text="Optional note on the work being done (e.g. Carpet replacement)."
+    )
+
+    class Meta:
+        db_table = 'room_maintenance_windows'
+        constraints = [
+            models.CheckConstraint(condition=Q(end_date__gt=F('start_date')), name='maint_window_dates'),
+        ]
+        indexes = [
+            # Windows overlapping a stay are end_date > check-in and
+            # start_date < check-out; most windows are in the past, so
+            # end_date leads and the range scan skips them
+            models.Index(fields=['end_date', 'start_date', 'room'], name='maint_window_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"Room {self.room_id} out {self.start_date} to {self.end_date}"
+
+PUBLIC_ID_PREFIX = public_ids.PREFIX
+
+
+def canonical_public_id(value):
+    """
+    The stored form of a reservation number as someone might type it:
+    " mbl-1a2b3c4d", "MBL 1A2B3C4D" and "1a2b3c4d" all become "MBL-1A2B3C4D".
+    """
+    value = "".join(value.split()).upper()
+    if not value:
+        return value
+    if value.startswith(PUBLIC_ID_PREFIX):
+        return value
+    if value.startswith(PUBLIC_ID_PREFIX[:-1]):
+        return PUBLIC_ID_PREFIX + value[len(PUBLIC_ID_PREFIX) - 1:]
+    return PUBLIC_ID_PREFIX + value
+
+
 class ReservationQuerySet(models.QuerySet):
     def ordered(self):
-        return self.annotate(
-            status_order=Case(
-                When(status='Hold', then=Value(1)),
-                When(status='Confirmed', then=Value(2)),
-                When(status='Cancelled', then=Value(3)),
-                default=Value(99),
-                output_field=IntegerField(),
-            )
-        ).order_by('status_order', '-start_date')
+        """
+        Holds first, then confirmed, then cancelled, latest check-in first
+        within each. Reads the stored status_rank column, so with the rank
+        indexes the database walks an index instead of sorting.
+        """
+        return self.order_by('status_rank', '-start_date', '-id')
+
+    def blocking_inventory(self, at=None):
+        """
+        Reservations that take a room out of inventory at the given moment
+        (default now). A Hold past its expiration_time does not, even if the
+        expiry job has not cancelled it yet.
+        """
+        at = at or timezone.now()
+        return self.filter(
+            Q(status='Confirmed') |
+            Q(status='Hold') & (Q(expiration_time__isnull=True) | Q(expiration_time__gt=at))
+        )
+
+    def lapsed_holds(self, at=None):
+        """Holds past their expiration_time that the expiry job has not cancelled yet."""
+        at = at or timezone.now()
+        return self.filter(status='Hold', expiration_time__isnull=False, expiration_time__lte=at)
+
+    def matching_email(self, email):
+        """Reservations by this email (the customer's account email, or the guest's if none)."""
+        return self.filter(search_email=email.strip().lower())
+
+    def matching_name(self, first_name="", last_name=""):
+        """
+        Reservations whose guest names start with the given first and/or last
+        name, ignoring case, from the indexed search columns. With
+        SEARCH_FULLTEXT on MySQL, each word typed may instead start any word
+        of either name (so "ann" finds "Mary Ann" and "smith" finds "Smith-Jones").
+        """
+        first_name = first_name.strip().lower()
+        last_name = last_name.strip().lower()
+        words = re.findall(r"\w+", f"{first_name} {last_name}")
+        if (settings.SEARCH_FULLTEXT and connections[self.db].vendor == "mysql"
+                and words and all(len(word) >= FULLTEXT_MIN_WORD for word in words)):
+            return self.alias(name_match=RawSQL(
+                "MATCH (reservations.search_first_name, reservations.search_last_name) "
+                "AGAINST (%s IN BOOLEAN MODE)",
+                [" ".join(f"+{word}*" for word in words)],
+                output_field=FloatField(),
+            )).filter(name_match__gt=0)
+
+        vendor = connections[self.db].vendor
+        queryset = self
+        if first_name:
+            queryset = queryset.filter(prefix_match('search_first_name', first_name, vendor))
+        if last_name:
+            queryset = queryset.filter(prefix_match('search_last_name', last_name, vendor))
+        return queryset
+
+    def matching_public_id(self, public_id):
+        """
+        The reservation with this number however it was typed. Numbers made
+        from a primary key are looked up by it; the old random ones go
+        through the public_id index.
+        """
+        public_id = canonical_public_id(public_id)
+        pk = public_ids.decode(public_id)
+        if pk is None:
+            return self.filter(public_id=public_id)
+        return self.filter(pk=pk, public_id=public_id)
 
 class Reservation(models.Model):
     STATUS_CHOICES = [
@@ -166,6 +440,14 @@ class Reservation(models.Model):
         editable=False,
         help_text="Public-facing reservation ID."
     )
+    idempotency_key = models.CharField(
+        max_length=32,
+        unique=True,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Token from the booking form that made this reservation, so a resubmitted form can't book twice."
+    )
 
     customer = models.ForeignKey(
         Customer,
@@ -190,6 +472,28 @@ class Reservation(models.Model):
         max_length=254,
         help_text="Email address of the guest."
     )
+    # Normalized copies for the search page, kept up to date by save()
+    search_first_name = models.CharField(
+        max_length=35,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="guest_first_name in lowercase, for indexed name search."
+    )
+    search_last_name = models.CharField(
+        max_length=35,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="guest_last_name in lowercase, for indexed name search."
+    )
+    search_email = models.CharField(
+        max_length=254,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="The linked customer's account email (or guest_email if none) in lowercase, for indexed email search."
+    )
     created_time = models.DateTimeField(
         auto_now_add=True,
         help_text="Timestamp when the reservation was first created."
@@ -209,6 +513,11 @@ class Reservation(models.Model):
         default='Hold',
         help_text="Current status of the reservation."
     )
+    status_rank = models.PositiveSmallIntegerField(
+        default=STATUS_RANKS['Hold'],
+        editable=False,
+        help_text="Where the status sorts in reservation lists (see STATUS_RANKS); kept in step with status by save()."
+    )
     start_date = models.DateField(
         help_text="Check-in date for the reservation."
     )
@@ -240,22 +549,330 @@ class Reservation(models.Model):
 
     class Meta:
         db_table = 'reservations'
+        indexes = [
+            # Overlap lookups for availability and the inventory ledger
+            models.Index(fields=['room_type', 'status', 'start_date', 'end_date'], name='res_availability_idx'),
+            # Expired hold sweep
+            models.Index(fields=['status', 'expiration_time'], name='res_hold_expiry_idx'),
+            # Account and search pages: a customer's reservations, and the
+            # staff listing of all of them, in ordered() order. The directions
+            # match ordered() so the index can be read as is, with no sort
+            models.Index(fields=['customer', 'status_rank', '-start_date', '-id'], name='res_customer_rank_idx'),
+            models.Index(fields=['status_rank', '-start_date', '-id'], name='res_rank_idx'),
+            # Search page lookups (see ReservationQuerySet.matching_*); MySQL
+            # also gets a FULLTEXT index on the two names in migration 0014
+            models.Index(fields=['search_last_name', 'search_first_name'], name='res_search_name_idx'),
+            models.Index(fields=['search_first_name'], name='res_search_first_name_idx'),
+            models.Index(fields=['search_email'], name='res_search_email_idx'),
+        ]
+
+    # The customer the row was loaded with, so save() only looks the
+    # account email up again when the link changes
+    _loaded_customer_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_customer_id = instance.__dict__.get('customer_id')
+        return instance
     
     # Override save to generate the public_id
     def save(self, *args, **kwargs):
         """
-        As a note, this does not check for collisions. It's EXTREMELY statistically
-        unlikely that an ID already in our database would be randomly generated again,
-        even if we had like a hundred thousand reservations in there, but there still
-        is a chance. I don't think it's worth implementing a check for this at this stage,
-        but we would want to for a real project.
+        New reservations get their id from the allocator before the INSERT
+        and a public_id encoded from it (see public_ids), so numbers can't
+        collide and need no query of their own. The row can't exist yet
+        either, so it is inserted straight away rather than after a failed
+        UPDATE.
         """
-
+        self._new_pk = self._state.adding and self.pk is None
+        if self._new_pk:
+            self.pk = public_ids.reservation_ids.next_id()
+            if not args:
+                kwargs.setdefault('force_insert', True)
         # Only generate a new public_id if it does not already have one
         if not self.public_id:
-            self.public_id = "MBL-" + uuid.uuid4().hex[:8].upper()
-        
-        super().save(*args, **kwargs)
+            self.public_id = public_ids.encode(self.pk)
+        self.public_id = canonical_public_id(self.public_id)
+        self.status_rank = status_rank(self.status)
+        self.fill_search_fields()
+
+        # The ledger signals lock the stored row in pre_save and adjust the
+        # nights in post_save, so keep them in one transaction with the write
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+    def fill_search_fields(self):
+        """
+        Copy the guest's names and email into the lowercased search columns.
+        Called by save(); anything that bulk_creates reservations calls it itself.
+        """
+        self.search_first_name = self.guest_first_name.strip().lower()
+        self.search_last_name = self.guest_last_name.strip().lower()
+        if self.customer_id is None:
+            self.search_email = self.guest_email.strip().lower()
+        elif Reservation.customer.is_cached(self):
+            self.search_email = self.customer.user.email.lower()
+        elif self.customer_id != self._loaded_customer_id or not self.search_email:
+            email = User.objects.filter(customer__id=self.customer_id).values_list('email', flat=True).first()
+            self.search_email = (email or self.guest_email).strip().lower()
     
+    @property
+    def nights(self):
+        """Number of nights in the stay."""
+        return (self.end_date - self.start_date).days
+
+    def blocks_inventory(self, at=None):
+        """Python twin of ReservationQuerySet.blocking_inventory for a single row."""
+        at = at or timezone.now()
+        if self.status == 'Confirmed':
+            return True
+        return self.status == 'Hold' and (self.expiration_time is None or self.expiration_time > at)
+
+    def __str__(self):
+        return f"Reservation {self.id} - {self.guest_first_name} {self.guest_last_name}"
+
+class RoomTypeNight(models.Model):
+    """
+    Per-night inventory ledger for a room type. capacity is the number of rooms
+    in service that night, booked the number of Hold/Confirmed reservations
+    covering it. Kept up to date by the signal handlers in signals.py; rows are
+    created lazily by web.inventory.ensure_nights.
+    """
+    room_type = models.ForeignKey(
+        RoomType,
+        on_delete=models.CASCADE,
+        related_name="nights",
+        help_text="The room type this ledger row counts."
+    )
+    date = models.DateField(
+        help_text="The night being counted (the night starting on this date)."
+    )
+    capacity = models.IntegerField(
+        default=0,
+        help_text="Number of rooms of this type in service for the night."
+    )
+    booked = models.IntegerField(
+        default=0,
+        help_text="Number of Hold/Confirmed reservations covering the night."
+    )
+
+    class Meta:
+        db_table = 'room_type_nights'
+        constraints = [
+            models.UniqueConstraint(fields=['room_type', 'date'], name='room_type_night_unique'),
+        ]
+        indexes = [
+            # Covering index so availability reads never touch the table rows
+            models.Index(fields=['room_type', 'date', 'capacity', 'booked'], name='room_type_night_cover'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_type_id} on {self.date}: {self.booked}/{self.capacity}"
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email waiting to be delivered. Views add rows with
+    web.outbox.queue_mail inside their own transaction and the
+    deliver_email management command sends them.
+    """
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sending', 'Sending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    subject = models.CharField(
+        max_length=255,
+        help_text="Subject line of the email."
+    )
+    body = models.TextField(
+        help_text="Plain text body of the email."
+    )
+    from_email = models.CharField(
+        max_length=254,
+        help_text="Sender address."
+    )
+    recipients = models.JSONField(
+        help_text="List of recipient addresses."
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='Pending',
+        help_text="Delivery status of the email."
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Number of failed delivery attempts so far."
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When the email may next be picked up (also the lease expiry while Sending)."
+    )
+    last_error = models.TextField(
+        blank=True,
+        default="",
+        help_text="Error from the most recent failed attempt."
+    )
+    created_time = models.DateTimeField(
+        auto_now_add=True,
+        help_text="Timestamp when the email was queued."
+    )
+    sent_time = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Timestamp when the email was delivered."
+    )
+
+    class Meta:
+        db_table = 'email_outbox'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.status}: {self.subject}"
+
+
+class JobLease(models.Model):
+    """
+    A named lease in the database. Only the owner of an unexpired lease may
+    run the scheduled jobs, so several scheduler processes can be started
+    safely and only one does the work.
+    """
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Name of the lease (e.g. scheduler)."
+    )
+    owner = models.CharField(
+        max_length=100,
+        blank=True,
+        default="",
+        help_text="Identifier of the process holding the lease."
+    )
+    expires_at = models.DateTimeField(
+        help_text="When the lease lapses unless renewed."
+    )
+
+    class Meta:
+        db_table = 'job_leases'
+
+    def __str__(self):
+        return f"{self.name} held by {self.owner or 'nobody'} until {self.expires_at}"
+
+
+class JobRun(models.Model):
+    """One run of a scheduled job, kept so slow or failing jobs can be spotted."""
+    name = models.CharField(
+        max_length=50,
+        help_text="Name of the job that ran."
+    )
+    started_at = models.DateTimeField(
+        help_text="When the run started."
+    )
+    duration_ms = models.PositiveIntegerField(
+        help_text="How long the run took, in milliseconds."
+    )
+    rows = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of rows the run changed."
+    )
+    error = models.TextField(
+        blank=True,
+        default="",
+        help_text="Error raised by the run, if any."
+    )
+
+    class Meta:
+        db_table = 'job_runs'
+        indexes = [
+            models.Index(fields=['name', 'started_at'], name='job_run_name_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} at {self.started_at}: {self.rows} rows in {self.duration_ms} ms"
+
+
+class DataVersion(models.Model):
+    """
+    A named counter bumped in the same transaction as every change to the
+    data it covers, so per-process copies of that data can tell when they
+    have gone stale.
+    """
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Name of the data set (e.g. inventory)."
+    )
+    value = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Goes up by one with every change."
+    )
+
+    class Meta:
+        db_table = 'data_versions'
+
+    def __str__(self):
+        return f"{self.name} v{self.value}"
+
+
+class IdSequence(models.Model):
+    """
+    Next free primary key for a table whose keys are handed out by
+    public_ids.IdAllocator, which moves it on a block at a time.
+    """
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        help_text="Name of the sequence (e.g. reservations)."
+    )
+    next_id = models.PositiveBigIntegerField(
+        default=1,
+        help_text="First key not yet handed out."
+    )
+
+    class Meta:
+        db_table = 'id_sequences'
+
+    def __str__(self):
+        return f"{self.name} next {self.next_id}"
+
+
+class RoomRate(models.Model):
+    """
+    The price of a room type for one night, for seasonal, weekend or event
+    pricing. Nights without a RoomRate use the room type's price_per_night.
+    """
+    room_type = models.ForeignKey(
+        RoomType,
+        on_delete=models.CASCADE,
+        related_name="rates",
+        help_text="The room type this rate applies to."
+    )
+    date = models.DateField(
+        help_text="The night this rate applies to (the night starting on this date)."
+    )
+    price = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        help_text="Price for the night."
+    )
+    label = models.CharField(
+        max_length=50,
+        blank=True,
+        default="",
+        help_text="Optional note on why the rate differs (e.g. Summer, Salmon Festival)."
+    )
+
+    class Meta:
+        db_table = 'room_rates'
+        constraints = [
+            models.UniqueConstraint(fields=['room_type', 'date'], name='room_rate_unique'),
+        ]
+
     def __str__(self):
-        return f"Reservation {self.id} - {self.guest_first_name} {self.guest_last_name}"
\ No newline at end of file
+        return f"{self.room_type_id} on {self.date}: ${self.price}"
@@ -0,0 +1,213 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Optional in-memory availability backend, used when AVAILABILITY_BACKEND is
+"numpy". Each worker process keeps the free room count for every room type
+and night of the next HORIZON_DAYS in a NumPy matrix built from the
+RoomTypeNight ledger, so a search is a min over a slice of it.
+
+The matrix remembers the inventory version (see versions.py) it was built
+at. The signal handlers apply this process's own writes to it once they
+commit; any other change shows up as a newer version in the database and
+the matrix is rebuilt before it answers.
+"""
+
+import threading
+from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.utils import timezone
+from . import catalogue, inventory, versions
+from .models import RoomTypeNight, Reservation
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Nights covered by the matrix, starting today
+HORIZON_DAYS = 730
+
+_lock = threading.Lock()
+_matrix = None
+
+
+class OccupancyMatrix:
+    """Free rooms per [room type, night], plus the holds that can lapse."""
+
+    def __init__(self, version, origin, room_types):
+        self.version = version
+        self.origin = origin
+        self.room_types = room_types  # one matrix row each, ordered by name
+        self.rows = {room_type.id: i for i, room_type in enumerate(room_types)}
+        self.free = np.zeros((len(room_types), HORIZON_DAYS), dtype=np.int32)
+        # {reservation id: (row, first night, last night, expiration_time)}
+        self.holds = {}
+        self._hold_arrays = None
+
+    @classmethod
+    def load(cls, version):
+        """Build the matrix from the ledger. Read the version first, then call this."""
+        origin = timezone.localdate()
+        end = origin + timedelta(days=HORIZON_DAYS)
+        matrix = cls(version, origin, list(catalogue.room_types()))
+        inventory.ensure_nights(origin, end, list(matrix.rows))
+
+        nights = list(RoomTypeNight.objects.filter(
+            date__gte=origin,
+            date__lt=end,
+        ).values_list('room_type_id', 'date', 'capacity', 'booked'))
+        if nights:
+            room_type_ids, dates, capacity, booked = zip(*nights)
+            matrix.free[
+                [matrix.rows[room_type_id] for room_type_id in room_type_ids],
+                [(night - origin).days for night in dates],
+            ] = np.subtract(capacity, booked)
+
+        holds = Reservation.objects.filter(
+            status='Hold',
+            expiration_time__isnull=False,
+            start_date__lt=end,
+            end_date__gt=origin,
+        ).values_list('id', 'status', 'room_type_id', 'start_date', 'end_date', 'expiration_time')
+        for reservation_id, status, room_type_id, start_date, end_date, expiration_time in holds:
+            span = inventory.blocking_span(status, room_type_id, start_date, end_date)
+            matrix.set_hold(reservation_id, span, expiration_time)
+        return matrix
+
+    def _columns(self, span):
+        """Return (row, first, last) for the part of a span inside the matrix, or None."""
+        room_type_id, start, end = span
+        if room_type_id not in self.rows:
+            return None
+        first = max(0, (start - self.origin).days)
+        last = min(HORIZON_DAYS, (end - self.origin).days)
+        if first >= last:
+            return None
+        return self.rows[room_type_id], first, last
+
+    def set_hold(self, reservation_id, span, expiration_time):
+        """Track (or stop tracking) a reservation as a hold that lapses at expiration_time."""
+        self.holds.pop(reservation_id, None)
+        columns = self._columns(span) if span and expiration_time else None
+        if columns:
+            self.holds[reservation_id] = (*columns, expiration_time)
+        self._hold_arrays = None
+
+    def hold_arrays(self):
+        """The holds as (rows, firsts, lasts, expiration timestamps) arrays, rebuilt after changes."""
+        if self._hold_arrays is None:
+            holds = list(self.holds.values())
+            self._hold_arrays = (
+                np.array([hold[0] for hold in holds], dtype=np.int32),
+                np.array([hold[1] for hold in holds], dtype=np.int32),
+                np.array([hold[2] for hold in holds], dtype=np.int32),
+                np.array([hold[3].timestamp() for hold in holds], dtype=np.float64),
+            )
+        return self._hold_arrays
+
+    def apply(self, deltas, hold):
+        """Apply (span, booked delta) pairs and a (reservation id, span, expiration) hold update."""
+        for span, delta in deltas:
+            columns = self._columns(span) if span else None
+            if columns:
+                row, first, last = columns
+                self.free[row, first:last] -= delta
+        if hold:
+            self.set_hold(*hold)
+
+    def min_free(self, check_in, check_out, now):
+        """
+        Return the smallest free count over the stay for every row, or None if
+        the stay is not inside the matrix. Lapsed holds count as free.
+        """
+        first = (check_in - self.origin).days
+        last = (check_out - self.origin).days
+        if first < 0 or last > HORIZON_DAYS:
+            return None
+
+        window = self.free[:, first:last]
+        rows, starts, ends, expirations = self.hold_arrays()
+        lapsed = (expirations <= now.timestamp()) & (starts < last) & (ends > first)
+        if lapsed.any():
+            window = window.copy()
+            for row, start, end in zip(rows[lapsed], starts[lapsed], ends[lapsed]):
+                window[row, max(start, first) - first:min(end, last) - first] += 1
+        return window.min(axis=1)
+
+
+def _current_matrix():
+    """Return this process's matrix, rebuilding it first if it is stale."""
+    global _matrix
+    version = versions.current(versions.INVENTORY)
+    with _lock:
+        matrix = _matrix
+        if matrix is None or matrix.version != version or matrix.origin != timezone.localdate():
+            matrix = OccupancyMatrix.load(version)
+            # Inside a transaction the matrix could include writes that are
+            # later rolled back, so only keep ones built from committed data
+            if not connection.in_atomic_block:
+                _matrix = matrix
+        return matrix
+
+
+def reset():
+    """Drop this process's matrix; the next search rebuilds it."""
+    global _matrix
+    with _lock:
+        _matrix = None
+
+
+def get_available_rooms(check_in, check_out, num_guests=None, selected_room_type_id=None):
+    """
+    Same answer as views.helpers.get_available_rooms, read from the matrix.
+    Returns None if the stay is not inside the matrix, so the caller can
+    fall back to the ledger.
+    """
+    if np is None:
+        raise ImproperlyConfigured('AVAILABILITY_BACKEND = "numpy" needs NumPy installed.')
+
+    now = timezone.now()
+    matrix = _current_matrix()
+    with _lock:
+        free = matrix.min_free(check_in, check_out, now)
+    if free is None:
+        return None
+
+    available_room_types = []
+    for room_type, count in zip(matrix.room_types, free.tolist()):
+        if selected_room_type_id and room_type.id != int(selected_room_type_id):
+            continue
+        if num_guests and room_type.max_guests < int(num_guests):
+            continue
+        if count < 1:
+            continue
+        available_room_types.append({
+            "room_type": room_type,
+            "available_count": count,
+            "price_per_night": room_type.price_per_night
+        })
+    return available_room_types
+
+
+def record_change(version, deltas=(), hold=None):
+    """
+    Apply one of this process's own inventory writes to the matrix once it
+    commits. version is the inventory version the write bumped to; if the
+    matrix is not at the version just before it, some other write got in
+    between and the matrix is left to rebuild instead.
+    """
+    if _matrix is None:
+        return
+
+    def apply():
+        with _lock:
+            if _matrix is not None and _matrix.version == version - 1:
+                _matrix.apply(deltas, hold)
+                _matrix.version = version
+
+    transaction.on_commit(apply)
@@ -0,0 +1,116 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Transactional email outbox. Views call queue_mail instead of send_mail so
+a request never waits on the mail server; deliver_pending (run by the
+deliver_email command) sends the queued rows in batches.
+"""
+
+from datetime import timedelta
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import EmailOutbox
+
+# How long a worker may hold a claimed batch before others may retry it
+CLAIM_LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 8
+
+
+def queue_mail(subject, message, from_email, recipient_list, **kwargs):
+    """
+    Drop-in replacement for django.core.mail.send_mail that stores the email
+    for the delivery worker. Extra send_mail arguments (fail_silently, ...)
+    are accepted and ignored.
+    """
+    return EmailOutbox.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 1, 2, 4 ... minutes, capped at two hours."""
+    return timedelta(minutes=min(2 ** (attempts - 1), 120))
+
+
+def claim_batch(batch_size, now=None):
+    """
+    Claim up to batch_size due emails for this worker and return them.
+    Rows locked by another worker are skipped rather than waited on.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = list(EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+            status__in=['Pending', 'Sending'],
+            next_attempt_at__lte=now,
+        ).order_by('next_attempt_at')[:batch_size])
+        if batch:
+            EmailOutbox.objects.filter(pk__in=[email.pk for email in batch]).update(
+                status='Sending',
+                next_attempt_at=now + CLAIM_LEASE,
+            )
+    return batch
+
+
+def record_failure(email, error, max_attempts=MAX_ATTEMPTS):
+    """Count a failed attempt: retry later with backoff, or give up at max_attempts."""
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'Failed'
+    else:
+        email.status = 'Pending'
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_pending(batch_size=100, max_attempts=MAX_ATTEMPTS, connection=None):
+    """
+    Send one claimed batch over a single mail connection. Returns a
+    (sent, failed) tuple. Failed emails are retried with backoff until
+    max_attempts, then marked Failed. If the mail server can't be reached
+    at all, the whole batch counts as failed, so a relay outage backs off
+    like any other failure instead of stopping the worker.
+    """
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    try:
+        connection = connection or get_connection(fail_silently=False)
+        connection.open()
+    except Exception as e:
+        for email in batch:
+            record_failure(email, e, max_attempts)
+        return 0, len(batch)
+
+    sent = failed = 0
+    try:
+        for email in batch:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.recipients,
+                connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                failed += 1
+                record_failure(email, e, max_attempts)
+            else:
+                sent += 1
+                email.status = 'Sent'
+                email.sent_time = timezone.now()
+                email.save(update_fields=['status', 'sent_time'])
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass  # every email is already recorded; a dead connection has nothing to lose
+    return sent, failed
@@ -0,0 +1,61 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Stay pricing from the nightly rate calendar (RoomRate), falling back to
+RoomType.price_per_night on nights without a rate.
+"""
+
+from decimal import Decimal
+from .models import RoomRate
+
+
+class PriceCalendar:
+    """
+    Nightly prices for some room types over [start, end), kept as running
+    totals so the price of any stay inside the range is one subtraction.
+    """
+
+    def __init__(self, start, end, room_types):
+        self.start = start
+        days = (end - start).days
+
+        rates = {}
+        if room_types and days > 0:
+            rows = RoomRate.objects.filter(
+                room_type_id__in=[room_type.id for room_type in room_types],
+                date__gte=start,
+                date__lt=end,
+            ).values_list('room_type_id', 'date', 'price')
+            for room_type_id, night, price in rows:
+                rates[(room_type_id, (night - start).days)] = price
+
+        # totals[room_type_id][i] is the price of the first i nights
+        self.totals = {}
+        for room_type in room_types:
+            running = Decimal("0.00")
+            totals = [running]
+            for i in range(days):
+                running += rates.get((room_type.id, i), room_type.price_per_night)
+                totals.append(running)
+            self.totals[room_type.id] = totals
+
+    def stay_total(self, room_type_id, check_in, check_out):
+        """Total price of a stay inside the calendar's range."""
+        totals = self.totals[room_type_id]
+        return totals[(check_out - self.start).days] - totals[(check_in - self.start).days]
+
+
+def stay_total(room_type, check_in, check_out):
+    """Total price of a single stay."""
+    return PriceCalendar(check_in, check_out, [room_type]).stay_total(room_type.id, check_in, check_out)
+
+
+def average_nightly(total, nights):
+    """A stay's total spread evenly over its nights, to the cent."""
+    if nights < 1:
+        return total
+    return (total / nights).quantize(Decimal("0.01"))
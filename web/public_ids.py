@@ -0,0 +1,188 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Reservation numbers. A reservation's public_id is its primary key run
+through a reversible encoding, so numbers can never collide and a number
+can be turned straight back into the key it was made from.
+
+The encoding is "MBL-" and eight Crockford base 32 characters: the first
+from GHJKMNPQ (never a hex digit, so new numbers can't be mistaken for the
+old random "MBL-" + 8 hex ones still in the table), then seven more, for
+38 bits in all. The low 16 bits of the key are shuffled with a small
+Feistel network whose round keys come from PUBLIC_ID_KEY (SECRET_KEY
+unless set), so numbers can't be worked out from the code and
+neighbouring bookings don't get neighbouring numbers. The high bits stay
+in order so new numbers still land near the end of the public_id index.
+A number is still no proof of ownership; views check who is asking.
+
+Keys come from IdAllocator, which reserves them from an IdSequence row in
+blocks (hi/lo), so a save knows its key (and so its number) before the
+INSERT, and only one save in BLOCK_SIZE queries the counter.
+"""
+
+import hashlib
+import threading
+from functools import lru_cache
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max
+
+PREFIX = "MBL-"
+
+# Crockford base 32: no I, L, O or U, and in the same order as its values
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+LEADING = "GHJKMNPQ"
+BITS = 3 + 7 * 5
+MAX_ID = (1 << BITS) - 1
+
+# The low bits are shuffled as two halves
+SCRAMBLED_BITS = 16
+SCRAMBLED_MASK = (1 << SCRAMBLED_BITS) - 1
+HALF_BITS = SCRAMBLED_BITS // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+ROUNDS = 4
+
+# Keys reserved per trip to the counter
+BLOCK_SIZE = 100
+
+
+def _round(half, key, high):
+    x = (half * 0x9E3779B1 + key + high * 0x85EBCA6B) & 0xFFFFFFFF
+    x ^= x >> 15
+    x = (x * 0x2C1B3C6D) & 0xFFFFFFFF
+    return (x >> 12) & HALF_MASK
+
+
+@lru_cache(maxsize=None)
+def _derive_keys(secret):
+    digest = hashlib.blake2b(secret.encode(), digest_size=4 * ROUNDS, person=b"mbl-public-ids").digest()
+    return tuple(int.from_bytes(digest[i:i + 4], "big") for i in range(0, len(digest), 4))
+
+
+def _round_keys():
+    # Changing the key renumbers new bookings and stops old numbers decoding,
+    # so pin PUBLIC_ID_KEY to the old SECRET_KEY before rotating it
+    return _derive_keys(settings.PUBLIC_ID_KEY or settings.SECRET_KEY)
+
+
+def _scramble(low, high):
+    left, right = low >> HALF_BITS, low & HALF_MASK
+    for key in _round_keys():
+        left, right = right, left ^ _round(right, key, high)
+    return left << HALF_BITS | right
+
+
+def _unscramble(low, high):
+    left, right = low >> HALF_BITS, low & HALF_MASK
+    for key in reversed(_round_keys()):
+        left, right = right ^ _round(left, key, high), left
+    return left << HALF_BITS | right
+
+
+def encode(pk):
+    """The public_id for a primary key, e.g. 1 -> "MBL-G000" and four scrambled characters."""
+    if not 0 < pk <= MAX_ID:
+        raise ValueError(f"{pk} is out of range for a public_id")
+    high = pk >> SCRAMBLED_BITS
+    value = high << SCRAMBLED_BITS | _scramble(pk & SCRAMBLED_MASK, high)
+    chars = []
+    for _ in range(7):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    chars.append(LEADING[value])
+    return PREFIX + "".join(reversed(chars))
+
+
+def decode(public_id):
+    """
+    The primary key a public_id (in its stored, upper case form) was made
+    from, or None if it isn't one of ours, like the old random hex numbers.
+    """
+    if len(public_id) != len(PREFIX) + 8 or not public_id.startswith(PREFIX):
+        return None
+    body = public_id[len(PREFIX):]
+    value = LEADING.find(body[0])
+    if value < 0:
+        return None
+    for char in body[1:]:
+        digit = ALPHABET.find(char)
+        if digit < 0:
+            return None
+        value = value << 5 | digit
+    high = value >> SCRAMBLED_BITS
+    return high << SCRAMBLED_BITS | _unscramble(value & SCRAMBLED_MASK, high) or None
+
+
+class _Block:
+    """
+    A run of reserved keys. It is also the on_commit callback of the
+    transaction that reserved it, so until that commits it is only good
+    inside that transaction (the reservation rolls back with it).
+    """
+
+    def __init__(self, start, end):
+        self.next = start
+        self.end = end
+        self.committed = False
+
+    def __call__(self):
+        # Django runs commit hooks outside any transaction; one run inside
+        # an atomic block (TestCase.captureOnCommitCallbacks) has not committed
+        self.committed = not connection.in_atomic_block
+
+    def usable(self):
+        if self.next >= self.end:
+            return False
+        # Django drops the callbacks of rolled back transactions and savepoints
+        return self.committed or any(func is self for _, func, _ in connection.run_on_commit)
+
+
+class IdAllocator:
+    """
+    Hands out primary keys for a model from the named IdSequence row,
+    BLOCK_SIZE at a time. Each thread keeps its own block (a block still
+    waiting on its commit belongs to that thread's connection). Keys left
+    in a block when the process exits are never used, so ids have gaps.
+    """
+
+    def __init__(self, name, model, block_size=BLOCK_SIZE):
+        self.name = name
+        self.model = model
+        self.block_size = block_size
+        self._local = threading.local()
+
+    def next_id(self):
+        """The next free key, reserving a new block first if needed."""
+        block = getattr(self._local, 'block', None)
+        if block is None or not block.usable():
+            block = self._local.block = self._reserve(self.block_size)
+        pk = block.next
+        block.next += 1
+        return pk
+
+    def reserve(self, count):
+        """A range of count keys for the caller alone (e.g. to bulk_create rows)."""
+        block = self._reserve(count)
+        return range(block.next, block.end)
+
+    def _reserve(self, size):
+        IdSequence = apps.get_model('web', 'IdSequence')
+        sequence = IdSequence.objects.filter(name=self.name)
+        with transaction.atomic():
+            if not sequence.update(next_id=F('next_id') + size):
+                # First use: start after whatever is already in the table
+                existing = apps.get_model(self.model).objects.aggregate(top=Max('pk'))['top'] or 0
+                IdSequence.objects.get_or_create(name=self.name, defaults={'next_id': existing + 1})
+                sequence.update(next_id=F('next_id') + size)
+            end = sequence.values_list('next_id', flat=True).get()
+        block = _Block(end - size, end)
+        transaction.on_commit(block)
+        return block
+
+
+reservation_ids = IdAllocator("reservations", "web.Reservation")
@@ -6,18 +6,203 @@ Professor Sue Sampson
 Developed October thru December of 2025
 """
 
-from django.db.models.signals import post_save
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Customer
+from .models import Customer, Reservation, Room, RoomMaintenanceWindow, RoomType
+from . import account_summary, catalogue, inventory, occupancy, versions
 
 @receiver(post_save, sender=User)
 def create_customer_profile(sender, instance, created, **kwargs):
     if created:
         Customer.objects.create(user=instance)
 
+# User fields the customer copies into its search columns
+CUSTOMER_USER_FIELDS = {'first_name', 'last_name', 'email'}
+
 @receiver(post_save, sender=User)
-def save_customer_profile(sender, instance, **kwargs):
-    # if Customer already exists, save it
+def save_customer_profile(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Saves that can't have changed the names or email (like the last_login
+    # update on login) leave the customer alone
+    if raw or (update_fields is not None and not CUSTOMER_USER_FIELDS & set(update_fields)):
+        return
+    # if Customer already exists, save it; Customer.save only writes what changed
     if hasattr(instance, 'customer'):
-        instance.customer.save()
\ No newline at end of file
+        instance.customer.save()
+
+@receiver(post_save, sender=User)
+def update_reservation_search_email(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Reservations keep a lowercased copy of their customer's account email
+    # for search; saves that can't have changed it (like login) are skipped
+    if created or raw or (update_fields is not None and 'email' not in update_fields):
+        return
+    email = instance.email.lower()
+    Reservation.objects.filter(customer__user=instance).exclude(search_email=email).update(search_email=email)
+
+# ----- Inventory ledger upkeep -----
+
+def _hold(status, span, expiration_time):
+    """What the NumPy matrix tracks about a hold: its nights and when it lapses."""
+    return (span, expiration_time) if status == 'Hold' else None
+
+def _stored_state(reservation):
+    """
+    The (blocking span, hold) of the reservation as currently stored in the
+    database. The row stays locked until the save or delete commits, so two
+    writers can't both release (or both take) the same nights.
+    """
+    if reservation.pk is None or (reservation._state.adding and getattr(reservation, '_new_pk', False)):
+        # Nothing stored yet (save allocates new keys before the INSERT)
+        return None, None
+    row = Reservation.objects.select_for_update().filter(pk=reservation.pk).values_list(
+        'status', 'room_type_id', 'start_date', 'end_date', 'expiration_time'
+    ).first()
+    if not row:
+        return None, None
+    span = inventory.blocking_span(*row[:4])
+    return span, _hold(row[0], span, row[4])
+
+def _current_span(reservation):
+    return inventory.blocking_span(
+        reservation.status, reservation.room_type_id,
+        reservation.start_date, reservation.end_date,
+    )
+
+@receiver(pre_save, sender=Reservation)
+def capture_reservation_nights(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._stored_span, instance._stored_hold = _stored_state(instance)
+    # Make sure the ledger has rows for the new nights before the write,
+    # so they are counted without this reservation and adjusted after it
+    for span in (instance._stored_span, _current_span(instance)):
+        if span:
+            room_type_id, start, end = span
+            inventory.ensure_nights(start, end, [room_type_id])
+
+@receiver(post_save, sender=Reservation)
+def update_reservation_nights(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_stored_span', None)
+    old_hold = getattr(instance, '_stored_hold', None)
+    new = _current_span(instance)
+    new_hold = _hold(instance.status, new, instance.expiration_time)
+    instance._stored_span, instance._stored_hold = new, new_hold
+    # Name, guest count or price edits leave availability alone, so don't
+    # bump the version (a lock on one shared row until commit, and every
+    # cached answer and matrix thrown away) for them
+    if old == new and old_hold == new_hold:
+        return
+
+    deltas = []
+    if old != new:
+        if old:
+            inventory.adjust_booked(old, -1)
+            deltas.append((old, -1))
+        if new:
+            inventory.adjust_booked(new, +1)
+            deltas.append((new, +1))
+
+    occupancy.record_change(
+        versions.bump(versions.INVENTORY),
+        deltas,
+        (instance.pk, new if new_hold else None, instance.expiration_time),
+    )
+
+@receiver(pre_delete, sender=Reservation)
+def capture_deleted_reservation(sender, instance, **kwargs):
+    instance._stored_span, _ = _stored_state(instance)
+
+@receiver(post_delete, sender=Reservation)
+def release_reservation_nights(sender, instance, **kwargs):
+    span = getattr(instance, '_stored_span', None)
+    if not span:
+        return  # a cancelled reservation held no nights
+    inventory.adjust_booked(span, -1)
+    occupancy.record_change(
+        versions.bump(versions.INVENTORY),
+        [(span, -1)],
+        (instance.pk, None, None),
+    )
+
+# ----- Account page summaries -----
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def drop_account_summary(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # A reservation moved to another customer changes both summaries
+    account_summary.invalidate(instance.customer_id, instance._loaded_customer_id)
+
+@receiver(pre_save, sender=Room)
+def capture_room_type(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._stored_room_type_id = None
+        return
+    instance._stored_room_type_id = Room.objects.filter(pk=instance.pk).values_list(
+        'room_type_id', flat=True
+    ).first()
+
+@receiver(post_save, sender=Room)
+def update_room_capacity(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    inventory.refresh_capacity(instance.room_type_id)
+    old_room_type_id = getattr(instance, '_stored_room_type_id', None)
+    if old_room_type_id and old_room_type_id != instance.room_type_id:
+        inventory.refresh_capacity(old_room_type_id)
+    # Capacity changes are not applied in memory; in-memory copies just rebuild
+    versions.bump(versions.INVENTORY)
+
+@receiver(post_delete, sender=Room)
+def release_room_capacity(sender, instance, **kwargs):
+    inventory.refresh_capacity(instance.room_type_id)
+    versions.bump(versions.INVENTORY)
+
+def _window_room_type_ids(*room_ids):
+    return set(Room.objects.filter(pk__in=[room_id for room_id in room_ids if room_id]).values_list(
+        'room_type_id', flat=True
+    ))
+
+@receiver(pre_save, sender=RoomMaintenanceWindow)
+def capture_window_room(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._stored_room_id = None
+        return
+    instance._stored_room_id = RoomMaintenanceWindow.objects.filter(pk=instance.pk).values_list(
+        'room_id', flat=True
+    ).first()
+
+@receiver(post_save, sender=RoomMaintenanceWindow)
+def update_window_capacity(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for room_type_id in _window_room_type_ids(instance.room_id, getattr(instance, '_stored_room_id', None)):
+        inventory.refresh_capacity(room_type_id)
+    versions.bump(versions.INVENTORY)
+
+@receiver(post_delete, sender=RoomMaintenanceWindow)
+def release_window_capacity(sender, instance, **kwargs):
+    for room_type_id in _window_room_type_ids(instance.room_id):
+        inventory.refresh_capacity(room_type_id)
+    versions.bump(versions.INVENTORY)
+
+@receiver(post_save, sender=RoomType)
+@receiver(post_delete, sender=RoomType)
+def room_type_changed(sender, raw=False, **kwargs):
+    if raw:
+        return
+    versions.bump(versions.INVENTORY)
+    catalogue.bump()
+
+# The room type catalogue checks its version once per request
+@receiver(request_started)
+def begin_catalogue_request(sender, **kwargs):
+    catalogue.begin_request()
+
+@receiver(request_finished)
+def end_catalogue_request(sender, **kwargs):
+    catalogue.end_request()
@@ -1,3 +1,1598 @@
-from django.test import TestCase
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+"""
 
-# Create your tests here.
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+from smtplib import SMTPException
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import RoomType, Room, Reservation, RoomTypeNight, EmailOutbox, JobRun, RoomRate, RoomMaintenanceWindow
+from . import account_summary, assignment, availability_cache, booking, catalogue, inventory, jobs, occupancy, outbox, pricing, public_ids, versions
+from .views import helpers
+from .views.helpers import get_available_rooms
+
+
+def make_room_type(name, rooms=1, max_guests=2, price="100.00"):
+    """Create a room type with the given number of in-service rooms."""
+    # Run the on_commit hooks as if the room type had been committed, so the
+    # room type catalogue can keep it. The version counter rolls back between
+    # tests, so drop a catalogue kept by an earlier test at the same version.
+    catalogue.reset()
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        room_type = RoomType.objects.create(
+            name=name,
+            price_per_night=Decimal(price),
+            beds=1,
+            max_guests=max_guests,
+        )
+    for i in range(rooms):
+        Room.objects.create(room_number=f"{name}-{i}", room_type=room_type)
+    return room_type
+
+
+def booking_fields(room_type, check_in, check_out, status="Confirmed"):
+    """Keyword arguments for a reservation of the given room type and dates."""
+    return {
+        "guest_first_name": "Test",
+        "guest_last_name": "Guest",
+        "guest_phone": "555-555-5555",
+        "guest_email": "guest@example.com",
+        "start_date": check_in,
+        "end_date": check_out,
+        "room_type": room_type,
+        "status": status,
+        "total_cost": Decimal("100.00"),
+        "guests": 1,
+    }
+
+
+def make_reservation(room_type, check_in, check_out, status="Confirmed", **kwargs):
+    """Create a reservation for the given room type and dates."""
+    fields = booking_fields(room_type, check_in, check_out, status)
+    fields.update(kwargs)
+    return Reservation.objects.create(**fields)
+
+
+@override_settings(AVAILABILITY_BACKEND="sql", AVAILABILITY_CACHE=False)
+class GetAvailableRoomsTests(TestCase):
+    def setUp(self):
+        self.check_in = timezone.localdate() + timedelta(days=10)
+        self.check_out = self.check_in + timedelta(days=3)
+
+    def test_query_count_does_not_grow_with_room_types(self):
+        for i in range(3):
+            make_room_type(f"Small {i}")
+        # The first search over these nights fills in the ledger
+        get_available_rooms(self.check_in, self.check_out)
+        with self.assertNumQueries(2):  # the catalogue's version, then the search
+            small = get_available_rooms(self.check_in, self.check_out)
+
+        for i in range(20):
+            make_room_type(f"Large {i}")
+        get_available_rooms(self.check_in, self.check_out)
+        with self.assertNumQueries(2):
+            large = get_available_rooms(self.check_in, self.check_out)
+
+        self.assertEqual(len(large) - len(small), 20)
+
+    def test_counts_capacity_minus_overlapping_demand(self):
+        room_type = make_room_type("Suite", rooms=3)
+        make_reservation(room_type, self.check_in, self.check_out)
+        make_reservation(room_type, self.check_in - timedelta(days=1), self.check_in + timedelta(days=1), status="Hold")
+        # Cancelled and non-overlapping reservations do not use up rooms
+        make_reservation(room_type, self.check_in, self.check_out, status="Cancelled")
+        make_reservation(room_type, self.check_out, self.check_out + timedelta(days=2))
+
+        result = get_available_rooms(self.check_in, self.check_out, selected_room_type_id=room_type.id)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]["room_type"].id, room_type.id)
+        self.assertEqual(result[0]["available_count"], 1)
+        self.assertEqual(result[0]["price_per_night"], room_type.price_per_night)
+
+    def test_excludes_full_rooms_under_maintenance_and_small_types(self):
+        full = make_room_type("Full", rooms=1)
+        make_reservation(full, self.check_in, self.check_out)
+        closed = make_room_type("Closed", rooms=0)
+        closed_room = Room.objects.create(room_number="Closed-0", room_type=closed, status="Maintenance")
+        RoomMaintenanceWindow.objects.create(
+            room=closed_room, start_date=self.check_in, end_date=self.check_out + timedelta(days=1),
+        )
+        make_room_type("Tiny", rooms=1, max_guests=1)
+
+        names = {entry["room_type"].name for entry in get_available_rooms(self.check_in, self.check_out, num_guests=2)}
+        self.assertNotIn("Full", names)
+        self.assertNotIn("Closed", names)
+        self.assertNotIn("Tiny", names)
+
+
+@override_settings(AVAILABILITY_BACKEND="sql", AVAILABILITY_CACHE=False)
+class InventoryLedgerTests(TestCase):
+    def setUp(self):
+        self.day = timezone.localdate() + timedelta(days=10)
+        self.room_type = make_room_type("Ledger", rooms=2)
+
+    def nights(self, offset, count):
+        start = self.day + timedelta(days=offset)
+        return start, start + timedelta(days=count)
+
+    def ledger(self):
+        return list(RoomTypeNight.objects.filter(room_type=self.room_type).order_by('date').values_list(
+            'date', 'capacity', 'booked'
+        ))
+
+    def test_back_to_back_stays_do_not_block_a_long_stay(self):
+        # Both bookings overlap the four-night stay, but never on the same night
+        make_reservation(self.room_type, *self.nights(0, 2))
+        make_reservation(self.room_type, *self.nights(2, 2))
+
+        result = get_available_rooms(*self.nights(0, 4), selected_room_type_id=self.room_type.id)
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]["available_count"], 1)
+
+    def test_reservation_changes_are_applied_incrementally(self):
+        get_available_rooms(*self.nights(0, 4))
+        reservation = make_reservation(self.room_type, *self.nights(0, 2))
+        self.assertEqual([row[2] for row in self.ledger()], [1, 1, 0, 0])
+
+        reservation.start_date, reservation.end_date = self.nights(1, 3)
+        reservation.save()
+        self.assertEqual([row[2] for row in self.ledger()], [0, 1, 1, 1])
+
+        reservation.status = "Cancelled"
+        reservation.save()
+        self.assertEqual([row[2] for row in self.ledger()], [0, 0, 0, 0])
+
+        reservation.status = "Confirmed"
+        reservation.save()
+        reservation.delete()
+        self.assertEqual([row[2] for row in self.ledger()], [0, 0, 0, 0])
+
+    def test_room_changes_update_capacity(self):
+        get_available_rooms(*self.nights(0, 3))
+        room = Room.objects.filter(room_type=self.room_type).first()
+        room.status = "Maintenance"
+        room.save()
+        self.assertEqual([row[1] for row in self.ledger()], [1, 1, 1])
+        window = RoomMaintenanceWindow.objects.create(room=room, start_date=self.day, end_date=self.day + timedelta(days=1))
+        self.assertEqual([row[1] for row in self.ledger()], [1, 2, 2])
+        window.end_date = self.day + timedelta(days=2)
+        window.save()
+        self.assertEqual([row[1] for row in self.ledger()], [1, 1, 2])
+        window.delete()
+        self.assertEqual([row[1] for row in self.ledger()], [1, 1, 1])
+
+        Room.objects.create(room_number="Ledger-extra", room_type=self.room_type)
+        self.assertEqual([row[1] for row in self.ledger()], [2, 2, 2])
+
+    def test_expired_holds_release_their_nights(self):
+        get_available_rooms(*self.nights(0, 2))
+        make_reservation(
+            self.room_type, *self.nights(0, 2), status="Hold",
+            expiration_time=timezone.now() - timedelta(minutes=1),
+        )
+        self.assertEqual(inventory.cancel_expired_holds(timezone.now()), 1)
+        self.assertEqual([row[2] for row in self.ledger()], [0, 0])
+
+    def test_expired_holds_lock_the_ledger_in_order(self):
+        other = make_room_type("Ledger later", rooms=2)
+        now = timezone.now()
+        # Oldest first is the opposite of (room_type, date) order
+        make_reservation(other, *self.nights(0, 2), status="Hold", expiration_time=now - timedelta(minutes=3))
+        make_reservation(self.room_type, *self.nights(2, 2), status="Hold", expiration_time=now - timedelta(minutes=2))
+        make_reservation(self.room_type, *self.nights(0, 3), status="Hold", expiration_time=now - timedelta(minutes=1))
+        table = connection.ops.quote_name(RoomTypeNight._meta.db_table)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(inventory.cancel_expired_holds(now), 3)
+        ledger = [query["sql"] for query in queries.captured_queries if table in query["sql"]]
+        locks = [i for i, sql in enumerate(ledger) if sql.startswith("SELECT") and "ORDER BY" in sql]
+        updates = [i for i, sql in enumerate(ledger) if sql.startswith("UPDATE")]
+        self.assertEqual(len(locks), 1)
+        self.assertLess(locks[0], min(updates))
+        self.assertIn(f'ORDER BY {table}.{connection.ops.quote_name("room_type_id")} ASC', ledger[locks[0]])
+        self.assertEqual([row[2] for row in self.ledger()], [0, 0, 0, 0])
+
+    def test_rebuild_matches_incremental_ledger(self):
+        make_reservation(self.room_type, *self.nights(0, 3))
+        make_reservation(self.room_type, *self.nights(1, 1), status="Hold")
+        get_available_rooms(*self.nights(0, 5))
+        before = self.ledger()
+
+        RoomTypeNight.objects.update(booked=0, capacity=0)
+        call_command("rebuild_inventory", days=30, stdout=StringIO())
+        after = [row for row in self.ledger() if row[0] in {night for night, _, _ in before}]
+        self.assertEqual(before, after)
+
+
+class BookingServiceTests(TestCase):
+    def setUp(self):
+        self.check_in = timezone.localdate() + timedelta(days=10)
+        self.check_out = self.check_in + timedelta(days=2)
+        self.room_type = make_room_type("Booking", rooms=1)
+
+    def test_refuses_to_oversell_the_last_room(self):
+        booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out))
+        with self.assertRaises(booking.BookingError):
+            booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out))
+        self.assertEqual(Reservation.objects.filter(room_type=self.room_type).count(), 1)
+
+    def test_confirming_a_hold_on_the_last_room(self):
+        hold = booking.create_reservation(**booking_fields(
+            self.room_type, self.check_in, self.check_out, status="Hold"
+        ))
+        self.assertEqual(booking.confirm_hold(hold).status, "Confirmed")
+        with self.assertRaises(booking.BookingError):
+            booking.confirm_hold(hold)
+
+    def test_modify_can_reuse_its_own_nights(self):
+        reservation = booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out))
+        moved = booking.modify_reservation(
+            reservation, self.check_in + timedelta(days=1), self.check_out + timedelta(days=1), 1, self.room_type
+        )
+        self.assertEqual(moved.start_date, self.check_in + timedelta(days=1))
+        self.assertEqual(
+            list(RoomTypeNight.objects.filter(room_type=self.room_type).order_by('date').values_list('booked', flat=True)),
+            [0, 1, 1],
+        )
+
+    def test_room_type_is_locked_before_the_reservation(self):
+        reservation = booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out))
+        with CaptureQueriesContext(connection) as queries:
+            booking.modify_reservation(reservation, self.check_in, self.check_out + timedelta(days=1), 1,
+                                       self.room_type)
+        tables = [
+            table for query in queries.captured_queries if query["sql"].startswith("SELECT")
+            for table in ("room_types", "reservations") if f'FROM {connection.ops.quote_name(table)}' in query["sql"]
+        ]
+        self.assertEqual(tables[:2], ["room_types", "reservations"])
+
+    def test_stale_copy_is_refused(self):
+        hold = booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out,
+                                                           status="Hold"))
+        other = make_room_type("Booking 2")
+        Reservation.objects.filter(pk=hold.pk).update(room_type=other)
+        with self.assertRaisesMessage(booking.BookingError, "just changed"):
+            booking.confirm_hold(hold)
+
+    def test_cancelling_twice_releases_the_nights_once(self):
+        reservation = booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out))
+        stale = Reservation.objects.get(pk=reservation.pk)  # a second click, loaded before the first cancel
+        booking.cancel_reservation(reservation)
+        with self.assertRaises(booking.BookingError):
+            booking.cancel_reservation(stale)
+        self.assertEqual(
+            set(RoomTypeNight.objects.filter(room_type=self.room_type).values_list('booked', flat=True)), {0},
+        )
+
+
+@skipUnless(connection.features.has_select_for_update, "needs row locking (MySQL/PostgreSQL)")
+class BookingConcurrencyTests(TransactionTestCase):
+    attempts = 200
+    workers = 20
+    rooms = 3
+
+    def test_simultaneous_bookings_never_oversell(self):
+        room_type = make_room_type("Stress", rooms=self.rooms)
+        check_in = timezone.localdate() + timedelta(days=30)
+        check_out = check_in + timedelta(days=3)
+        # Pre-fill the ledger so every thread contends on the same rows
+        inventory.ensure_nights(check_in, check_out, [room_type.id])
+
+        def attempt(_):
+            try:
+                booking.create_reservation(**booking_fields(room_type, check_in, check_out))
+                return True
+            except booking.BookingError:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            booked = sum(pool.map(attempt, range(self.attempts)))
+
+        self.assertEqual(booked, self.rooms)
+        self.assertEqual(Reservation.objects.filter(room_type=room_type).count(), self.rooms)
+        self.assertEqual(
+            set(RoomTypeNight.objects.filter(room_type=room_type).values_list('booked', flat=True)),
+            {self.rooms},
+        )
+
+    def test_modifies_during_a_reshuffle_dont_deadlock(self):
+        room_type = make_room_type("Reshuffled", rooms=self.workers)
+        check_in = timezone.localdate() + timedelta(days=30)
+        reservations = [
+            booking.create_reservation(**booking_fields(room_type, check_in, check_in + timedelta(days=2)))
+            for _ in range(self.workers // 2)
+        ]
+
+        def work(i):
+            try:
+                if i % 2:
+                    assignment.assign_rooms([room_type.id], reshuffle=True)
+                else:
+                    reservation = reservations[i // 2]
+                    booking.modify_reservation(reservation, check_in, check_in + timedelta(days=3), 1, room_type)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(work, range(self.workers)))
+        self.assertEqual(
+            set(Reservation.objects.filter(room_type=room_type).values_list('end_date', flat=True)),
+            {check_in + timedelta(days=3)},
+        )
+
+    def test_simultaneous_cancels_release_the_nights_once(self):
+        room_type = make_room_type("Cancelled twice", rooms=2)
+        check_in = timezone.localdate() + timedelta(days=30)
+        check_out = check_in + timedelta(days=2)
+        reservation = booking.create_reservation(**booking_fields(room_type, check_in, check_out))
+        booking.create_reservation(**booking_fields(room_type, check_in, check_out))
+
+        def cancel(_):
+            try:
+                booking.cancel_reservation(reservation)
+                return True
+            except booking.BookingError:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            cancelled = sum(pool.map(cancel, range(self.workers)))
+
+        self.assertEqual(cancelled, 1)
+        self.assertEqual(
+            set(RoomTypeNight.objects.filter(room_type=room_type).values_list('booked', flat=True)), {1},
+        )
+
+
+class HotQueryIndexTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command("explain_hot_queries", stdout=out)
+        self.assertNotIn("FULL SCAN", out.getvalue())
+        self.assertNotIn("SORTED", out.getvalue())
+
+    def test_status_rank_follows_status(self):
+        room_type = make_room_type("Ranked", rooms=2)
+        check_in = timezone.localdate() + timedelta(days=3)
+        hold = make_reservation(room_type, check_in, check_in + timedelta(days=1), status="Hold",
+                                expiration_time=timezone.now() - timedelta(minutes=1))
+        confirmed = make_reservation(room_type, check_in, check_in + timedelta(days=2))
+        self.assertEqual((hold.status_rank, confirmed.status_rank), (1, 2))
+
+        inventory.cancel_expired_holds(timezone.now())
+        hold.refresh_from_db()
+        self.assertEqual(hold.status_rank, 3)
+        confirmed.status = "Cancelled"
+        confirmed.save()
+        self.assertEqual(list(Reservation.objects.ordered()), [confirmed, hold])
+
+
+class LoadToolingTests(TestCase):
+    def test_seed_load_and_bench_report(self):
+        call_command(
+            "seed_load", room_types=3, rooms=9, customers=20, reservations=300,
+            days_back=30, days_ahead=60, stdout=StringIO(),
+        )
+        self.assertEqual(RoomType.objects.filter(name__startswith="Load Type ").count(), 3)
+        self.assertEqual(Reservation.objects.count(), 300)
+        for pk, public_id in Reservation.objects.values_list('pk', 'public_id')[:20]:
+            self.assertEqual(public_ids.decode(public_id), pk)
+        # No confirmed or held stay is oversold
+        self.assertFalse(RoomTypeNight.objects.filter(booked__gt=F('capacity')).exists())
+
+        out = StringIO()
+        call_command("bench", iterations=2, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(
+            set(report["views"]),
+            {"reservation", "save_reservation", "search", "account", "reservation_detail"},
+        )
+        for stats in report["views"].values():
+            self.assertLess(max(stats["status_codes"]), 400)
+        self.assertIn("p95_us", report["get_available_rooms"])
+        self.assertIn("lookup_new_p50_us", report["public_ids"])
+        # The benchmark rolls back everything it wrote
+        self.assertEqual(Reservation.objects.count(), 300)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Mail backend standing in for an SMTP relay that is down."""
+    def send_messages(self, email_messages):
+        raise SMTPException("relay unavailable")
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+    """Mail backend whose relay can't even be connected to."""
+    def open(self):
+        raise OSError("connection refused")
+
+    def send_messages(self, email_messages):
+        raise AssertionError("never connected")
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("guest@example.com", "guest@example.com", "Passw0rd!")
+        self.room_type = make_room_type("Outbox", rooms=2)
+        self.client.force_login(self.user)
+
+    def book(self, status="Confirmed"):
+        check_in = timezone.localdate() + timedelta(days=5)
+        return self.client.post(reverse("save_reservation"), {
+            "first_name": "Test",
+            "last_name": "Guest",
+            "email": "guest@example.com",
+            "phone_number": "555-555-5555",
+            "check_in": check_in.isoformat(),
+            "check_out": (check_in + timedelta(days=2)).isoformat(),
+            "guests_final": 1,
+            "room_type": self.room_type.id,
+            "status": status,
+        })
+
+    def test_booking_queues_email_instead_of_sending(self):
+        self.book()
+        self.assertEqual(len(mail.outbox), 0)
+        queued = EmailOutbox.objects.get()
+        self.assertEqual(queued.status, "Pending")
+        self.assertEqual(queued.recipients, ["guest@example.com"])
+
+        call_command("deliver_email", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailOutbox.objects.get().status, "Sent")
+
+    def test_rejected_booking_queues_nothing(self):
+        self.book()
+        self.book()
+        self.book()
+        self.assertEqual(Reservation.objects.filter(room_type=self.room_type).count(), 2)
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+
+    @override_settings(EMAIL_BACKEND="web.tests.FailingEmailBackend")
+    def test_failed_delivery_backs_off_then_gives_up(self):
+        outbox.queue_mail("Subject", "Body", "from@example.com", ["to@example.com"])
+        self.assertEqual(outbox.deliver_pending(max_attempts=2), (0, 1))
+        email = EmailOutbox.objects.get()
+        self.assertEqual((email.status, email.attempts), ("Pending", 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn("relay unavailable", email.last_error)
+
+        # Not due yet, so nothing is claimed
+        self.assertEqual(outbox.deliver_pending(max_attempts=2), (0, 0))
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        outbox.deliver_pending(max_attempts=2)
+        self.assertEqual(EmailOutbox.objects.get().status, "Failed")
+
+    @override_settings(EMAIL_BACKEND="web.tests.UnreachableEmailBackend")
+    def test_unreachable_relay_backs_off_the_whole_batch(self):
+        for i in range(3):
+            outbox.queue_mail(f"Subject {i}", "Body", "from@example.com", ["to@example.com"])
+        # The worker keeps going rather than dying with the claimed rows stuck in Sending
+        call_command("deliver_email", stdout=StringIO())
+        for email in EmailOutbox.objects.all():
+            self.assertEqual((email.status, email.attempts), ("Pending", 1))
+            self.assertGreater(email.next_attempt_at, timezone.now())
+            self.assertIn("connection refused", email.last_error)
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.deliver_pending(max_attempts=2), (0, 3))
+        self.assertEqual(set(EmailOutbox.objects.values_list('status', flat=True)), {"Failed"})
+
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Scheduler", rooms=1)
+        self.check_in = timezone.localdate() + timedelta(days=3)
+        self.hold = make_reservation(
+            self.room_type, self.check_in, self.check_in + timedelta(days=2), status="Hold",
+            expiration_time=timezone.now() - timedelta(minutes=5),
+        )
+
+    def test_search_no_longer_writes(self):
+        self.client.get(reverse("reservation"), {
+            "check_in": self.check_in.isoformat(),
+            "check_out": (self.check_in + timedelta(days=1)).isoformat(),
+        })
+        self.hold.refresh_from_db()
+        self.assertEqual(self.hold.status, "Hold")
+
+    def test_only_one_process_holds_the_lease(self):
+        self.assertTrue(jobs.acquire_lease("test", "a", timedelta(minutes=1)))
+        self.assertFalse(jobs.acquire_lease("test", "b", timedelta(minutes=1)))
+        self.assertTrue(jobs.acquire_lease("test", "a", timedelta(minutes=1)))
+        jobs.release_lease("test", "a")
+        self.assertTrue(jobs.acquire_lease("test", "b", timedelta(minutes=1)))
+
+    def test_scheduler_expires_holds_in_batches_and_records_runs(self):
+        for _ in range(4):
+            make_reservation(
+                self.room_type, self.check_in, self.check_in + timedelta(days=1), status="Hold",
+                expiration_time=timezone.now() - timedelta(minutes=1),
+            )
+        with mock.patch.object(jobs, "EXPIRE_HOLDS_BATCH", 2):
+            call_command("run_scheduler", once=True, stdout=StringIO())
+
+        self.assertFalse(Reservation.objects.filter(status="Hold").exists())
+        run = JobRun.objects.get(name="expire_holds")
+        self.assertEqual((run.rows, run.error), (5, ""))
+        self.assertEqual(
+            set(RoomTypeNight.objects.filter(room_type=self.room_type).values_list('booked', flat=True)),
+            {0},
+        )
+
+        # Ran within its interval, so a second pass does nothing
+        call_command("run_scheduler", once=True, stdout=StringIO())
+        self.assertEqual(JobRun.objects.filter(name="expire_holds").count(), 1)
+
+
+@override_settings(AVAILABILITY_BACKEND="sql", AVAILABILITY_CACHE=False)
+class LapsedHoldTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Lapsed", rooms=1)
+        self.check_in = timezone.localdate() + timedelta(days=5)
+        self.check_out = self.check_in + timedelta(days=2)
+        self.hold = make_reservation(
+            self.room_type, self.check_in, self.check_out, status="Hold",
+            expiration_time=timezone.now() - timedelta(minutes=1),
+        )
+
+    def available(self):
+        return {row["room_type"].id: row["available_count"]
+                for row in get_available_rooms(self.check_in, self.check_out)}
+
+    def test_lapsed_hold_does_not_block_search_or_booking(self):
+        self.assertEqual(self.available()[self.room_type.id], 1)
+        booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out))
+        self.assertNotIn(self.room_type.id, self.available())
+
+    def test_lapsed_hold_cannot_be_confirmed(self):
+        with self.assertRaisesMessage(booking.BookingError, "This hold has expired"):
+            booking.confirm_hold(self.hold)
+
+    def test_live_holds_keep_search_at_one_query(self):
+        Reservation.objects.filter(pk=self.hold.pk).update(expiration_time=timezone.now() + timedelta(hours=1))
+        self.assertNotIn(self.room_type.id, self.available())
+        with self.assertNumQueries(2):  # the catalogue's version, then the search
+            self.available()
+
+    def test_customer_overlap_check_ignores_lapsed_holds(self):
+        now = timezone.now()
+        blocking = Reservation.objects.blocking_inventory(at=now)
+        self.assertFalse(blocking.filter(pk=self.hold.pk).exists())
+        self.assertTrue(Reservation.objects.lapsed_holds(at=now).filter(pk=self.hold.pk).exists())
+        self.assertFalse(self.hold.blocks_inventory(now))
+
+
+@skipUnless(occupancy.np is not None, "NumPy is not installed")
+@override_settings(AVAILABILITY_BACKEND="numpy", AVAILABILITY_CACHE=False)
+class OccupancyMatrixTests(TestCase):
+    def setUp(self):
+        occupancy.reset()
+        self.today = timezone.localdate()
+        self.small = make_room_type("Matrix Small", rooms=2, max_guests=2)
+        self.large = make_room_type("Matrix Large", rooms=1, max_guests=6)
+
+    def search(self, check_in, check_out, guests=None, backend="numpy"):
+        with self.settings(AVAILABILITY_BACKEND=backend):
+            return [(row["room_type"].id, row["available_count"])
+                    for row in get_available_rooms(check_in, check_out, guests)]
+
+    def test_matches_the_ledger(self):
+        day = lambda n: self.today + timedelta(days=n)
+        make_reservation(self.small, day(2), day(5))
+        make_reservation(self.small, day(4), day(6), status="Hold",
+                         expiration_time=timezone.now() - timedelta(minutes=1))
+        make_reservation(self.large, day(3), day(4), status="Hold",
+                         expiration_time=timezone.now() + timedelta(hours=1))
+        make_reservation(self.large, day(1), day(8), status="Cancelled")
+        room = Room.objects.create(room_number="Matrix-M", room_type=self.small)
+        RoomMaintenanceWindow.objects.create(room=room, start_date=day(2), end_date=day(4))
+
+        for check_in, check_out, guests in [(1, 3, None), (2, 6, 1), (3, 4, 3), (5, 9, None), (0, 1, 2)]:
+            self.assertEqual(
+                self.search(day(check_in), day(check_out), guests),
+                self.search(day(check_in), day(check_out), guests, backend="sql"),
+            )
+        room.delete()
+
+    def test_stays_past_the_horizon_fall_back_to_the_ledger(self):
+        check_in = self.today + timedelta(days=occupancy.HORIZON_DAYS)
+        check_out = check_in + timedelta(days=2)
+        self.assertEqual(self.search(check_in, check_out), self.search(check_in, check_out, backend="sql"))
+
+
+@skipUnless(occupancy.np is not None, "NumPy is not installed")
+@override_settings(AVAILABILITY_BACKEND="numpy", AVAILABILITY_CACHE=False)
+class OccupancyVersionTests(TransactionTestCase):
+    def setUp(self):
+        occupancy.reset()
+        self.room_type = make_room_type("Versioned", rooms=1)
+        self.check_in = timezone.localdate() + timedelta(days=7)
+        self.check_out = self.check_in + timedelta(days=2)
+
+    def tearDown(self):
+        occupancy.reset()
+
+    def available(self):
+        return {row["room_type"].id: row["available_count"]
+                for row in get_available_rooms(self.check_in, self.check_out)}.get(self.room_type.id, 0)
+
+    def test_own_writes_apply_in_place_and_other_writes_rebuild(self):
+        self.assertEqual(self.available(), 1)
+        with mock.patch.object(occupancy.OccupancyMatrix, "load", wraps=occupancy.OccupancyMatrix.load) as load:
+            booked = booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out))
+            with self.assertNumQueries(1):
+                self.assertEqual(self.available(), 0)
+            self.assertEqual(load.call_count, 0)
+
+            # Another worker cancels it: the ledger changes without this
+            # process's signals seeing it, but the version moves on
+            Reservation.objects.filter(pk=booked.pk).update(status="Cancelled")
+            inventory.adjust_booked((self.room_type.id, self.check_in, self.check_out), -1)
+            versions.bump(versions.INVENTORY)
+            self.assertEqual(self.available(), 1)
+            self.assertEqual(load.call_count, 1)
+
+    def test_edits_that_leave_the_nights_alone_keep_the_version(self):
+        hold = booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out, "Hold"),
+                                          expiration_time=timezone.now() + timedelta(hours=1))
+        version = versions.current(versions.INVENTORY)
+        hold.guest_first_name = "Renamed"
+        hold.save()
+        self.assertEqual(versions.current(versions.INVENTORY), version)
+        self.assertFalse(
+            [query for query in self.queries_of(hold.save) if "data_versions" in query["sql"]]
+        )
+
+        # A new expiry changes when the hold lapses, so availability moves on
+        hold.expiration_time += timedelta(hours=1)
+        hold.save()
+        self.assertEqual(versions.current(versions.INVENTORY), version + 1)
+
+    def queries_of(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        return queries.captured_queries
+
+
+class AvailabilityCalendarTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Calendar", rooms=2)
+        self.month_start = (timezone.localdate().replace(day=1) + timedelta(days=32)).replace(day=1)
+        self.month = self.month_start.strftime("%Y-%m")
+
+    def calendar(self, month):
+        return self.client.get(reverse("reservation_calendar"), {"month": month})
+
+    def free(self, data):
+        return next(rt["free"] for rt in data["room_types"] if rt["id"] == self.room_type.id)
+
+    def test_counts_match_single_night_searches(self):
+        day = lambda n: self.month_start + timedelta(days=n)
+        make_reservation(self.room_type, day(-2), day(3))
+        make_reservation(self.room_type, day(2), day(4), status="Hold",
+                         expiration_time=timezone.now() + timedelta(hours=1))
+        make_reservation(self.room_type, day(5), day(7), status="Hold",
+                         expiration_time=timezone.now() - timedelta(hours=1))
+        make_reservation(self.room_type, day(6), day(40))
+        room = Room.objects.create(room_number="Calendar-M", room_type=self.room_type)
+        RoomMaintenanceWindow.objects.create(room=room, start_date=day(3), end_date=day(11))
+
+        with self.assertNumQueries(4):
+            data = self.calendar(self.month).json()
+        self.assertEqual(len(data["dates"]), (day(32).replace(day=1) - day(0)).days)
+        free = self.free(data)
+        for i, date in enumerate(data["dates"]):
+            night = day(i)
+            self.assertEqual(date, night.isoformat())
+            found = {row["room_type"].id: row["available_count"]
+                     for row in get_available_rooms(night, night + timedelta(days=1))}
+            self.assertEqual(free[i], found.get(self.room_type.id, 0), date)
+
+    def test_rejects_a_bad_month(self):
+        self.assertEqual(self.calendar("2026-13").status_code, 400)
+        self.assertEqual(self.calendar("soon").status_code, 400)
+
+    def test_rejects_months_out_of_range(self):
+        today = timezone.localdate()
+        last = today.replace(day=1)
+        for _ in range(helpers.CALENDAR_MAX_MONTHS):
+            last = (last + timedelta(days=32)).replace(day=1)
+        self.assertEqual(self.calendar(last.strftime("%Y-%m")).status_code, 200)
+        too_far = (last + timedelta(days=32)).replace(day=1)
+        last_month = (today.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+        for month in ("9999-12", too_far.strftime("%Y-%m"), last_month, "0001-01"):
+            with self.subTest(month):
+                self.assertEqual(self.calendar(month).status_code, 400)
+
+
+class FlexibleSearchTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Flexible", rooms=1, price="80.00")
+        self.start = timezone.localdate() + timedelta(days=3)
+        self.end = self.start + timedelta(days=14)
+
+    def flexible(self, **params):
+        params = {"check_in": self.start.isoformat(), "check_out": self.end.isoformat(),
+                  "nights": 3, "room_type": self.room_type.id, **params}
+        return self.client.get(reverse("reservation_flexible"), params)
+
+    def test_sliding_window_min(self):
+        values = [3, 1, 4, 1, 5, 9, 2, 6]
+        for width in range(1, len(values) + 1):
+            self.assertEqual(
+                helpers.sliding_window_min(values, width),
+                [min(values[i:i + width]) for i in range(len(values) - width + 1)],
+            )
+
+    def test_matches_one_search_per_check_in_date(self):
+        make_reservation(self.room_type, self.start + timedelta(days=2), self.start + timedelta(days=4))
+        make_reservation(self.room_type, self.start + timedelta(days=9), self.start + timedelta(days=10))
+
+        with self.assertNumQueries(5):  # catalogue version, room types, rooms, reservations, rates
+            stays = self.flexible().json()["stays"]
+        expected = []
+        for offset in range(14 - 3 + 1):
+            check_in = self.start + timedelta(days=offset)
+            check_out = check_in + timedelta(days=3)
+            if get_available_rooms(check_in, check_out, selected_room_type_id=self.room_type.id):
+                expected.append(check_in.isoformat())
+        self.assertEqual([stay["check_in"] for stay in stays], expected)
+        self.assertEqual(stays[0]["total_cost"], "240.00")
+
+    def test_form_option_lists_stays(self):
+        response = self.client.get(reverse("reservation"), {
+            "check_in": self.start.isoformat(), "check_out": self.end.isoformat(),
+            "flexible": "1", "nights": 13, "room_type": self.room_type.id,
+        })
+        self.assertEqual(
+            [stay["check_in"] for stay in response.context["flexible_stays"]],
+            [self.start, self.start + timedelta(days=1)],
+        )
+
+    def test_rejects_stays_longer_than_the_window(self):
+        self.assertEqual(self.flexible(nights=15).status_code, 400)
+        self.assertEqual(self.flexible(check_out=(self.start + timedelta(days=120)).isoformat()).status_code, 400)
+
+
+@override_settings(AVAILABILITY_BACKEND="sql", AVAILABILITY_CACHE=True)
+class AvailabilityCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.room_type = make_room_type("Cached", rooms=1)
+        self.check_in = timezone.localdate() + timedelta(days=4)
+        self.check_out = self.check_in + timedelta(days=2)
+
+    def available(self):
+        return {row["room_type"].id: row["available_count"]
+                for row in get_available_rooms(self.check_in, self.check_out)}.get(self.room_type.id, 0)
+
+    def test_hits_until_inventory_changes(self):
+        self.assertEqual(self.available(), 1)
+        with self.assertNumQueries(1):  # just the version
+            self.assertEqual(self.available(), 1)
+        self.assertEqual(availability_cache.stats(), {"hits": 1, "misses": 1})
+
+        booking.create_reservation(**booking_fields(self.room_type, self.check_in, self.check_out))
+        self.assertEqual(self.available(), 0)
+        Room.objects.create(room_number="Cached-2", room_type=self.room_type)
+        self.assertEqual(self.available(), 1)
+        self.assertEqual(availability_cache.stats(), {"hits": 1, "misses": 3})
+
+    def test_answer_expires_with_the_holds_it_counted(self):
+        hold = make_reservation(self.room_type, self.check_in, self.check_out, status="Hold",
+                                expiration_time=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.available(), 0)
+        later = timezone.now() + timedelta(hours=2)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            self.assertEqual(self.available(), 1)
+        self.assertTrue(Reservation.objects.lapsed_holds(later).filter(pk=hold.pk).exists())
+
+    def test_concurrent_misses_compute_once(self):
+        computed = []
+
+        def compute():
+            computed.append(1)
+            time.sleep(0.2)
+            return "answer", None
+
+        def search(_):
+            try:
+                return availability_cache.get_or_compute(("single", "flight"), compute)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            answers = list(pool.map(search, range(5)))
+        self.assertEqual(answers, ["answer"] * 5)
+        self.assertEqual(len(computed), 1)
+
+
+class PricingTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Priced", rooms=2, price="100.00")
+        self.check_in = timezone.localdate() + timedelta(days=10)
+        self.check_out = self.check_in + timedelta(days=4)
+        # Second and third nights are on a festival rate
+        for i in (1, 2):
+            RoomRate.objects.create(room_type=self.room_type, date=self.check_in + timedelta(days=i),
+                                    price=Decimal("150.00"), label="Festival")
+
+    def test_rates_override_the_base_price(self):
+        prices = pricing.PriceCalendar(self.check_in, self.check_out, [self.room_type])
+        day = lambda n: self.check_in + timedelta(days=n)
+        self.assertEqual(prices.stay_total(self.room_type.id, day(0), day(4)), Decimal("500.00"))
+        self.assertEqual(prices.stay_total(self.room_type.id, day(1), day(3)), Decimal("300.00"))
+        self.assertEqual(prices.stay_total(self.room_type.id, day(3), day(4)), Decimal("100.00"))
+        self.assertEqual(pricing.average_nightly(Decimal("500.00"), 4), Decimal("125.00"))
+
+    def test_a_nightly_rate_fits_in_a_total(self):
+        # A one night stay's total is its rate, so a rate can't be bigger than a total
+        rate = RoomRate._meta.get_field("price")
+        for field in (RoomType._meta.get_field("price_per_night"), Reservation._meta.get_field("total_cost")):
+            self.assertEqual((rate.max_digits, rate.decimal_places), (field.max_digits, field.decimal_places))
+
+    def test_search_prices_stays_and_bookings_keep_their_price(self):
+        User.objects.create_user("priced", "priced@example.com", "pw", first_name="Pat", last_name="Price")
+        self.client.login(username="priced", password="pw")
+        response = self.client.get(reverse("reservation"), {
+            "check_in": self.check_in.isoformat(), "check_out": self.check_out.isoformat(),
+            "room_type": self.room_type.id,
+        })
+        self.assertEqual(response.context["available_room_types"][0]["total_cost"], Decimal("500.00"))
+
+        self.client.post(reverse("save_reservation"), {
+            "first_name": "Pat", "last_name": "Price", "email": "priced@example.com",
+            "phone_number": "555-555-5555", "check_in": self.check_in.isoformat(),
+            "check_out": self.check_out.isoformat(), "guests_final": 1,
+            "room_type": self.room_type.id, "status": "Confirmed",
+        })
+        reservation = Reservation.objects.get(room_type=self.room_type)
+        self.assertEqual(reservation.total_cost, Decimal("500.00"))
+
+        # A later price change does not touch what was booked
+        RoomType.objects.filter(pk=self.room_type.pk).update(price_per_night=Decimal("999.00"))
+        response = self.client.get(reverse("reservation_detail", args=[reservation.public_id]))
+        self.assertEqual(response.context["total_cost"], Decimal("500.00"))
+
+    def test_modify_reprices_the_stay(self):
+        reservation = make_reservation(self.room_type, self.check_in, self.check_out)
+        booking.modify_reservation(reservation, self.check_in, self.check_in + timedelta(days=2), 1, self.room_type)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.total_cost, Decimal("250.00"))
+
+
+class RoomAssignmentTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Assigned", rooms=2)
+        self.rooms = list(Room.objects.filter(room_type=self.room_type).order_by('room_number'))
+        self.today = timezone.localdate()
+
+    def day(self, n):
+        return self.today + timedelta(days=n)
+
+    def assert_no_double_booking(self):
+        stays = Reservation.objects.filter(room_type=self.room_type, status="Confirmed")
+        self.assertFalse(stays.filter(room__isnull=True).exists())
+        for stay in stays:
+            self.assertFalse(stays.exclude(pk=stay.pk).filter(
+                room=stay.room_id, start_date__lt=stay.end_date, end_date__gt=stay.start_date,
+            ).exists(), stay)
+
+    def test_partition_uses_no_more_rooms_than_the_busiest_night(self):
+        stays = [(1, self.day(1), self.day(3)), (2, self.day(2), self.day(5)),
+                 (3, self.day(3), self.day(6)), (4, self.day(5), self.day(7))]
+        placed, unplaced = assignment.partition(stays, {"a": [], "b": []})
+        self.assertEqual(unplaced, [])
+        self.assertEqual(placed[1], placed[3])
+        self.assertEqual(placed[2], placed[4])
+
+    def test_confirming_places_stays_and_reshuffles_when_fragmented(self):
+        # Best fit leaves room 0 with [1,3) and room 1 with [4,6); a [2,5) stay
+        # then fits the type but no single room, so the future gets reshuffled
+        first = booking.create_reservation(**booking_fields(self.room_type, self.day(1), self.day(3)))
+        second = booking.create_reservation(**booking_fields(self.room_type, self.day(4), self.day(6)))
+        Reservation.objects.filter(pk=second.pk).update(room=self.rooms[1])
+        Reservation.objects.filter(pk=first.pk).update(room=self.rooms[0])
+        hold = booking.create_reservation(**booking_fields(self.room_type, self.day(2), self.day(5), status="Hold"))
+        self.assertIsNone(hold.room_id)
+
+        booking.confirm_hold(hold)
+        hold.refresh_from_db()
+        self.assertIsNotNone(hold.room_id)
+        self.assert_no_double_booking()
+
+    def test_in_house_guests_keep_their_rooms(self):
+        staying = make_reservation(self.room_type, self.day(-1), self.day(2), room=self.rooms[1])
+        make_reservation(self.room_type, self.day(0), self.day(3))
+        make_reservation(self.room_type, self.day(2), self.day(4))
+        room = Room.objects.create(room_number="Assigned-M", room_type=self.room_type, status="Maintenance")
+        RoomMaintenanceWindow.objects.create(room=room, start_date=self.day(0), end_date=self.day(2))
+
+        out = StringIO()
+        call_command("assign_rooms", reshuffle=True, room_types=[self.room_type.id], stdout=out)
+        self.assertIn("Assigned 2 reservations", out.getvalue())
+        staying.refresh_from_db()
+        self.assertEqual(staying.room, self.rooms[1])
+        self.assert_no_double_booking()
+
+
+@override_settings(AVAILABILITY_BACKEND="sql", AVAILABILITY_CACHE=False)
+class MaintenanceWindowTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Windowed", rooms=1)
+        self.room = Room.objects.get(room_type=self.room_type)
+        self.today = timezone.localdate()
+
+    def day(self, n):
+        return self.today + timedelta(days=n)
+
+    def free(self, check_in, check_out):
+        found = {row["room_type"].id: row["available_count"] for row in get_available_rooms(check_in, check_out)}
+        return found.get(self.room_type.id, 0)
+
+    def test_windows_only_take_the_nights_they_cover(self):
+        self.room.status = "Maintenance"
+        self.room.save()
+        RoomMaintenanceWindow.objects.create(room=self.room, start_date=self.day(0), end_date=self.day(3))
+        RoomMaintenanceWindow.objects.create(room=self.room, start_date=self.day(20), end_date=self.day(22))
+
+        self.assertEqual(self.free(self.day(1), self.day(5)), 0)
+        self.assertEqual(self.free(self.day(3), self.day(5)), 1)  # back part way through the week
+        self.assertEqual(self.free(self.day(19), self.day(21)), 0)
+        self.assertEqual(self.free(self.day(22), self.day(24)), 1)
+
+    def test_maintenance_without_windows_is_out_indefinitely(self):
+        self.room.status = "Maintenance"
+        self.room.save()
+        self.assertEqual(self.free(self.day(300), self.day(301)), 0)
+
+    def test_capacity_reads_rooms_and_windows_in_one_query(self):
+        RoomMaintenanceWindow.objects.create(room=self.room, start_date=self.day(2), end_date=self.day(4))
+        RoomMaintenanceWindow.objects.create(room=self.room, start_date=self.day(3), end_date=self.day(5))
+        RoomMaintenanceWindow.objects.create(room=self.room, start_date=self.day(-9), end_date=self.day(-5))
+        with self.assertNumQueries(1):
+            capacity = inventory.nightly_capacity(self.day(0), self.day(6), [self.room_type.id])
+        self.assertEqual(capacity[self.room_type.id], [1, 1, 0, 0, 0, 1])
+
+    def test_assignment_moves_stays_out_of_new_windows(self):
+        other = Room.objects.create(room_number="Windowed-1", room_type=self.room_type)
+        stay = booking.create_reservation(**booking_fields(self.room_type, self.day(1), self.day(3)))
+        self.assertEqual(stay.room_id, self.room.id)
+
+        RoomMaintenanceWindow.objects.create(room=self.room, start_date=self.day(2), end_date=self.day(4))
+        self.assertEqual(assignment.assign_rooms([self.room_type.id]), (1, 0))
+        stay.refresh_from_db()
+        self.assertEqual(stay.room, other)
+
+        later = booking.create_reservation(**booking_fields(self.room_type, self.day(3), self.day(5)))
+        self.assertEqual(later.room_id, other.id)
+
+    def test_partition_works_around_blocked_spans(self):
+        stays = [(1, self.day(1), self.day(3)), (2, self.day(2), self.day(5)), (3, self.day(5), self.day(6))]
+        placed, unplaced = assignment.partition(stays, {"a": [(self.day(3), self.day(5))], "b": []})
+        self.assertEqual(unplaced, [])
+        self.assertEqual(placed, {1: "a", 2: "b", 3: "a"})
+
+
+class ReservationSearchTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Searched", rooms=3)
+        self.user = User.objects.create_user("staff", "Front.Desk@Example.com", "pw", is_staff=True)
+        self.check_in = timezone.localdate() + timedelta(days=5)
+        self.check_out = self.check_in + timedelta(days=2)
+        self.linked = make_reservation(self.room_type, self.check_in, self.check_out, customer=self.user.customer,
+                                       guest_first_name="Mary Ann", guest_last_name="Smith-Jones")
+        self.walk_in = make_reservation(self.room_type, self.check_in, self.check_out,
+                                        guest_first_name="Sam", guest_last_name="Smithers",
+                                        guest_email="Sam@Example.com")
+        self.client.force_login(self.user)
+
+    def search(self, **fields):
+        response = self.client.post(reverse("search"), fields)
+        return {reservation.pk for reservation in response.context["results"]}
+
+    def test_save_fills_the_search_columns(self):
+        self.assertEqual((self.linked.search_first_name, self.linked.search_last_name), ("mary ann", "smith-jones"))
+        self.assertEqual(self.linked.search_email, "front.desk@example.com")
+        self.assertEqual(self.walk_in.search_email, "sam@example.com")
+
+        self.user.email = "New@Example.com"
+        self.user.save()
+        self.linked.refresh_from_db()
+        self.assertEqual(self.linked.search_email, "new@example.com")
+
+    def test_lookups_match_like_the_old_filters(self):
+        self.assertEqual(self.search(search_type="name", last_name="SMITH"), {self.linked.pk, self.walk_in.pk})
+        self.assertEqual(self.search(search_type="name", first_name="mary", last_name="smith-"), {self.linked.pk})
+        self.assertEqual(self.search(search_type="name", first_name="ann"), set())
+        self.assertEqual(self.search(search_type="email", email=" front.desk@EXAMPLE.com"), {self.linked.pk})
+        self.assertEqual(self.search(search_type="email", email="sam@example.com"), {self.walk_in.pk})
+
+        number = self.walk_in.public_id
+        for typed in (number, number.lower(), " " + number[4:].lower(), "MBL " + number[4:]):
+            self.assertEqual(self.search(search_type="reservation_id", reservation_id=typed), {self.walk_in.pk}, typed)
+
+    def test_prefix_match_ignores_collation_order(self):
+        from .models import prefix_match
+        lopez = make_reservation(self.room_type, self.check_in, self.check_out,
+                                 guest_first_name="Ana", guest_last_name="Lopez")
+        self.assertEqual(self.search(search_type="name", last_name="lopez"), {lopez.pk})
+        # MySQL's unicode collations sort "{" before "z", so no range up to it there
+        self.assertEqual(prefix_match('search_last_name', "lopez", "mysql"), Q(search_last_name__istartswith="lopez"))
+
+    def test_canonical_public_id(self):
+        from .models import canonical_public_id
+        self.assertEqual(canonical_public_id(" mbl-1a2b3c4d"), "MBL-1A2B3C4D")
+        self.assertEqual(canonical_public_id("MBL1A2B3C4D"), "MBL-1A2B3C4D")
+        self.assertEqual(canonical_public_id("1a2b 3c4d"), "MBL-1A2B3C4D")
+        self.assertEqual(canonical_public_id(""), "")
+
+
+class SearchPaginationTests(TestCase):
+    def setUp(self):
+        room_type = make_room_type("Paged", rooms=40)
+        today = timezone.localdate()
+        # Shared start dates and statuses, so pages split ties on id
+        for i in range(60):
+            make_reservation(room_type, today + timedelta(days=i % 4), today + timedelta(days=5),
+                             status=("Hold", "Confirmed", "Cancelled")[i % 3], guest_last_name="Pager")
+        self.staff = User.objects.create_user("pager", "pager@example.com", "pw", is_staff=True)
+        self.client.force_login(self.staff)
+        self.expected = list(Reservation.objects.ordered().values_list('pk', flat=True))
+
+    def test_staff_listing_pages_through_everything_once(self):
+        seen = []
+        after = ""
+        while True:
+            response = self.client.get(reverse("search"), {"after": after} if after else {})
+            self.assertTrue(response.context["listing"])
+            seen += [reservation.pk for reservation in response.context["results"]]
+            after = response.context["next_cursor"]
+            if not after:
+                break
+        self.assertEqual(seen, self.expected)
+
+    def test_search_pages_cost_the_same(self):
+        fields = {"search_type": "name", "last_name": "pager"}
+        with self.assertNumQueries(3):  # session, user, the page itself
+            first = self.client.post(reverse("search"), fields)
+        results = first.context["results"]
+        self.assertEqual(len(results), helpers.SEARCH_PAGE_SIZE)
+        with self.assertNumQueries(0):
+            [reservation.room_type.name for reservation in results]
+
+        with self.assertNumQueries(3):
+            second = self.client.post(reverse("search"), {**fields, "after": first.context["next_cursor"]})
+        pks = [reservation.pk for reservation in results + second.context["results"]]
+        self.assertEqual(pks, self.expected[:len(pks)])
+        self.assertContains(second, "Next page")
+
+    def test_bad_cursor_shows_the_first_page(self):
+        response = self.client.get(reverse("search"), {"after": "nonsense"})
+        self.assertEqual(response.context["results"][0].pk, self.expected[0])
+
+
+class CustomerLookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for first, last, phone in [("Jane", "Doe", "(360) 555-0101"), ("Janet", "Smith", "360.555.0199"),
+                                   ("Bob", "Janeway", None)]:
+            user = User.objects.create_user(f"{first}.{last}".lower(), f"{first}.{last}@Example.com".lower(), "pw",
+                                            first_name=first, last_name=last)
+            user.customer.phone_number = phone
+            user.customer.save()
+        self.staff = User.objects.create_user("desk", "desk@example.com", "pw", first_name="Jan", is_staff=True)
+        self.client.force_login(self.staff)
+
+    def lookup(self, query):
+        response = self.client.get(reverse("customer_lookup"), {"q": query})
+        return [f"{row['first_name']} {row['last_name']}" for row in response.json()["customers"]]
+
+    def test_prefix_matches_on_name_email_and_phone(self):
+        self.assertEqual(self.lookup("jan"), ["Bob Janeway", "Jane Doe", "Janet Smith"])  # staff left out
+        self.assertEqual(self.lookup("  Jane   D "), ["Jane Doe"])
+        self.assertEqual(self.lookup("Janet.Smith@ex"), ["Janet Smith"])
+        self.assertEqual(self.lookup("360-555-01"), ["Jane Doe", "Janet Smith"])
+        self.assertEqual(self.lookup("3605550199"), ["Janet Smith"])
+        self.assertEqual(self.lookup("oe"), [])
+        self.assertEqual(self.lookup(""), [])
+
+    def test_prefixes_ending_in_z_or_9(self):
+        User.objects.create_user("inez.diaz", "inez.diaz@example.com", "pw", first_name="Inez", last_name="Diaz")
+        self.assertEqual(self.lookup("diaz"), ["Inez Diaz"])
+        self.assertEqual(self.lookup("inez"), ["Inez Diaz"])
+        self.assertEqual(self.lookup("360-555-019"), ["Janet Smith"])
+        # On MySQL these are LIKE 'diaz%', not a range up to "dia{"
+        from .models import Customer
+        with mock.patch.object(connection, "vendor", "mysql"):
+            sql = str(Customer.objects.matching("diaz").query)
+        self.assertIn("LIKE", sql)
+        self.assertNotIn("dia{", sql)
+
+    def test_results_are_capped_and_short_prefixes_cached(self):
+        self.assertEqual(len(helpers.lookup_customers("j", limit=2)), 2)
+        with self.assertNumQueries(1):
+            helpers.lookup_customers("ja")
+        with self.assertNumQueries(0):
+            helpers.lookup_customers("JA")
+        with self.assertNumQueries(1):
+            helpers.lookup_customers("jane")
+
+    def test_renamed_users_are_found_by_their_new_name(self):
+        user = User.objects.get(username="bob.janeway")
+        user.last_name = "Marley"
+        user.save()
+        self.assertEqual(self.lookup("marl"), ["Bob Marley"])
+
+    def test_staff_only_and_no_customer_dump(self):
+        response = self.client.get(reverse("reservation"))
+        self.assertNotContains(response, "jane.doe@example.com")
+        self.assertContains(response, reverse("customer_lookup"))
+
+        self.client.force_login(User.objects.get(username="jane.doe"))
+        self.assertEqual(self.client.get(reverse("customer_lookup"), {"q": "ja"}).status_code, 403)
+
+
+class AccountDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.room_type = make_room_type("Dashboard", rooms=40)
+        self.user = User.objects.create_user("guest", "guest@example.com", "pw")
+        self.customer = self.user.customer
+        self.client.force_login(self.user)
+        self.today = timezone.localdate()
+
+    def book(self, count, status="Confirmed", offset=30):
+        for i in range(count):
+            make_reservation(self.room_type, self.today + timedelta(days=offset + i),
+                             self.today + timedelta(days=offset + i + 2), status=status, customer=self.customer)
+
+    def test_query_count_does_not_grow_with_history(self):
+        for count in (3, 30):
+            with self.captureOnCommitCallbacks(execute=True):
+                Reservation.objects.filter(customer=self.customer).delete()
+                self.book(count)
+            self.client.get(reverse("account"))  # fills the summary
+            # session, user and customer, the six newest reservations
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse("account"))
+            with self.assertNumQueries(0):
+                [res.room_type.name for res in response.context["recent_reservations"]]
+            self.assertEqual(len(response.context["recent_reservations"]), min(count, 5))
+            self.assertEqual(response.context["has_more_reservations"], count > 5)
+            self.assertEqual(response.context["summary"]["total"], count)
+
+    def test_summary_counts_and_next_stay(self):
+        self.book(2, offset=10)
+        self.book(1, status="Hold", offset=5)
+        self.book(1, status="Cancelled", offset=1)
+        make_reservation(self.room_type, self.today - timedelta(days=9), self.today - timedelta(days=7),
+                         customer=self.customer)
+        summary = account_summary.get(self.customer.id)
+        self.assertEqual(summary["counts"], {"Hold": 1, "Confirmed": 3, "Cancelled": 1})
+        self.assertEqual(summary["total"], 5)
+        self.assertEqual(summary["upcoming"]["status"], "Hold")
+        self.assertEqual(summary["upcoming"]["start_date"], self.today + timedelta(days=5))
+        self.assertEqual(summary["upcoming"]["room_type__name"], "Dashboard")
+
+    def test_reservation_changes_drop_the_summary(self):
+        self.book(1)
+        self.assertEqual(account_summary.get(self.customer.id)["total"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(1, offset=50)
+        self.assertEqual(account_summary.get(self.customer.id)["total"], 2)
+
+        # Holds cancelled by the expiry job skip the signals
+        hold = make_reservation(self.room_type, self.today + timedelta(days=60), self.today + timedelta(days=61),
+                                status="Hold", customer=self.customer,
+                                expiration_time=timezone.now() - timedelta(minutes=1))
+        account_summary.get(self.customer.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.cancel_expired_holds(timezone.now())
+        self.assertEqual(account_summary.get(self.customer.id)["counts"]["Cancelled"], 1)
+
+        # Moving a reservation to another customer updates both
+        other = User.objects.create_user("other", "other@example.com", "pw").customer
+        self.assertEqual(account_summary.get(other.id)["total"], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            hold = Reservation.objects.get(pk=hold.pk)
+            hold.customer = other
+            hold.save()
+        self.assertEqual(account_summary.get(self.customer.id)["total"], 2)
+        self.assertEqual(account_summary.get(other.id)["total"], 1)
+
+
+class CustomerWriteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("sam@example.com", "sam@example.com", "Secret123",
+                                             first_name="Sam", last_name="Stone")
+
+    def customer_writes(self, queries):
+        table = connection.ops.quote_name("customers")
+        return [query["sql"] for query in queries.captured_queries
+                if query["sql"].startswith((f"INSERT INTO {table}", f"UPDATE {table}"))]
+
+    def test_login_only_touches_last_login(self):
+        # user, session exists check, session insert, last_login, session
+        # update (the two session writes each in a savepoint)
+        with self.assertNumQueries(9) as queries:
+            response = self.client.post(reverse("login"), {"username": "sam@example.com", "password": "Secret123"})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse([query for query in queries.captured_queries if "customers" in query["sql"]])
+
+    def test_registration_writes_the_customer_once_after_creating_it(self):
+        fields = {"first_name": "Kim", "last_name": "Lee", "email": "kim@example.com", "phone_number": "555-0100",
+                  "password": "Secret123", "confirm_password": "Secret123", "agreedToTerms": "on"}
+        # username check, user insert, customer insert, phone update
+        with self.assertNumQueries(4) as queries:
+            self.client.post(reverse("register"), fields)
+        self.assertEqual(len(self.customer_writes(queries)), 2)
+        self.assertEqual(User.objects.get(username="kim@example.com").customer.search_phone, "5550100")
+
+    def test_profile_update_writes_changed_fields_once(self):
+        self.client.force_login(self.user)
+        fields = {"action": "update_info", "first_name": "Sammy", "last_name": "Stone", "email": "sam@example.com",
+                  "phone_number": "555-0101"}
+        # session, user and customer, email check, user update, customer
+        # update, reservation emails, then the page: recent reservations and
+        # the summary's counts and next stay
+        with self.assertNumQueries(9) as queries:
+            self.client.post(reverse("account"), fields)
+        writes = self.customer_writes(queries)
+        self.assertEqual(len(writes), 1)
+        self.assertNotIn("search_email", writes[0])  # unchanged, so not written
+        customer = User.objects.get(pk=self.user.pk).customer
+        self.assertEqual((customer.search_first_name, customer.phone_number), ("sammy", "555-0101"))
+
+        # Saving again with nothing changed writes nothing
+        with self.assertNumQueries(0):
+            customer.save()
+
+
+@override_settings(AVAILABILITY_BACKEND="sql", AVAILABILITY_CACHE=False)
+class CustomerBackendTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Backend", rooms=5)
+        self.user = User.objects.create_user("cara@example.com", "cara@example.com", "pw",
+                                             first_name="Cara", last_name="Diaz")
+        self.user.customer.phone_number = "555-0100"
+        self.user.customer.save()
+        self.staff = User.objects.create_user("desk@example.com", "desk@example.com", "pw", is_staff=True)
+        check_in = timezone.localdate() + timedelta(days=20)
+        self.check_in, self.check_out = check_in, check_in + timedelta(days=2)
+        self.confirmed = make_reservation(self.room_type, check_in, check_in + timedelta(days=2),
+                                          customer=self.user.customer)
+        self.hold = make_reservation(self.room_type, check_in, check_in + timedelta(days=2), status="Hold",
+                                     customer=self.user.customer,
+                                     expiration_time=timezone.now() + timedelta(hours=1))
+
+    def queries(self, user, backend, method, url, data):
+        """Queries one request makes with the user logged in through backend (its writes rolled back)."""
+        self.client.force_login(user, backend=backend)
+        cache.clear()
+        catalogue.reset()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                getattr(self.client, method)(url, data)
+            transaction.set_rollback(True)
+        return len(queries)
+
+    def test_every_view_saves_the_customer_query(self):
+        stay = {"check_in": self.check_in.isoformat(), "check_out": self.check_out.isoformat()}
+        booking = {**stay, "guests_final": "1", "room_type": str(self.room_type.id), "status": "Hold"}
+        confirmed, hold = self.confirmed.public_id, self.hold.public_id
+        # (url name, url args, method, data, staff, queries saved)
+        views = [
+            ("index", [], "get", {}, False, 0),
+            ("about", [], "get", {}, False, 0),
+            ("attractions", [], "get", {}, False, 0),
+            ("login", [], "get", {}, False, 0),
+            ("register", [], "get", {}, False, 0),
+            ("logout", [], "post", {}, False, 0),
+            ("account", [], "get", {}, False, 1),
+            ("reservation", [], "get", stay, False, 1),
+            ("save_reservation", [], "post", booking, False, 1),
+            ("reservation_calendar", [], "get", {}, False, 0),
+            ("reservation_flexible", [], "get", {**stay, "nights": "1"}, False, 0),
+            ("customer_lookup", [], "get", {"q": "ca"}, True, 0),
+            ("reservation_detail", [confirmed], "get", {}, False, 1),
+            ("search", [], "get", {}, False, 1),
+            ("send_secondary_email", [], "post", {"reservation_id": confirmed, "secondary_email": "x@example.com"},
+             False, 1),
+            ("confirm_hold_reservation", [hold], "post", {}, False, 1),
+            ("cancel_reservation", [confirmed], "post", {}, False, 1),
+            ("reservation_modify", [confirmed], "get", {}, False, 1),
+            ("retry_hold_availability", [hold], "post", {}, False, 1),
+        ]
+        for name, args, method, data, staff, saved in views:
+            with self.subTest(name):
+                user = self.staff if staff else self.user
+                url = reverse(name, args=args)
+                before = self.queries(user, "django.contrib.auth.backends.ModelBackend", method, url, data)
+                after = self.queries(user, "web.backends.CustomerBackend", method, url, data)
+                self.assertEqual(before - after, saved)
+
+    def test_staff_bookings_go_to_the_selected_customer(self):
+        self.client.force_login(self.staff)
+        self.client.post(reverse("save_reservation"), {
+            "check_in": self.check_in.isoformat(), "check_out": self.check_out.isoformat(), "guests_final": "1",
+            "room_type": str(self.room_type.id), "status": "Hold", "customer_id": str(self.user.customer.id),
+        })
+        reservation = Reservation.objects.latest("id")
+        self.assertEqual(reservation.customer, self.user.customer)
+        self.assertEqual(reservation.guest_email, "cara@example.com")
+
+
+class RoomTypeCatalogueTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Catalogued", rooms=1, max_guests=3)
+
+    def names(self):
+        return [room_type.name for room_type in catalogue.room_types()]
+
+    def in_request(self):
+        """Read the catalogue as a request would, checking the version once."""
+        catalogue.begin_request()
+        self.addCleanup(catalogue.end_request)
+
+    def test_reads_are_free_until_a_room_type_changes(self):
+        self.in_request()
+        self.assertIn("Catalogued", self.names())
+        with self.assertNumQueries(0):
+            record = catalogue.get(str(self.room_type.id))
+            self.names()
+        self.assertEqual((record.name, record.max_guests, record.pk), ("Catalogued", 3, self.room_type.id))
+        self.assertIsNone(catalogue.get("nope"))
+        with self.assertRaises(AttributeError):
+            record.name = "Renamed"
+
+        self.room_type.name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room_type.save()
+        self.assertEqual(catalogue.get(self.room_type.id).name, "Renamed")
+        with self.assertNumQueries(0):
+            self.names()
+
+    def test_changes_from_other_workers_are_seen_by_the_next_request(self):
+        self.in_request()
+        self.names()
+        # Another worker changes the price; its signal bumps the shared counter
+        RoomType.objects.filter(pk=self.room_type.pk).update(price_per_night=Decimal("250.00"))
+        versions.bump(versions.ROOM_TYPES)
+        self.assertEqual(catalogue.get(self.room_type.id).price_per_night, Decimal("100.00"))
+        catalogue.end_request()
+        self.assertEqual(catalogue.get(self.room_type.id).price_per_night, Decimal("250.00"))
+
+    def test_uncommitted_changes_are_not_kept(self):
+        self.in_request()
+        self.names()
+        with transaction.atomic():
+            RoomType.objects.create(name="Draft", price_per_night=Decimal("50.00"), beds=1, max_guests=1)
+            self.assertIn("Draft", self.names())
+            with self.assertNumQueries(2):
+                self.names()  # read again while the change is pending
+            transaction.set_rollback(True)
+        self.assertNotIn("Draft", self.names())
+        with self.assertNumQueries(0):
+            self.names()
+
+    def assertReadsNoRoomTypes(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        table = connection.ops.quote_name(RoomType._meta.db_table)
+        self.assertFalse([query for query in queries.captured_queries if f"FROM {table}" in query["sql"]])
+        self.assertLessEqual(len([query for query in queries.captured_queries if "data_versions" in query["sql"]]), 1)
+        return response
+
+    def test_reservation_page_reads_no_room_types(self):
+        response = self.assertReadsNoRoomTypes(reverse("reservation"))
+        self.assertIn(self.room_type.id, [room_type.id for room_type in response.context["room_types"]])
+
+    def test_reservation_detail_and_modify_read_no_room_types(self):
+        user = User.objects.create_user("cat@example.com", "cat@example.com", "pw")
+        check_in = timezone.localdate() + timedelta(days=12)
+        reservation = make_reservation(self.room_type, check_in, check_in + timedelta(days=2),
+                                       customer=user.customer)
+        self.client.force_login(user)
+        response = self.assertReadsNoRoomTypes(reverse("reservation_detail", args=[reservation.public_id]))
+        self.assertContains(response, "Catalogued")
+        response = self.assertReadsNoRoomTypes(reverse("reservation_modify", args=[reservation.public_id]))
+        self.assertContains(response, f'value="{self.room_type.id}" selected')
+
+
+@override_settings(AVAILABILITY_BACKEND="sql", AVAILABILITY_CACHE=False)
+class IdempotentBookingTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Replay", rooms=2)
+        self.user = User.objects.create_user("rae@example.com", "rae@example.com", "pw", first_name="Rae",
+                                             last_name="Poe")
+        self.user.customer.phone_number = "555-0100"
+        self.user.customer.save()
+        self.client.force_login(self.user)
+        check_in = timezone.localdate() + timedelta(days=15)
+        self.stay = {"check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=2)).isoformat()}
+
+    def form(self):
+        """What the booking form on the search results would post."""
+        page = self.client.get(reverse("reservation"), self.stay)
+        return {**self.stay, "guests_final": "1", "room_type": str(self.room_type.id), "status": "Confirmed",
+                "idempotency_key": page.context["idempotency_key"]}
+
+    def test_replay_goes_to_the_first_reservation(self):
+        form = self.form()
+        first = self.client.post(reverse("save_reservation"), form)
+        reservation = Reservation.objects.get()
+        self.assertRedirects(first, reverse("reservation_detail", args=[reservation.public_id]),
+                             fetch_redirect_response=False)
+
+        # session, user and customer, the key lookup; no availability, pricing or email
+        with self.assertNumQueries(3):
+            replay = self.client.post(reverse("save_reservation"), form)
+        self.assertEqual(replay.url, first.url)
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+        # A new form is a new booking
+        self.client.post(reverse("save_reservation"), self.form())
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_losing_a_race_for_the_key_goes_to_the_winner(self):
+        form = self.form()
+        self.client.post(reverse("save_reservation"), form)
+        winner = Reservation.objects.get()
+        # The replay misses the first lookup, as if both were in flight together
+        with mock.patch("web.views.reservation_views._booked_with_key",
+                        side_effect=[None, winner.public_id]):
+            replay = self.client.post(reverse("save_reservation"), form)
+        self.assertEqual(replay.url, reverse("reservation_detail", args=[winner.public_id]))
+        self.assertEqual(Reservation.objects.count(), 1)
+
+
+@skipUnless(connection.features.has_select_for_update, "needs row locking (MySQL/PostgreSQL)")
+@override_settings(AVAILABILITY_BACKEND="sql", AVAILABILITY_CACHE=False)
+class ConcurrentReplayTests(TransactionTestCase):
+    workers = 8
+
+    def test_simultaneous_replays_book_once(self):
+        room_type = make_room_type("Replayed", rooms=self.workers)
+        user = User.objects.create_user("ray@example.com", "ray@example.com", "pw")
+        user.customer.phone_number = "555-0100"
+        user.customer.save()
+        check_in = timezone.localdate() + timedelta(days=30)
+        form = {"check_in": check_in.isoformat(), "check_out": (check_in + timedelta(days=2)).isoformat(),
+                "guests_final": "1", "room_type": str(room_type.id), "status": "Hold",
+                "idempotency_key": helpers.new_idempotency_key()}
+        inventory.ensure_nights(check_in, check_in + timedelta(days=2), [room_type.id])
+
+        def submit(_):
+            try:
+                client = self.client_class()
+                client.force_login(user)
+                return client.post(reverse("save_reservation"), form).url
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            urls = set(pool.map(submit, range(self.workers)))
+
+        reservation = Reservation.objects.get(room_type=room_type)
+        self.assertEqual(urls, {reverse("reservation_detail", args=[reservation.public_id])})
+        self.assertEqual(RoomTypeNight.objects.get(room_type=room_type, date=check_in).booked, 1)
+
+
+class PublicIdTests(TestCase):
+    def setUp(self):
+        self.room_type = make_room_type("Numbered")
+        self.check_in = timezone.localdate() + timedelta(days=10)
+
+    def test_encoding_round_trips(self):
+        for pk in (1, 2, 65535, 65536, 1_000_000, public_ids.MAX_ID):
+            number = public_ids.encode(pk)
+            self.assertRegex(number, r"^MBL-[GHJKMNPQ][0-9A-HJKMNP-TV-Z]{7}$")
+            self.assertEqual(public_ids.decode(number), pk)
+        # Neighbouring keys don't give neighbouring numbers
+        self.assertNotEqual(public_ids.encode(1)[:-1], public_ids.encode(2)[:-1])
+        for number in ("MBL-1A2B3C4D", "MBL-G000000", "MBL-GOOD0000", "1A2B3C4D"):
+            self.assertIsNone(public_ids.decode(number))
+        with self.assertRaises(ValueError):
+            public_ids.encode(public_ids.MAX_ID + 1)
+
+    def test_new_numbers_are_looked_up_by_key(self):
+        reservation = make_reservation(self.room_type, self.check_in, self.check_in + timedelta(days=1))
+        self.assertEqual(reservation.public_id, public_ids.encode(reservation.pk))
+        with CaptureQueriesContext(connection) as queries:
+            found = Reservation.objects.matching_public_id(reservation.public_id.lower().replace("-", " ")).get()
+        self.assertEqual(found, reservation)
+        self.assertIn(f'{connection.ops.quote_name("id")} = {reservation.pk}', queries.captured_queries[0]["sql"])
+
+    def test_old_numbers_are_still_found(self):
+        legacy = make_reservation(self.room_type, self.check_in, self.check_in + timedelta(days=1),
+                                  public_id="MBL-1A2B3C4D")
+        self.assertEqual(list(Reservation.objects.matching_public_id("mbl-1a2b3c4d")), [legacy])
+        # Its key would encode to a new style number that was never given out
+        self.assertFalse(Reservation.objects.matching_public_id(public_ids.encode(legacy.pk)).exists())
+
+    def test_keys_come_a_block_at_a_time(self):
+        make_reservation(self.room_type, self.check_in, self.check_in + timedelta(days=1), status="Cancelled")
+        with CaptureQueriesContext(connection) as queries:
+            reservations = [
+                make_reservation(self.room_type, self.check_in, self.check_in + timedelta(days=1), status="Cancelled")
+                for _ in range(5)
+            ]
+        self.assertFalse([query for query in queries.captured_queries if "id_sequences" in query["sql"]])
+        pks = [reservation.pk for reservation in reservations]
+        self.assertEqual(pks, list(range(pks[0], pks[0] + 5)))
+
+    def test_new_reservations_go_straight_to_insert(self):
+        make_reservation(self.room_type, self.check_in, self.check_in + timedelta(days=1), status="Cancelled")
+        reservation = Reservation(**booking_fields(self.room_type, self.check_in,
+                                                   self.check_in + timedelta(days=1), "Cancelled"))
+        with CaptureQueriesContext(connection) as queries:
+            reservation.save()
+        table = connection.ops.quote_name(Reservation._meta.db_table)
+        touched = [query["sql"].split(table)[0].split()[0] for query in queries.captured_queries
+                   if table in query["sql"]]
+        # No stored row to lock or to try updating first, just the INSERT
+        self.assertEqual(touched, ["INSERT"])
+        self.assertTrue(Reservation.objects.filter(pk=reservation.pk).exists())
+
+    def test_numbers_depend_on_the_secret(self):
+        number = public_ids.encode(1)
+        with override_settings(PUBLIC_ID_KEY="another secret"):
+            self.assertNotEqual(public_ids.encode(1), number)
+            self.assertEqual(public_ids.decode(public_ids.encode(1)), 1)
+
+    def test_numbers_only_reach_their_own_guest(self):
+        owner = User.objects.create_user("owner", "owner@example.com", "pw")
+        reservation = make_reservation(self.room_type, self.check_in, self.check_in + timedelta(days=1),
+                                       customer=owner.customer)
+        self.client.force_login(User.objects.create_user("snoop", "snoop@example.com", "pw"))
+        response = self.client.post(reverse("search"), {"search_type": "reservation_id",
+                                                        "reservation_id": reservation.public_id})
+        self.assertEqual(response.context["results"], [])
+        response = self.client.post(reverse("send_secondary_email"), {"reservation_id": reservation.public_id,
+                                                                      "secondary_email": "snoop@example.com"})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(EmailOutbox.objects.exists())
+
+        self.client.force_login(owner)
+        response = self.client.post(reverse("search"), {"search_type": "reservation_id",
+                                                        "reservation_id": reservation.public_id})
+        self.assertEqual([found.pk for found in response.context["results"]], [reservation.pk])
+
+    def test_rolled_back_block_is_not_reused(self):
+        mine = public_ids.IdAllocator("reservations", "web.Reservation", block_size=10)
+        theirs = public_ids.IdAllocator("reservations", "web.Reservation", block_size=10)
+        with transaction.atomic():
+            first = mine.next_id()
+            transaction.set_rollback(True)
+        # The counter rolled back too, so another worker gets the same keys...
+        self.assertEqual(theirs.next_id(), first)
+        # ...and this one must not carry on with its dropped block
+        self.assertNotIn(mine.next_id(), range(first, first + 10))
@@ -22,6 +22,9 @@ urlpatterns = [
     path('register/', views.register, name='register'),
     path('reservation/', views.reservation, name='reservation'),
     path('reservation/save/', views.save_reservation, name='save_reservation'),
+    path('reservation/calendar/', views.reservation_calendar, name='reservation_calendar'),
+    path('reservation/flexible/', views.reservation_flexible, name='reservation_flexible'),
+    path('customers/lookup/', views.customer_lookup, name='customer_lookup'),
     path('reservation/<slug:public_id>/', views.reservation_detail, name='reservation_detail'),
     path('search/', views.search, name='search'),
     path("send-secondary-email/", views.send_secondary_email, name="send_secondary_email"),
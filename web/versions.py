@@ -0,0 +1,34 @@
+"""
+CSD-460 Capstone Blue Team
+Moffat Bay Lodge Project
+Vee Bell, Deja Faison, Julia Gonzalez, Jess Monnier
+Professor Sue Sampson
+Developed October thru December of 2025
+
+Version counters (DataVersion rows) for data that gets copied into
+process memory. Writers bump the counter inside their transaction; readers
+compare it with the version their copy was built from.
+"""
+
+from django.db.models import F
+from .models import DataVersion
+
+INVENTORY = "inventory"
+ROOM_TYPES = "room_types"
+
+
+def current(name):
+    """The current value of the named counter (0 if it has never been bumped)."""
+    return DataVersion.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+
+def bump(name):
+    """
+    Add one to the named counter and return the new value. The row stays
+    locked until the transaction ends, so concurrent writers get distinct,
+    consecutive values.
+    """
+    if not DataVersion.objects.filter(name=name).update(value=F('value') + 1):
+        DataVersion.objects.get_or_create(name=name)
+        DataVersion.objects.filter(name=name).update(value=F('value') + 1)
+    return DataVersion.objects.filter(name=name).values_list('value', flat=True).get()
@@ -15,9 +15,13 @@ from django.contrib import messages
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
+from .. import account_summary
 from ..models import Reservation
 from web.views.helpers import validate_email
 
+# Reservations shown in the account page's table
+RECENT_RESERVATIONS = 5
+
 def register(request):
     next_url = request.POST.get("next") or request.GET.get("next", "")
     if request.method == "POST":
@@ -121,13 +125,6 @@ def account(request):
                     messages.error(request, "Email is already in use.")
                     return redirect("account")
 
-                # Update user fields
-                user.first_name = first
-                user.last_name = last
-                user.email = email
-                user.username = email
-                user.save()
-
                 # Update customer fields
                 customer.phone_number = phone
                 customer.address_street = address_street
@@ -135,7 +132,15 @@ def account(request):
                 customer.address_state = address_state
                 customer.address_zipcode = address_zipcode
                 customer.address_country = address_country
-                customer.save()
+
+                # Update user fields; saving the user saves the customer
+                # (changed fields only) too, so this is one UPDATE each
+                user.first_name = first
+                user.last_name = last
+                user.email = email
+                user.username = email
+                user.save()
+                customer.save()  # already written by the user save, so this is a no-op
 
                 messages.success(request, "Your information has been updated.")
 
@@ -158,12 +163,15 @@ def account(request):
                 messages.success(request, "Password updated successfully.")
 
     # --- Prepare context ---
-    recent_reservations = Reservation.objects.ordered().filter(customer=customer)[:5]
-    total_reservations = Reservation.objects.ordered().filter(customer=customer).count()
+    # One query for the table: the sixth row only tells us there are more
+    recent_reservations = list(
+        Reservation.objects.ordered().filter(customer=customer).select_related('room_type')[:RECENT_RESERVATIONS + 1]
+    )
 
     context = {
         "customer": customer,
-        "recent_reservations": recent_reservations,
-        "has_more_reservations": total_reservations > 5,
+        "summary": account_summary.get(customer.id),
+        "recent_reservations": recent_reservations[:RECENT_RESERVATIONS],
+        "has_more_reservations": len(recent_reservations) > RECENT_RESERVATIONS,
     }
     return render(request, 'pages/account.html', context)
\ No newline at end of file
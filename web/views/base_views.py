@@ -8,7 +8,7 @@ Developed October thru December of 2025
 
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.core.mail import send_mail
+from web.outbox import queue_mail
 from web.forms import ContactForm
 
 def index(request):
@@ -31,7 +31,7 @@ def about(request):
             from_email = form.cleaned_data['email']
             recipient_list = ['reservations@moffatbaylodge.com']
             try:
-                send_mail(subject, message, from_email, recipient_list)
+                queue_mail(subject, message, from_email, recipient_list)
                 messages.success(request, "Your message has been sent successfully!")
                 return redirect('about')
             except Exception:
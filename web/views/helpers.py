@@ -8,11 +8,35 @@ Developed October thru December of 2025
 
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
-from ..models import RoomType, Reservation, Room
-from django.db.models import Q
-from datetime import datetime
+from django.http import Http404
+from ..models import Customer, RoomType, RoomTypeNight, Reservation
+from .. import availability_cache, catalogue, inventory, occupancy, pricing
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, F, IntegerField, Min, OuterRef, Q, Subquery
+from collections import deque
+import uuid
+from datetime import datetime, timedelta
 from django.utils import timezone
 
+# Longest date range a flexible-dates search may cover
+FLEXIBLE_MAX_DAYS = 90
+
+# Furthest ahead (in months from this one) the availability calendar goes
+CALENDAR_MAX_MONTHS = 24
+
+# Reservations per page on the search page
+SEARCH_PAGE_SIZE = 25
+
+# Most customers the staff customer picker returns per lookup
+CUSTOMER_LOOKUP_LIMIT = 10
+
+# Lookups this short match the most customers, so their answers are cached
+# for CUSTOMER_LOOKUP_CACHE_TIMEOUT seconds (a new customer can take that
+# long to show up for them); longer ones are narrow enough to run every time
+CUSTOMER_LOOKUP_CACHED_LENGTH = 2
+CUSTOMER_LOOKUP_CACHE_TIMEOUT = 60
+
 def parse_dates(check_in_str, check_out_str):
     """Parse date strings into date objects and validate order."""
     try:
@@ -46,62 +70,307 @@ def validate_emails(*emails):
             invalid.append(addr)
     return valid, invalid
 
+def _night_subquery(check_in, check_out, aggregate):
+    """Aggregate a room type's ledger rows for the nights of a stay as a subquery."""
+    nights = RoomTypeNight.objects.filter(
+        room_type=OuterRef('pk'),
+        date__gte=check_in,
+        date__lt=check_out,
+    ).order_by().values('room_type').annotate(value=aggregate).values('value')
+    return Subquery(nights, output_field=IntegerField())
+
 def get_available_rooms(check_in, check_out, num_guests=None, selected_room_type_id=None):
     """
     Returns a list of available room types with counts based on
     check-in/check-out dates, optional guest count, and optional selected room type.
-    Each entry is a dict: {"room_type": RoomType, "available_count": int}
+    Each entry is a dict: {"room_type": RoomTypeRecord, "available_count": int}
+
+    Availability is read from the per-night RoomTypeNight ledger: a room type
+    is available if every night of the stay has a free room, and the count is
+    the smallest number free on any night. The whole search is one query once
+    the ledger rows for the requested nights exist. With AVAILABILITY_BACKEND
+    set to "numpy" the answer comes from an in-memory copy instead (see
+    occupancy.py), and with AVAILABILITY_CACHE on, answers are shared
+    through Django's cache (see availability_cache.py).
     """
-    available_room_types = []
-    room_types = RoomType.objects.all().order_by('name')
+    nights = (check_out - check_in).days
+    if nights < 1:
+        return []
+    if selected_room_type_id and not str(selected_room_type_id).isdigit():
+        return []
 
-    for room_type in room_types:
-        # Filter by selected room type if applicable
-        if selected_room_type_id and str(room_type.id) != str(selected_room_type_id):
-            continue
+    if settings.AVAILABILITY_CACHE:
+        def compute():
+            now = timezone.now()
+            return (
+                _find_available_rooms(check_in, check_out, num_guests, selected_room_type_id),
+                _next_hold_expiry(check_in, check_out, now),
+            )
+        return availability_cache.get_or_compute(
+            (check_in, check_out, num_guests or "", selected_room_type_id or ""),
+            compute,
+        )
+    return _find_available_rooms(check_in, check_out, num_guests, selected_room_type_id)
 
-        # Filter by guest count if provided
-        if num_guests and room_type.max_guests < int(num_guests):
-            continue
+def _next_hold_expiry(check_in, check_out, now):
+    """When the first live hold overlapping the stay lapses (freeing a room), or None."""
+    return Reservation.objects.blocking_inventory(now).filter(
+        status='Hold',
+        expiration_time__isnull=False,
+        start_date__lt=check_out,
+        end_date__gt=check_in,
+    ).aggregate(Min('expiration_time'))['expiration_time__min']
+
+def _find_available_rooms(check_in, check_out, num_guests, selected_room_type_id):
+    """The uncached body of get_available_rooms."""
+    nights = (check_out - check_in).days
+    if settings.AVAILABILITY_BACKEND == "numpy":
+        found = occupancy.get_available_rooms(check_in, check_out, num_guests, selected_room_type_id)
+        if found is not None:
+            return found  # otherwise the stay is past the matrix, so ask the ledger
+
+    # Room types come from the catalogue, already ordered by name
+    room_types = catalogue.room_types()
+
+    # Filter by selected room type if applicable
+    if selected_room_type_id:
+        room_types = [rt for rt in room_types if rt.id == int(selected_room_type_id)]
+
+    # Filter by guest count if provided
+    if num_guests:
+        room_types = [rt for rt in room_types if rt.max_guests >= int(num_guests)]
 
-        # Count rooms of this type not under maintenance during the date range
-        available_rooms_count = Room.objects.filter(
-            room_type=room_type
-        ).filter(
-            Q(status__in=["Available", "Occupied", "Cleaning"]) |
-            Q(status="Maintenance", maintenance_until__lt=check_in)
-        ).count()
+    if not room_types:
+        return []
 
-        if available_rooms_count == 0:
-            continue  # no rooms available at all
+    now = timezone.now()
+    lapsed = Reservation.objects.lapsed_holds(now).filter(
+        room_type=OuterRef('pk'),
+        start_date__lt=check_out,
+        end_date__gt=check_in,
+    )
+    counts = RoomType.objects.filter(id__in=[rt.id for rt in room_types]).annotate(
+        min_free=_night_subquery(check_in, check_out, Min(F('capacity') - F('booked'))),
+        nights_counted=_night_subquery(check_in, check_out, Count('pk')),
+        has_lapsed_holds=Exists(lapsed),
+    ).values_list('id', 'min_free', 'nights_counted', 'has_lapsed_holds')
 
-        # Count overlapping reservations for this room type
-        overlapping_count = Reservation.objects.filter(
-            room_type=room_type,
-            status__in=["Hold", "Confirmed"],
-            start_date__lt=check_out,
-            end_date__gt=check_in
-        ).count()
+    # {room type id: [min free, nights counted, has lapsed holds]}
+    results = {row[0]: list(row[1:]) for row in counts}
+    missing = [room_type_id for room_type_id, row in results.items() if row[1] != nights]
+    if missing:
+        # First search touching these nights: fill in the ledger and read again
+        inventory.ensure_nights(check_in, check_out, missing)
+        results = {row[0]: list(row[1:]) for row in counts.all()}
 
-        if overlapping_count >= available_rooms_count:
-            continue  # room type fully booked
+    # Holds past their expiration_time are still counted by the ledger until
+    # the expiry job cancels them, but they must not block anyone; recount
+    # night by night for the (rare) room types that have some
+    lapsed_ids = [room_type_id for room_type_id, row in results.items() if row[2]]
+    if lapsed_ids:
+        free = _free_per_night(check_in, check_out, lapsed_ids, now)
+        for room_type_id, counts_per_night in free.items():
+            results[room_type_id][0] = min(counts_per_night)
+
+    available_room_types = []
+    for room_type in room_types:
+        min_free = results.get(room_type.id, [None])[0]
+        if not min_free or min_free < 1:
+            continue  # no rooms free on at least one night
 
         # Room type is available
         available_room_types.append({
             "room_type": room_type,
-            "available_count": available_rooms_count - overlapping_count,
+            "available_count": min_free,
             "price_per_night": room_type.price_per_night
         })
 
     return available_room_types
 
-def calculate_total_cost(check_in, check_out, price_per_night):
+def _free_per_night(check_in, check_out, room_type_ids, now):
+    """Return {room_type_id: [free rooms per night]} with lapsed holds counted as free."""
+    lapsed = inventory.lapsed_hold_nights(check_in, check_out, room_type_ids, now)
+    free = {room_type_id: list(counts) for room_type_id, counts in lapsed.items()}
+    nights = RoomTypeNight.objects.filter(
+        room_type_id__in=room_type_ids,
+        date__gte=check_in,
+        date__lt=check_out,
+    ).values_list('room_type_id', 'date', 'capacity', 'booked')
+    for room_type_id, night, capacity, booked in nights:
+        free[room_type_id][(night - check_in).days] += capacity - booked
+    return free
+
+def new_idempotency_key():
+    """A fresh token for a booking form (see Reservation.idempotency_key)."""
+    return uuid.uuid4().hex
+
+def parse_idempotency_key(value):
+    """The canonical form of a booking form token, or None if it isn't one."""
+    try:
+        return uuid.UUID(value or "").hex
+    except ValueError:
+        return None
+
+def get_room_type_or_404(room_type_id):
+    """The catalogue's record for a room type id from a request, like get_object_or_404."""
+    room_type = catalogue.get(room_type_id)
+    if room_type is None:
+        raise Http404("No room type matches the given query.")
+    return room_type
+
+def get_availability_calendar(start, end):
+    """
+    Returns free rooms per night for every room type over [start, end), as a
+    list of dicts: {"room_type": RoomTypeRecord, "free": [int per night]}.
+
+    Every night is counted in one pass instead of one availability check per
+    date: rooms in service each night (less their maintenance windows, as in
+    the ledger) minus a sweep over the reservations that overlap the range.
     """
-    Return total cost given check-in/out dates and price per night.
-    Ensures minimum of 1 night.
+    room_types = catalogue.room_types()
+    room_type_ids = [room_type.id for room_type in room_types]
+    capacity = inventory.nightly_capacity(start, end, room_type_ids)
+    blocked = inventory.nightly_blocking(start, end, room_type_ids)
+
+    return [
+        {
+            "room_type": room_type,
+            "free": [max(0, rooms - taken) for rooms, taken in zip(capacity[room_type.id], blocked[room_type.id])],
+        }
+        for room_type in room_types
+    ]
+
+def sliding_window_min(values, width):
     """
-    nights = (check_out - check_in).days
-    if nights < 1:
-        nights = 1
-    total_cost = nights * price_per_night
-    return nights, total_cost
\ No newline at end of file
+    Return the minimum of every run of `width` consecutive values, in one
+    pass over a deque of candidate indexes (len(values) - width + 1 results).
+    """
+    minimums = []
+    candidates = deque()
+    for i, value in enumerate(values):
+        # Anything not smaller than the newest value can never be a minimum again
+        while candidates and values[candidates[-1]] >= value:
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - width:
+            candidates.popleft()
+        if i >= width - 1:
+            minimums.append(values[candidates[0]])
+    return minimums
+
+def parse_flexible_nights(nights_str, window_start, window_end):
+    """Parse the length of stay for a flexible search. Returns (nights, error)."""
+    if (window_end - window_start).days > FLEXIBLE_MAX_DAYS:
+        return None, f"Flexible searches can cover at most {FLEXIBLE_MAX_DAYS} days."
+    try:
+        nights = int(nights_str)
+    except (TypeError, ValueError):
+        return None, "Please enter how many nights you would like to stay."
+    if nights < 1 or nights > (window_end - window_start).days:
+        return None, "The number of nights must fit between the two dates."
+    return nights, None
+
+def get_flexible_stays(window_start, window_end, nights, num_guests=None, selected_room_type_id=None):
+    """
+    Returns every stay of the given number of nights inside [window_start, window_end)
+    with a room free each night, sorted by check-in date. Each entry is a dict:
+    {"check_in", "check_out", "room_type", "available_count", "price_per_night", "total_cost"}
+
+    Free rooms are counted once for the whole window (see get_availability_calendar)
+    and each room type is scanned with a sliding window minimum, rather than
+    running a search for every possible check-in date. Prices come from one
+    PriceCalendar over the window, so each stay's total is a subtraction.
+    """
+    calendar = [
+        entry for entry in get_availability_calendar(window_start, window_end)
+        if not selected_room_type_id or str(entry["room_type"].id) == str(selected_room_type_id)
+        if not num_guests or entry["room_type"].max_guests >= int(num_guests)
+    ]
+    prices = pricing.PriceCalendar(window_start, window_end, [entry["room_type"] for entry in calendar])
+
+    stays = []
+    for entry in calendar:
+        room_type = entry["room_type"]
+        for offset, available_count in enumerate(sliding_window_min(entry["free"], nights)):
+            if available_count < 1:
+                continue
+            check_in = window_start + timedelta(days=offset)
+            check_out = check_in + timedelta(days=nights)
+            total_cost = prices.stay_total(room_type.id, check_in, check_out)
+            stays.append({
+                "check_in": check_in,
+                "check_out": check_out,
+                "room_type": room_type,
+                "available_count": available_count,
+                "price_per_night": pricing.average_nightly(total_cost, nights),
+                "total_cost": total_cost,
+            })
+
+    stays.sort(key=lambda stay: (stay["check_in"], stay["room_type"].name))
+    return stays
+
+def parse_search_cursor(value):
+    """
+    Turn a "status_rank.start_date.id" cursor from the search page back into
+    a tuple. Returns None if it is missing or malformed, which means the first page.
+    """
+    try:
+        rank, start_date, pk = value.split(".")
+        return int(rank), datetime.strptime(start_date, "%Y-%m-%d").date(), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+def search_page(queryset, after=None, size=SEARCH_PAGE_SIZE):
+    """
+    Returns (reservations, next cursor or None) for one page of an ordered()
+    reservation queryset, starting after the given cursor tuple.
+
+    Pages seek past the last row of the previous page with a WHERE on
+    (status_rank, start_date, id) rather than an OFFSET, and one extra row
+    is fetched to tell whether there is a next page instead of counting, so
+    every page costs the same however many reservations match.
+    """
+    queryset = queryset.select_related('room_type')
+    if after:
+        rank, start_date, pk = after
+        # Same direction as ordered(): status_rank up, start_date and id down
+        queryset = queryset.filter(
+            Q(status_rank__gt=rank)
+            | Q(status_rank=rank, start_date__lt=start_date)
+            | Q(status_rank=rank, start_date=start_date, id__lt=pk)
+        )
+    reservations = list(queryset[:size + 1])
+    if len(reservations) <= size:
+        return reservations, None
+    reservations = reservations[:size]
+    last = reservations[-1]
+    return reservations, f"{last.status_rank}.{last.start_date.isoformat()}.{last.id}"
+
+def lookup_customers(query, limit=CUSTOMER_LOOKUP_LIMIT):
+    """
+    Returns up to limit non-staff customers matching query (see
+    CustomerQuerySet.matching), in name order, as dicts for the staff
+    customer picker.
+    """
+    query = " ".join(query.lower().split())
+    if not query:
+        return []
+
+    def find():
+        customers = Customer.objects.matching(query).filter(
+            user__is_staff=False
+        ).select_related('user').order_by('search_first_name', 'search_last_name', 'id')[:limit]
+        return [
+            {
+                "id": customer.id,
+                "first_name": customer.user.first_name,
+                "last_name": customer.user.last_name,
+                "email": customer.user.email,
+                "phone_number": customer.phone_number or "",
+            }
+            for customer in customers
+        ]
+
+    if len(query) > CUSTOMER_LOOKUP_CACHED_LENGTH:
+        return find()
+    return cache.get_or_set(f"customer_lookup:{limit}:{query}", find, CUSTOMER_LOOKUP_CACHE_TIMEOUT)
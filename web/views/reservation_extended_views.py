@@ -9,25 +9,34 @@ Developed October thru December of 2025
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
+from django.db import transaction
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.conf import settings
 from django.views.decorators.http import require_POST
-from ..models import RoomType, Reservation
-from datetime import timedelta
-from django.utils import timezone
-from web.views.helpers import get_available_rooms, parse_dates, validate_emails
+from ..models import Reservation
+from web import booking, catalogue, pricing
+from web.outbox import queue_mail
+from web.views.helpers import get_room_type_or_404, parse_dates, validate_emails
 
 @require_POST
+@login_required(login_url='login')
 def send_secondary_email(request):
     reservation_id = request.POST.get("reservation_id")
     if not reservation_id:
         # No ID -> nothing to email about, send back to start
         return redirect("reservation")
 
-    reservation = get_object_or_404(Reservation, public_id=reservation_id)
+    # Only the guest who booked it (or staff) can send the details on
+    reservations = Reservation.objects.matching_public_id(reservation_id)
+    if not request.user.is_staff:
+        customer = getattr(request.user, 'customer', None)
+        if customer is None:
+            return redirect("reservation")
+        reservations = reservations.filter(customer=customer)
+    reservation = get_object_or_404(reservations)
 
+    room_type = catalogue.get(reservation.room_type_id)
     secondary_email = request.POST.get("secondary_email", "").strip()
     secondary_email_status = None
     secondary_email_error = None
@@ -49,17 +58,17 @@ def send_secondary_email(request):
             f"Your reservation number is: {reservation.public_id}",
             "",
             "Reservation Details:",
-            f"  Room Type: {reservation.room_type.name}",
+            f"  Room Type: {room_type.name}",
             f"  Check-in: {reservation.start_date}",
             f"  Check-out: {reservation.end_date}",
             f"  Guests: {reservation.guests}",
-            f"  Price per night: ${reservation.room_type.price_per_night}",
+            f"  Average price per night: ${pricing.average_nightly(reservation.total_cost, reservation.nights)}",
             f"  Total cost: ${reservation.total_cost}",
         ]
         body_lines.append("")
         body_lines.append("We look forward to your stay at Moffat Bay Lodge.")
 
-        send_mail(
+        queue_mail(
             subject,
             "\n".join(body_lines),
             settings.DEFAULT_FROM_EMAIL,
@@ -73,10 +82,11 @@ def send_secondary_email(request):
     context = {
         "reservation": reservation,
         "is_hold": reservation.status == "Hold" if hasattr(reservation, "status") else False,
-        "price_per_night": reservation.room_type.price_per_night,
-        "nights": (reservation.end_date - reservation.start_date).days,
+        "price_per_night": pricing.average_nightly(reservation.total_cost, reservation.nights),
+        "nights": reservation.nights,
         "total_cost": reservation.total_cost,
         "guests": reservation.guests,
+        "room_type": room_type.name,
         "invalid_emails": [],
         "secondary_email_status": secondary_email_status,
         "secondary_email_error": secondary_email_error,
@@ -88,19 +98,16 @@ def send_secondary_email(request):
 @login_required(login_url='login')
 def cancel_reservation(request, public_id):
     reservation = get_object_or_404(
-        Reservation,
-        public_id=public_id,
+        Reservation.objects.matching_public_id(public_id),
         customer=request.user.customer
     )
 
-    if reservation.status == "Cancelled":
-        messages.info(request, "This reservation is already cancelled.")
+    try:
+        booking.cancel_reservation(reservation)
+    except booking.BookingError as e:
+        messages.info(request, str(e))
         return redirect("reservation_detail", public_id=public_id)
 
-    reservation.status = "Cancelled"
-    reservation.expiration_time = None
-    reservation.save()
-
     messages.success(request, "Your reservation has been cancelled.")
     return redirect("account")  
 
@@ -108,47 +115,24 @@ def cancel_reservation(request, public_id):
 @login_required(login_url='login')
 def confirm_hold(request, public_id):
     reservation = get_object_or_404(
-        Reservation,
-        public_id=public_id,
+        Reservation.objects.matching_public_id(public_id),
         customer=request.user.customer
     )
 
-    if reservation.status != "Hold":
-        messages.error(request, "This reservation is not on hold.")
-        return redirect("reservation_detail", public_id=public_id)
-
-    now = timezone.now()
-    if reservation.expiration_time and reservation.expiration_time < now:
-        messages.error(request, "This hold has expired. Please re-check availability.")
-        return redirect("reservation_detail", public_id=public_id)
-
-    # Re-check availability using helper function
-    available = get_available_rooms(
-        reservation.start_date,
-        reservation.end_date,
-        num_guests=reservation.guests,
-        selected_room_type_id=reservation.room_type.id
-    )
-
-    if not available:
-        messages.error(request, "The room is no longer available.")
-        return redirect("reservation_detail", public_id=public_id)
-
-    # Convert Hold to Confirmed
-    reservation.status = "Confirmed"
-    reservation.expiration_time = None
-    reservation.save()
+    try:
+        with transaction.atomic():
+            reservation = booking.confirm_hold(reservation)
 
-    # Send confirmation email
-    recipients, _ = validate_emails(reservation.guest_email)
-    if recipients:
-        subject = f"Reservation Confirmed #{reservation.public_id}"
-        body = f"""Dear {reservation.guest_first_name},
+            # Queue confirmation email in the same transaction as the confirmation
+            recipients, _ = validate_emails(reservation.guest_email)
+            if recipients:
+                subject = f"Reservation Confirmed #{reservation.public_id}"
+                body = f"""Dear {reservation.guest_first_name},
 
 Your held reservation is now confirmed!
 
 Reservation number: {reservation.public_id}
-Room type: {reservation.room_type.name}
+Room type: {catalogue.get(reservation.room_type_id).name}
 Check-in: {reservation.start_date}
 Check-out: {reservation.end_date}
 Guests: {reservation.guests}
@@ -156,7 +140,10 @@ Total cost: ${reservation.total_cost}
 
 We look forward to your stay!
 """
-        send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, list(recipients))
+                queue_mail(subject, body, settings.DEFAULT_FROM_EMAIL, list(recipients))
+    except booking.BookingError as e:
+        messages.error(request, str(e))
+        return redirect("reservation_detail", public_id=public_id)
 
     messages.success(request, "Your reservation is now confirmed.")
     return redirect("reservation_detail", public_id=public_id)
@@ -165,36 +152,26 @@ We look forward to your stay!
 @login_required(login_url='login')
 def retry_hold(request, public_id):
     reservation = get_object_or_404(
-        Reservation,
-        public_id=public_id,
+        Reservation.objects.matching_public_id(public_id),
         customer=request.user.customer
     )
 
-    available = get_available_rooms(
-        reservation.start_date,
-        reservation.end_date,
-        reservation.guests,
-        reservation.room_type.id,
-    )
-
-    if not available:
+    try:
+        booking.place_hold(reservation)
+    except booking.BookingError:
         messages.error(request, "Unfortunately, the room is no longer available.")
         return redirect("reservation_detail", public_id=public_id)
 
-    # Re-apply 24 hour hold
-    reservation.status = "Hold"
-    reservation.expiration_time = timezone.now() + timedelta(hours=24)
-    reservation.save()
-
     messages.success(request, "A new hold has been placed on this reservation.")
     return redirect("reservation_detail", public_id=public_id)
 
 @login_required
 def reservation_modify(request, public_id):
-    reservation = get_object_or_404(Reservation, public_id=public_id)
+    reservation = get_object_or_404(Reservation.objects.matching_public_id(public_id))
 
     # Ensure user owns reservation or is staff
-    if not request.user.is_staff and getattr(request.user, 'customer', None) != reservation.customer:
+    customer = getattr(request.user, 'customer', None)
+    if not request.user.is_staff and (customer is None or customer.id != reservation.customer_id):
         messages.error(request, "You do not have permission to modify this reservation.")
         return redirect("index")
 
@@ -209,26 +186,13 @@ def reservation_modify(request, public_id):
             return redirect("reservation_modify", public_id=public_id)
 
         guests = int(request.POST.get("guests_final", reservation.guests))
-        room_type_id = request.POST.get("room_type", reservation.room_type.id)
+        room_type_id = request.POST.get("room_type", reservation.room_type_id)
 
-        available_rooms = get_available_rooms(
-            check_in,
-            check_out,
-            num_guests=guests,
-            selected_room_type_id=room_type_id,
-        )
-
-        if not available_rooms:
+        room_type = get_room_type_or_404(room_type_id)
+        if guests > room_type.max_guests:
             messages.error(request, "No rooms available for the new dates.")
             return redirect("reservation_modify", public_id=public_id)
 
-        # ---- 2. Save updates ----
-        reservation.start_date = check_in
-        reservation.end_date = check_out
-        reservation.guests = guests
-        reservation.room_type = get_object_or_404(RoomType, id=room_type_id)
-        reservation.save()
-
         # ======================================================
         # EMAIL LOGIC 
         # ======================================================
@@ -267,52 +231,60 @@ def reservation_modify(request, public_id):
 
         all_invalid = list(primary_invalid) + list(additional_invalid)
 
-        # ---- 3. Email primary recipients ----
-        if primary_valid:
-            subject = f"Reservation Updated #{reservation.public_id}"
-            body = f"""Dear {reservation.guest_first_name} {reservation.guest_last_name},
+        # ---- 2. Save updates, queueing the emails in the same transaction ----
+        try:
+            with transaction.atomic():
+                reservation = booking.modify_reservation(reservation, check_in, check_out, guests, room_type)
+
+                # ---- 3. Queue email to primary recipients ----
+                if primary_valid:
+                    subject = f"Reservation Updated #{reservation.public_id}"
+                    body = f"""Dear {reservation.guest_first_name} {reservation.guest_last_name},
 
 Your reservation has been updated successfully.
 
 Reservation number: {reservation.public_id}
-Room type: {reservation.room_type.name}
+Room type: {room_type.name}
 Check-in: {reservation.start_date}
 Check-out: {reservation.end_date}
 Guests: {reservation.guests}
 
 We look forward to your stay!
 """
-            send_mail(
-                subject,
-                body,
-                settings.DEFAULT_FROM_EMAIL,
-                list(primary_valid),
-                fail_silently=False,
-            )
-
-        # ---- 4. Email additional recipients (fun template) ----
-        if additional_valid:
-            subject2 = f"Moffat Bay Lodge Reservation Update #{reservation.public_id}"
-            body2 = f"""Hello,
+                    queue_mail(
+                        subject,
+                        body,
+                        settings.DEFAULT_FROM_EMAIL,
+                        list(primary_valid),
+                        fail_silently=False,
+                    )
+
+                # ---- 4. Queue email to additional recipients (fun template) ----
+                if additional_valid:
+                    subject2 = f"Moffat Bay Lodge Reservation Update #{reservation.public_id}"
+                    body2 = f"""Hello,
 
 {reservation.guest_first_name} {reservation.guest_last_name} invites you on a journey to Moffat Bay Lodge.
 
 Updated Reservation Details:
 Reservation number: {reservation.public_id}
-Room type: {reservation.room_type.name}
+Room type: {room_type.name}
 Check-in: {reservation.start_date}
 Check-out: {reservation.end_date}
 Guests: {reservation.guests}
 
 We look forward to welcoming you!
 """
-            send_mail(
-                subject2,
-                body2,
-                settings.DEFAULT_FROM_EMAIL,
-                list(additional_valid),
-                fail_silently=False,
-            )
+                    queue_mail(
+                        subject2,
+                        body2,
+                        settings.DEFAULT_FROM_EMAIL,
+                        list(additional_valid),
+                        fail_silently=False,
+                    )
+        except booking.BookingError:
+            messages.error(request, "No rooms available for the new dates.")
+            return redirect("reservation_modify", public_id=public_id)
 
         # ---- 5. Messages ----
         if all_invalid:
@@ -332,7 +304,7 @@ We look forward to welcoming you!
         "check_in": reservation.start_date,
         "check_out": reservation.end_date,
         "guests": reservation.guests,
-        "room_type": reservation.room_type.id,
+        "room_type": reservation.room_type_id,
         "first_name": reservation.guest_first_name,
         "last_name": reservation.guest_last_name,
         "email": reservation.guest_email,
@@ -342,7 +314,7 @@ We look forward to welcoming you!
     context = {
         "reservation": reservation,
         "initial_data": initial_data,
-        "room_types": RoomType.objects.all().order_by("name"),
+        "room_types": catalogue.room_types(),
     }
 
     return render(request, "pages/reservation_modify.html", context)
@@ -7,43 +7,43 @@ Developed October thru December of 2025
 """
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.conf import settings
 from django.urls import reverse
-from ..models import RoomType, Reservation, Customer
+from ..models import Reservation, Customer
 from django.db.models import Q
 from datetime import timedelta, datetime
 from django.utils import timezone
-from web.views.helpers import get_available_rooms, parse_dates, validate_emails, calculate_total_cost
+from web import booking, catalogue, pricing
+from web.outbox import queue_mail
+from web.views.helpers import (
+    CALENDAR_MAX_MONTHS, get_available_rooms, get_availability_calendar, get_flexible_stays, get_room_type_or_404,
+    new_idempotency_key, parse_flexible_nights, parse_idempotency_key, lookup_customers, parse_dates,
+    parse_search_cursor, search_page, validate_emails,
+)
 
 def reservation(request):
     context = {}
-    room_types = RoomType.objects.all().order_by('name')
-    context['room_types'] = room_types
+    context['room_types'] = catalogue.room_types()
     context['available_room_types'] = []
+    context['idempotency_key'] = new_idempotency_key()
 
     # flag for whether user attempted search
     context['searched'] = 'check_in' in request.GET
 
-    # Use each search as an opportunity to cancel held reservations
-    # that have expired already
-    if context['searched']:
-        now = timezone.now()
-        Reservation.objects.filter(
-            status = 'Hold',
-            expiration_time__isnull=False,
-            expiration_time__lt=now
-        ).update(status='Cancelled')
-
     # Get input from form
     check_in_str = request.GET.get('check_in', '')
     check_out_str = request.GET.get('check_out', '')
     selected_room_type_id = request.GET.get('room_type', '')
     num_guests = request.GET.get('guests', '')
+    # Flexible dates: check_in/check_out are the range to look in instead
+    flexible = bool(request.GET.get('flexible'))
+    nights_str = request.GET.get('nights', '')
 
     # Pre-fill form data
     initial_data = {
@@ -51,17 +51,15 @@ def reservation(request):
         "check_out": check_out_str or "",
         "room_type": selected_room_type_id or "",
         "guests": num_guests or "",
+        "flexible": flexible,
+        "nights": nights_str,
         "first_name": request.GET.get('first_name', ''),
         "last_name": request.GET.get('last_name', ''),
         "email": request.GET.get('email', ''),
         "phone_number": request.GET.get('phone_number', ''),
     }
     
-    # Allow staff to make reservations for existing customers
-    if request.user.is_staff:
-        context['all_customers'] = Customer.objects.filter(
-            user__is_staff=False
-        ).order_by('user__first_name', 'user__last_name')
+    # Staff pick an existing customer through the customer_lookup typeahead
 
     # Pre-fill guest info from user's Customer profile if logged in
     customer = None
@@ -93,10 +91,7 @@ def reservation(request):
                     now = timezone.now()
                     overlapping_reservations = Reservation.objects.filter(
                         customer=customer
-                    ).filter(
-                        Q(status='Confirmed') |
-                        Q(status='Hold', expiration_time__gt=now)
-                    ).filter(
+                    ).blocking_inventory(at=now).filter(
                         Q(start_date__lt=check_out) &
                         Q(end_date__gt=check_in)
                     )
@@ -106,22 +101,125 @@ def reservation(request):
                         context["overlap_warning"] = True
                         context["overlapping_reservations"] = overlapping_reservations
                 
-                # Check availability of rooms
-                context['available_room_types'] = get_available_rooms(
-                    check_in, check_out,
-                    num_guests=num_guests,
-                    selected_room_type_id=selected_room_type_id
-                )
-            if not context['available_room_types']:
+                if flexible:
+                    nights, error = parse_flexible_nights(nights_str, check_in, check_out)
+                    if error:
+                        context['error'] = error
+                    else:
+                        context['flexible_stays'] = get_flexible_stays(
+                            check_in, check_out, nights,
+                            num_guests=num_guests,
+                            selected_room_type_id=selected_room_type_id
+                        )
+                else:
+                    # Check availability of rooms
+                    context['available_room_types'] = get_available_rooms(
+                        check_in, check_out,
+                        num_guests=num_guests,
+                        selected_room_type_id=selected_room_type_id
+                    )
+            if not context['available_room_types'] and not context.get('flexible_stays'):
                 context['no_results'] = True
             else:
+                # Price every room type for the stay from one rate calendar read
+                prices = pricing.PriceCalendar(
+                    check_in, check_out, [room["room_type"] for room in context['available_room_types']]
+                )
                 for room in context['available_room_types']:
-                    nights, total_cost = calculate_total_cost(check_in, check_out, room["price_per_night"])
+                    nights = (check_out - check_in).days
                     room["nights"] = nights
-                    room["total_cost"] = total_cost
+                    room["total_cost"] = prices.stay_total(room["room_type"].id, check_in, check_out)
+                    room["price_per_night"] = pricing.average_nightly(room["total_cost"], nights)
 
     return render(request, 'pages/reservation.html', context)
 
+def reservation_calendar(request):
+    """
+    JSON free-room counts per room type for every night of a month
+    (?month=YYYY-MM, default this month, up to CALENDAR_MAX_MONTHS ahead),
+    so the reservation page can spot sold-out dates without running a
+    search for each one.
+    """
+    today = timezone.localdate()
+    month_str = request.GET.get('month') or today.strftime('%Y-%m')
+    try:
+        month_start = datetime.strptime(month_str, '%Y-%m').date()
+    except ValueError:
+        return JsonResponse({"error": "Month must be in YYYY-MM format."}, status=400)
+    # Nothing can be booked in past months, and far off ones would only fill
+    # the ledger with empty nights (or run past the last date Python has)
+    months_ahead = (month_start.year - today.year) * 12 + month_start.month - today.month
+    if not 0 <= months_ahead <= CALENDAR_MAX_MONTHS:
+        return JsonResponse(
+            {"error": f"Month must be between this month and {CALENDAR_MAX_MONTHS} months from now."},
+            status=400,
+        )
+    # Day 32 is always in the next month
+    month_end = (month_start + timedelta(days=32)).replace(day=1)
+
+    calendar = get_availability_calendar(month_start, month_end)
+    return JsonResponse({
+        "month": month_start.strftime('%Y-%m'),
+        "dates": [(month_start + timedelta(days=i)).isoformat() for i in range((month_end - month_start).days)],
+        "room_types": [
+            {
+                "id": entry["room_type"].id,
+                "name": entry["room_type"].name,
+                "max_guests": entry["room_type"].max_guests,
+                "free": entry["free"],
+            }
+            for entry in calendar
+        ],
+    })
+
+@login_required(login_url='login')
+def customer_lookup(request):
+    """
+    JSON typeahead for the staff customer picker on the reservation page: up
+    to CUSTOMER_LOOKUP_LIMIT customers whose name, email or phone starts
+    with ?q= (see helpers.lookup_customers).
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Only staff can look up customers."}, status=403)
+    return JsonResponse({"customers": lookup_customers(request.GET.get('q', ''))})
+
+def reservation_flexible(request):
+    """
+    JSON list of every stay of ?nights= nights between ?check_in= and
+    ?check_out= that has a room free (optionally for ?guests= and ?room_type=).
+    """
+    check_in, check_out, error = parse_dates(request.GET.get('check_in', ''), request.GET.get('check_out', ''))
+    if not error:
+        nights, error = parse_flexible_nights(request.GET.get('nights'), check_in, check_out)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    selected_room_type_id = request.GET.get('room_type', '')
+    num_guests = request.GET.get('guests', '')
+    if not selected_room_type_id.isdigit():
+        selected_room_type_id = None
+    if not num_guests.isdigit():
+        num_guests = None
+
+    stays = get_flexible_stays(
+        check_in, check_out, nights,
+        num_guests=num_guests,
+        selected_room_type_id=selected_room_type_id
+    )
+    return JsonResponse({
+        "stays": [
+            {
+                "check_in": stay["check_in"].isoformat(),
+                "check_out": stay["check_out"].isoformat(),
+                "room_type": {"id": stay["room_type"].id, "name": stay["room_type"].name},
+                "available_count": stay["available_count"],
+                "price_per_night": str(stay["price_per_night"]),
+                "total_cost": str(stay["total_cost"]),
+            }
+            for stay in stays
+        ],
+    })
+
 @login_required
 def save_reservation(request):
     """
@@ -134,7 +232,14 @@ def save_reservation(request):
     if not request.user.is_authenticated:
         messages.info(request, "Please log in or register to reserve a room.")
         return redirect(f"{reverse('login')}?next={request.get_full_path()}")
-        
+
+    # A resubmitted form (double click, browser retry) goes to what the
+    # first submission booked, without checking availability or emailing again
+    idempotency_key = parse_idempotency_key(request.POST.get("idempotency_key"))
+    booked = _booked_with_key(idempotency_key)
+    if booked:
+        return redirect('reservation_detail', public_id=booked)
+
     # Determine customer
     if request.user.is_staff:
         customer_id = request.POST.get('customer_id')
@@ -160,7 +265,7 @@ def save_reservation(request):
     room_type_id = request.POST.get("room_type")
     status = request.POST.get("status", "Hold")
 
-    room_type = get_object_or_404(RoomType, id=room_type_id)
+    room_type = get_room_type_or_404(room_type_id)
     initial_data = {
             "first_name": first_name,
             "last_name": last_name,
@@ -203,7 +308,8 @@ def save_reservation(request):
             "initial_data": initial_data,
             "error": "The email address provided is invalid. Please enter a valid email.",
             "searched": True,
-            "room_types": RoomType.objects.all().order_by('name'),
+            "room_types": catalogue.room_types(),
+            "idempotency_key": new_idempotency_key(),
             "available_room_types": get_available_rooms(
                 check_in, 
                 check_out,
@@ -212,81 +318,93 @@ def save_reservation(request):
             ),
         }
 
-        # Include staff dropdown if needed
-        if request.user.is_staff:
-            context["all_customers"] = Customer.objects.filter(
-                user__is_staff=False
-            ).order_by('user__first_name', 'user__last_name')
-
         return render(request, "pages/reservation.html", context)
 
-    room_type = get_object_or_404(RoomType, id=room_type_id)
-    nights, total_cost = calculate_total_cost(check_in, check_out, room_type.price_per_night)
-
-    expiration_time = timezone.now() + timedelta(hours=24) if status == "Hold" else None
-
-    reservation = Reservation.objects.create(
-        customer=request.user.customer if hasattr(request.user, "customer") else None,
-        guest_first_name=first_name,
-        guest_last_name=last_name,
-        guest_email=email,
-        guest_phone=phone_number,
-        start_date=check_in,
-        end_date=check_out,
-        guests=guests,
-        room_type=room_type,
-        status=status,
-        expiration_time=expiration_time,
-        total_cost=total_cost
-    )
+    # The price is worked out now and frozen on the reservation
+    nights = (check_out - check_in).days
+    total_cost = pricing.stay_total(room_type, check_in, check_out)
+
+    expiration_time = timezone.now() + booking.HOLD_DURATION if status == "Hold" else None
 
     invalid_emails = []
 
-    # Send email only for Confirmed reservations
-    if status == "Confirmed":
-        recipients, invalid_emails = validate_emails(email, getattr(request.user, "email", None))
-        if recipients:
-            subject = f"Moffat Bay Lodge Reservation Confirmation #{reservation.public_id}"
-            body = [
-                f"Dear {first_name} {last_name},",
-                "",
-                "Thank you for choosing Moffat Bay Lodge.",
-                f"Your reservation number is: {reservation.public_id}",
-                "",
-                "Reservation Details:",
-                f"  Room Type: {room_type.name}",
-                f"  Check-in: {check_in}",
-                f"  Check-out: {check_out}",
-                f"  Guests: {guests}",
-                f"  Price per night: ${room_type.price_per_night}",
-                f"  Nights: {nights}",
-                f"  Total cost: ${total_cost}",
-            ]
-            body.append("\nWe look forward to your stay at Moffat Bay Lodge.")
-            send_mail(subject, "\n".join(body), settings.DEFAULT_FROM_EMAIL, list(recipients))
+    try:
+        with transaction.atomic():
+            reservation = booking.create_reservation(
+                customer=customer,
+                guest_first_name=first_name,
+                guest_last_name=last_name,
+                guest_email=email,
+                guest_phone=phone_number,
+                start_date=check_in,
+                end_date=check_out,
+                guests=guests,
+                room_type_id=room_type.id,
+                status=status,
+                expiration_time=expiration_time,
+                total_cost=total_cost,
+                idempotency_key=idempotency_key,
+            )
+
+            # Queue email only for Confirmed reservations, in the booking transaction
+            # so it is only sent if the reservation is actually saved
+            if status == "Confirmed":
+                recipients, invalid_emails = validate_emails(email, getattr(request.user, "email", None))
+                if recipients:
+                    subject = f"Moffat Bay Lodge Reservation Confirmation #{reservation.public_id}"
+                    body = [
+                        f"Dear {first_name} {last_name},",
+                        "",
+                        "Thank you for choosing Moffat Bay Lodge.",
+                        f"Your reservation number is: {reservation.public_id}",
+                        "",
+                        "Reservation Details:",
+                        f"  Room Type: {room_type.name}",
+                        f"  Check-in: {check_in}",
+                        f"  Check-out: {check_out}",
+                        f"  Guests: {guests}",
+                        f"  Average price per night: ${pricing.average_nightly(total_cost, nights)}",
+                        f"  Nights: {nights}",
+                        f"  Total cost: ${total_cost}",
+                    ]
+                    body.append("\nWe look forward to your stay at Moffat Bay Lodge.")
+                    queue_mail(subject, "\n".join(body), settings.DEFAULT_FROM_EMAIL, list(recipients))
+    except (booking.BookingError, IntegrityError) as e:
+        # A copy of this submission that got in first can have taken the last
+        # room, or the key; either way, send this one to its reservation
+        booked = _booked_with_key(idempotency_key)
+        if booked:
+            return redirect('reservation_detail', public_id=booked)
+        if isinstance(e, IntegrityError):
+            raise
+        messages.error(request, str(e))
+        return redirect("reservation")
 
     return redirect('reservation_detail', public_id=reservation.public_id)
 
+def _booked_with_key(idempotency_key):
+    """The public_id of the reservation a booking form token already made, or None."""
+    if not idempotency_key:
+        return None
+    return Reservation.objects.filter(idempotency_key=idempotency_key).values_list('public_id', flat=True).first()
+
 @login_required(login_url='login')
 def reservation_detail(request, public_id):
     if request.user.is_staff:
         # Staff can see any reservation
-        reservation = get_object_or_404(Reservation, public_id=public_id)
+        reservation = get_object_or_404(Reservation.objects.matching_public_id(public_id))
     else:
         # Regular users can only see their own reservations
         reservation = get_object_or_404(
-            Reservation, 
-            public_id=public_id,
+            Reservation.objects.matching_public_id(public_id),
             customer=request.user.customer
         )
     
-    # Get room info
-    room_type = reservation.room_type
-    price_per_night = room_type.price_per_night
-    nights, total_cost = calculate_total_cost(
-        reservation.start_date, 
-        reservation.end_date,
-        price_per_night)
+    # Get room info; show the price as booked, not today's rates
+    room_type = catalogue.get(reservation.room_type_id)
+    nights = (reservation.end_date - reservation.start_date).days
+    total_cost = reservation.total_cost
+    price_per_night = pricing.average_nightly(total_cost, nights)
     
     # Determine if modification/cancellation is allowed
     can_modify = (
@@ -326,17 +444,25 @@ def search(request):
 
     Options:
     - Email: must match searched email, but filter by customer ID
-    - Name: first and/or last name, filter by customer ID
+    - Name: start of the first and/or last name, filter by customer ID
     - Public ID: look for reservation number, filter by customer ID
+
+    Each option reads the normalized search columns on Reservation (see
+    ReservationQuerySet.matching_*), so all of them can use an index. Staff
+    who haven't searched see every reservation. Results come a page at a
+    time (see helpers.search_page).
     """
     error_message = None
     results = []
+    next_cursor = None
+    listing = False
 
     # For re-populating form fields
     form_email = ""
     form_first_name = ""
     form_last_name = ""
     form_reservation_id = ""
+    search_type = ""
 
     if request.user.is_staff:
         base_qs = Reservation.objects.ordered()
@@ -352,6 +478,10 @@ def search(request):
         else:
             base_qs = Reservation.objects.ordered().filter(customer=customer)
 
+    # The reservations to page through, and what to say if there are none
+    matches = None
+    no_matches = None
+
     if request.method == "POST":
         search_type = request.POST.get("search_type")  # "email", "name", or "reservation_id"
 
@@ -363,9 +493,8 @@ def search(request):
             if not email:
                 error_message = "Please enter your email address."
             else:
-                results = base_qs.filter(customer__user__email__iexact=email)
-                if not results:
-                    error_message = "No reservations were found for this email address."
+                matches = base_qs.matching_email(email)
+                no_matches = "No reservations were found for this email address."
 
         # --- Search by first/last name ---
         elif search_type == "name":
@@ -377,14 +506,8 @@ def search(request):
             if not first_name and not last_name:
                 error_message = "Please enter a first name, last name, or both."
             else:
-                qs = base_qs
-                if first_name:
-                    qs = qs.filter(guest_first_name__icontains=first_name)
-                if last_name:
-                    qs = qs.filter(guest_last_name__icontains=last_name)
-                results = qs
-                if not results:
-                    error_message = "No reservations matched your search."
+                matches = base_qs.matching_name(first_name, last_name)
+                no_matches = "No reservations matched your search."
 
         # --- Search by public_id ---
         elif search_type == "reservation_id":
@@ -394,18 +517,29 @@ def search(request):
             if not reservation_id:
                 error_message = "Please enter a reservation ID."
             else:
-                results = Reservation.objects.ordered().filter(
-                            public_id__iexact=reservation_id
-                        )
-                if not results:
-                    error_message = "No reservations matched this reservation ID."
+                matches = base_qs.matching_public_id(reservation_id)
+                no_matches = "No reservations matched this reservation ID."
+
+    # --- Staff with no search: every reservation, newest first within each status ---
+    elif request.user.is_staff:
+        matches = base_qs
+        listing = True
+
+    if matches is not None:
+        after = parse_search_cursor(request.POST.get("after") or request.GET.get("after"))
+        results, next_cursor = search_page(matches, after)
+        if not results and not after and no_matches:
+            error_message = no_matches
 
     context = {
         "lookup_error": error_message,
         "results": results,
+        "next_cursor": next_cursor,
+        "listing": listing,
+        "search_type": search_type,
         "form_email": form_email,
         "form_first_name": form_first_name,
         "form_last_name": form_last_name,
         "form_reservation_id": form_reservation_id,
     }
-    return render(request, "pages/search.html", context)
\ No newline at end of file
+    return render(request, "pages/search.html", context)